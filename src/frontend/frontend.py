@@ -11,12 +11,12 @@ from threading import Thread
 
 import pandas as pd
 
-
 # =============================================================================
 # Internal library imports
 from libs.excel import force_excel_calc
 from libs.logger import log_print
 from libs.extra import update_dict, find_index
+from methods.sweep import SWEEP_AXES
 from modify.bca_entrypoint import run
 from modify.settings import (
     AVAILABLE_PLOTS,
@@ -24,6 +24,7 @@ from modify.settings import (
     GUI_CONFIG,
     STRING_BASED,
     CHOICE_MATRIX,
+    RUN_MODES,
 )
 from frontend.popup import Progress_Popup
 
@@ -73,6 +74,11 @@ class BCA_App:
 
         self.excel_output_sheet_name = tk.StringVar()
 
+        self.run_mode = tk.StringVar(value=RUN_MODES[0])
+        self.sweep_axes: dict[str, tk.StringVar] = {
+            name: tk.StringVar() for name in SWEEP_AXES
+        }
+
         self.excel_param_input_sheet_name = tk.StringVar()
 
         self.isOkay = root.register(self.validate_input)
@@ -304,6 +310,10 @@ class BCA_App:
         clean_paste_to_excel: bool = self.paste_to_excel.get()
         clean_gen_flag = self.use_gen_method.get()
         log_print(f"Current value of gen_flag is {clean_gen_flag}")
+        clean_run_mode: str = self.run_mode.get()
+        clean_sweep_axes: dict[str, str] = {
+            key: value.get() for key, value in self.sweep_axes.items()
+        }
 
         popup = tk.Toplevel(self.root)
         popup.title("Progress")
@@ -334,6 +344,8 @@ class BCA_App:
                 progress_pp,
                 clean_gen_flag,
                 self.has_recalced,
+                clean_run_mode,
+                clean_sweep_axes,
             ),
         )
         thread.start()
@@ -353,6 +365,8 @@ class BCA_App:
         progress_pp: Progress_Popup,
         gen_flag: bool,
         recalc_flag: bool,
+        run_mode: str,
+        sweep_axes: dict[str, str],
     ):
         """
         Function purpose: Function which catches final errors when trying to run
@@ -372,6 +386,8 @@ class BCA_App:
                 progress_pp,
                 gen_flag,
                 recalc_flag,
+                run_mode,
+                sweep_axes,
             )
         except AttributeError as e:
             progress_pp.bar.stop()
@@ -594,6 +610,28 @@ class BCA_App:
         ).grid(column=0, row=i, pady=10, sticky="sw")
         i += 1
 
+        # Run mode and sweep ranges
+        ttk.Label(popup, text="Run mode:").grid(column=0, row=i, padx=5, sticky="w")
+        ttk.Combobox(
+            popup, textvariable=self.run_mode, values=RUN_MODES, state="readonly"
+        ).grid(column=1, row=i, sticky="w")
+        i += 1
+        ttk.Label(
+            popup, text="Sweep values ('start:stop:step' or 'a, b, c', empty to keep):"
+        ).grid(column=0, row=i, padx=5, pady=(10, 0), columnspan=2, sticky="w")
+        i += 1
+        ttk.Label(
+            popup,
+            text="(the optimizer searches the power and duration 'start:stop:step')",
+        ).grid(column=0, row=i, padx=5, columnspan=2, sticky="w")
+        i += 1
+        for name in SWEEP_AXES:
+            ttk.Label(popup, text=name).grid(column=0, row=i, padx=5, sticky="w")
+            ttk.Entry(popup, textvariable=self.sweep_axes[name]).grid(
+                column=1, row=i, sticky="w"
+            )
+            i += 1
+
         # Adding more space
         i += 1
         # Debug_button
@@ -0,0 +1,212 @@
+# ============================================================================================================================
+# aggregates.py - File containing the single-pass reduction computing every aggregate a scenario's outputs and plots need
+# ============================================================================================================================
+# External Imports
+from typing import Any, Sequence
+
+import numpy as np
+
+# ============================================================================================================================
+# Internal Imports
+from libs.degradation import Cycle_Counts, rainflow_cycles
+from libs.soc import restart_rows
+
+# ============================================================================================================================
+
+# Amount of rows reduced at once: every column of a block is read while the block is still in the CPU cache
+AGGREGATE_BLOCK_ROWS: int = 1 << 16
+
+# Bins (in %) of the State-Of-Charge histogram
+SOC_BINS: np.ndarray = np.arange(0, 105, 5)
+
+
+class Scenario_Aggregates:
+    def __init__(
+        self,
+        sums: dict[str, float],
+        final_soc: float,
+        min_soc: float,
+        max_soc: float,
+        throughput: float,
+        soc_histogram: np.ndarray,
+        soc_bins: np.ndarray,
+        power_histogram: np.ndarray,
+        power_bins: np.ndarray,
+        initial_soc: float = 0.0,
+        cycles: Cycle_Counts | None = None,
+    ):
+        """
+        Function purpose: Holds the aggregates of a scenario, consumed by both the result written to Excel and the plots
+        Args:
+            sums: the (float64, NaN-skipping) sum of each summed column
+            final_soc: the SOC at the end of the simulation
+            min_soc: the lowest SOC of the simulation
+            max_soc: the highest SOC of the simulation
+            throughput: the total energy moved in and out of the storage (sum of the absolute SOC changes from the initial SOC)
+            soc_histogram: the amount of timesteps spent in each bin of soc_bins
+            soc_bins: the edges of the State-Of-Charge bins [%]
+            power_histogram: the amount of timesteps spent in each bin of power_bins
+            power_bins: the edges of the charging/discharging power bins [MW]
+            initial_soc: the SOC before the first timestep (ex: carried over from the previous year)
+            cycles: the rainflow cycles of the SOC (see libs/degradation.py), None if they weren't counted
+        """
+        self.sums = sums
+        self.final_soc = final_soc
+        self.min_soc = min_soc
+        self.max_soc = max_soc
+        self.throughput = throughput
+        self.soc_histogram = soc_histogram
+        self.soc_bins = soc_bins
+        self.power_histogram = power_histogram
+        self.power_bins = power_bins
+        self.initial_soc = initial_soc
+        self.cycles = cycles
+        return
+
+    def equivalent_cycles(self) -> float:
+        """
+        Function purpose: Computes the amount of equivalent full cycles of the storage \n
+        Outputs: the throughput divided by the SOC range used during the simulation, NaN if the SOC never moves
+        """
+        soc_range = self.max_soc - self.min_soc
+        if not soc_range > 0:
+            return np.nan
+        return self.throughput / soc_range
+
+
+def aggregate_columns(
+    columns: Any,
+    sum_names: Sequence[str],
+    power_level: float,
+    block_rows: int = AGGREGATE_BLOCK_ROWS,
+    weights: np.ndarray | None = None,
+    initial_soc: float = 0.0,
+    capacity: float | None = None,
+    soc_restart: tuple[int, int] | None = None,
+) -> Scenario_Aggregates:
+    """
+    Function purpose: Computes, in a single blocked pass, the sums of the given columns along with the SOC and power
+    statistics of a scenario \n
+    Outputs: the Scenario_Aggregates of the scenario
+    Note: Each column is fetched once and reduced block by block, the sums are accumulated in float64 whatever the dtype
+    of the columns (see the float32 mode) and skip NaNs like pandas' sum does.
+    Args:
+        columns: the columns of the scenario (a Dataflow_View or a dataframe), must hold end_soc_values,
+        per_state_of_charge, eff_charge_discharge and every column of sum_names
+        sum_names: the names of the columns to sum
+        power_level: the storage power rating, sets the range of the power histogram
+        block_rows: the amount of rows reduced at once
+        weights: the amount of times each row counts (ex: a representative day standing for several days), None for once
+        initial_soc: the SOC before the first timestep
+        capacity: the capacity of the storage, to count the rainflow cycles of the SOC (not counted if None)
+        soc_restart: the (period, offset) of the restarts from an empty storage (see soc_restarting in libs/soc.py), the
+        emptying being neither throughput nor a cycle. None to carry the SOC over
+    """
+    summed = {name: np.asarray(columns[name]) for name in dict.fromkeys(sum_names)}
+    end_soc_values = np.asarray(columns["end_soc_values"])
+    per_state_of_charge = np.asarray(columns["per_state_of_charge"])
+    eff_charge_discharge = np.asarray(columns["eff_charge_discharge"])
+    restarts = (
+        np.zeros(0, dtype=np.int64)
+        if soc_restart is None
+        else restart_rows(len(end_soc_values), *soc_restart)
+    )
+
+    # Define bins (1 MW width from -power_level to +power_level)
+    power_bins = np.arange(-power_level, power_level + 1, 1)
+
+    sums = dict.fromkeys(summed, 0.0)
+    # Weighted histograms count fractional timesteps
+    count_dtype = np.int64 if weights is None else np.float64
+    soc_histogram = np.zeros(len(SOC_BINS) - 1, dtype=count_dtype)
+    power_histogram = np.zeros(max(len(power_bins) - 1, 0), dtype=count_dtype)
+    throughput = 0.0
+    min_soc = np.inf
+    max_soc = -np.inf
+    previous_soc = initial_soc
+
+    for start in range(0, len(end_soc_values), block_rows):
+        block = slice(start, start + block_rows)
+        weight_block = None if weights is None else weights[block]
+        for name, column in summed.items():
+            if weight_block is None:
+                sums[name] += float(np.nansum(column[block], dtype=np.float64))
+            else:
+                sums[name] += float(
+                    np.nansum(column[block].astype(np.float64) * weight_block)
+                )
+
+        soc_block = end_soc_values[block].astype(np.float64)
+        # Each SOC change counts with the weight of the row it ends on, the first one starting from the initial SOC (and
+        # those of the restart rows from an empty storage)
+        previous = np.concatenate(([previous_soc], soc_block[:-1]))
+        block_restarts = restarts[(restarts >= start) & (restarts < start + block_rows)]
+        previous[block_restarts - start] = 0.0
+        soc_changes = np.abs(soc_block - previous)
+        if weight_block is not None:
+            soc_changes = soc_changes * weight_block
+        throughput += float(np.nansum(soc_changes))
+        previous_soc = soc_block[-1]
+        min_soc = min(min_soc, float(np.nanmin(soc_block)))
+        max_soc = max(max_soc, float(np.nanmax(soc_block)))
+
+        soc_histogram += np.histogram(
+            per_state_of_charge[block], bins=SOC_BINS, weights=weight_block
+        )[0]
+        if len(power_histogram):
+            power_block = eff_charge_discharge[block]
+            power_histogram += np.histogram(
+                power_block[~np.isnan(power_block)],
+                bins=power_bins,
+                weights=(
+                    None
+                    if weight_block is None
+                    else weight_block[~np.isnan(power_block)]
+                ),
+            )[0]
+
+    cycles = None
+    if capacity is not None:
+        # The cycles are counted segment by segment, the emptying at a restart not being a cycle
+        bounds = [0, *restarts.tolist(), len(end_soc_values)]
+        cycles = Cycle_Counts.concatenate(
+            [
+                rainflow_cycles(
+                    np.concatenate(
+                        (
+                            [initial_soc if first == 0 else 0.0],
+                            end_soc_values[first:last],
+                        )
+                    ),
+                    capacity,
+                    None if weights is None else weights[first:last],
+                )
+                for first, last in zip(bounds[:-1], bounds[1:])
+            ]
+        )
+
+    return Scenario_Aggregates(
+        sums,
+        float(end_soc_values[-1]) if len(end_soc_values) else 0.0,
+        min_soc,
+        max_soc,
+        throughput,
+        soc_histogram,
+        SOC_BINS,
+        power_histogram,
+        power_bins,
+        initial_soc,
+        cycles,
+    )
+
+
+def period_sums(column: np.ndarray, rows_per_period: int) -> np.ndarray:
+    """
+    Function purpose: Sums a column over consecutive periods of rows (ex: the days of the timeseries) \n
+    Outputs: the (float64, NaN-skipping) sum of each period, a trailing partial period is summed on its own
+    Args:
+        column: the column to sum
+        rows_per_period: the amount of rows per period
+    """
+    values = np.nan_to_num(np.asarray(column, dtype=np.float64))
+    return np.add.reduceat(values, np.arange(0, len(values), rows_per_period))
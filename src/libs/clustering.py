@@ -0,0 +1,87 @@
+# ============================================================================================================================
+# clustering.py - File containing the vectorized k-medoids clustering used to pick representative days
+# ============================================================================================================================
+# External Imports
+import numpy as np
+
+# ============================================================================================================================
+
+
+def squared_distances(points: np.ndarray, centers: np.ndarray) -> np.ndarray:
+    """
+    Function purpose: Computes the squared euclidean distance between every point and every center in one matrix product \n
+    Outputs: a (points x centers) array of squared distances
+    Args:
+        points: a (points x features) array
+        centers: a (centers x features) array
+    """
+    distances = (
+        np.einsum("ij,ij->i", points, points)[:, None]
+        + np.einsum("ij,ij->i", centers, centers)[None, :]
+        - 2 * points @ centers.T
+    )
+    return np.maximum(distances, 0.0)
+
+
+def standardize(values: np.ndarray) -> np.ndarray:
+    """
+    Function purpose: Scales every column to a zero mean and a unit standard deviation, so that each feature weighs the same \n
+    Outputs: the standardized array, constant columns are set to 0 and NaNs are replaced by 0 (the mean)
+    Args:
+        values: a (rows x columns) array
+    """
+    mean = np.nanmean(values, axis=0)
+    std = np.nanstd(values, axis=0)
+    std[~(std > 0)] = 1.0
+    return np.nan_to_num((values - mean) / std)
+
+
+def k_medoids(
+    points: np.ndarray, k: int, seed: int = 0, max_iterations: int = 100
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Function purpose: Clusters points around k of them (the medoids) \n
+    Outputs: the indices of the medoids (in increasing order) and, for every point, the position of its medoid in that list
+    Note: The medoids are seeded with k-means++ then refined by alternating between assigning each point to its closest
+    medoid and moving each medoid to the member of its cluster closest to all the others, until the medoids stop moving.
+    Args:
+        points: a (points x features) array
+        k: the amount of clusters (at most the amount of points)
+        seed: the seed of the k-means++ initialization, so that a clustering can be reproduced
+        max_iterations: the maximum amount of refinement iterations
+    """
+    amount = len(points)
+    k = max(1, min(k, amount))
+    rng = np.random.default_rng(seed)
+
+    # k-means++ seeding: each new medoid is drawn with a probability proportional to its squared distance to the others
+    medoids = [int(rng.integers(amount))]
+    closest = squared_distances(points, points[medoids])[:, 0]
+    while len(medoids) < k:
+        total = closest.sum()
+        if total <= 0:  # less than k distinct points
+            remaining = np.setdiff1d(np.arange(amount), medoids)
+            medoids.append(int(remaining[0]))
+        else:
+            medoids.append(int(rng.choice(amount, p=closest / total)))
+        closest = np.minimum(
+            closest, squared_distances(points, points[medoids[-1:]])[:, 0]
+        )
+    medoids_array = np.array(medoids)
+
+    for _ in range(max_iterations):
+        labels = np.argmin(squared_distances(points, points[medoids_array]), axis=1)
+        new_medoids = medoids_array.copy()
+        for cluster in range(k):
+            members = np.flatnonzero(labels == cluster)
+            if len(members) == 0:
+                continue
+            costs = squared_distances(points[members], points[members]).sum(axis=1)
+            new_medoids[cluster] = members[np.argmin(costs)]
+        if np.array_equal(new_medoids, medoids_array):
+            break
+        medoids_array = new_medoids
+
+    medoids_array = np.sort(medoids_array)
+    labels = np.argmin(squared_distances(points, points[medoids_array]), axis=1)
+    return medoids_array, labels
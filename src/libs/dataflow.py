@@ -0,0 +1,233 @@
+# ============================================================================================================================
+# dataflow.py - File containing the lazy dataflow graph used to compute (and share between scenarios) the derived columns
+# ============================================================================================================================
+# External Imports
+from collections import OrderedDict
+from typing import Any, Callable, Sequence
+
+import pandas as pd
+
+# ============================================================================================================================
+
+# Amount of results kept per node, the least recently used result is dropped once a node holds more than this
+DEFAULT_CACHE_SIZE: int = 32
+
+# Amount of bytes of arrays kept by a whole graph, the least recently used results (of any node) are dropped above it
+DEFAULT_CACHE_BYTES: int = 1 << 30
+
+
+def result_bytes(value: Any) -> int:
+    """
+    Function purpose: Estimates the memory held by a result of a node \n
+    Outputs: the bytes of the arrays of the result (0 for scalars and other objects)
+    Args:
+        value: the result
+    """
+    if isinstance(value, (tuple, list)):
+        return sum(result_bytes(item) for item in value)
+    return int(getattr(value, "nbytes", 0))
+
+
+class Dataflow_Node:
+    def __init__(
+        self,
+        name: str,
+        function: Callable[[dict[str, Any], dict[str, Any]], Any],
+        inputs: Sequence[str],
+        params: Sequence[str],
+    ):
+        """
+        Function purpose: Holds the definition of a derived quantity
+        Args:
+            name: the name of the derived quantity (usually the name of the column it replaces)
+            function: the function computing it, takes (values of the inputs, values of the params) as two dictionnaries
+            inputs: the names of the timeseries columns or of the other nodes it is computed from
+            params: the names of the scenario parameters it directly depends on
+        """
+        self.name = name
+        self.function = function
+        self.inputs = tuple(inputs)
+        self.params = tuple(params)
+        return
+
+
+class Dataflow_Graph:
+    def __init__(
+        self,
+        base: pd.DataFrame,
+        cache_size: int = DEFAULT_CACHE_SIZE,
+        max_bytes: int = DEFAULT_CACHE_BYTES,
+    ):
+        """
+        Function purpose: Initializes an empty graph on top of the timeseries
+        Args:
+            base: the timeseries dataframe, its columns can be used as inputs of the nodes
+            cache_size: the amount of results kept per node
+            max_bytes: the amount of bytes of results kept by the whole graph (the last result is always kept)
+        """
+        self.base = base
+        self.cache_size = cache_size
+        self.max_bytes = max_bytes
+        self.nodes: dict[str, Dataflow_Node] = {}
+        self.dependencies: dict[str, tuple[str, ...]] = {}
+        ## The nodes each node is (recursively) computed from
+        self.upstream: dict[str, frozenset[str]] = {}
+        self.cache: dict[str, OrderedDict[tuple[Any, ...], Any]] = {}
+        ## Every cached (node, key) from the least to the most recently used, with its bytes
+        self.recency: OrderedDict[tuple[str, tuple[Any, ...]], int] = OrderedDict()
+        self.cached_bytes: int = 0
+        self.hits: int = 0
+        self.misses: int = 0
+        return
+
+    def add_node(
+        self,
+        name: str,
+        function: Callable[[dict[str, Any], dict[str, Any]], Any],
+        inputs: Sequence[str] = (),
+        params: Sequence[str] = (),
+    ) -> None:
+        """
+        Function purpose: Adds a derived quantity to the graph, its inputs must already be nodes or timeseries columns \n
+        Note: The parameters a node depends on are its own params plus those of all its inputs (recursively), these are the
+        only parameters used to build its memoization key.
+        Args:
+            name: the name of the derived quantity
+            function: the function computing it, takes (values of the inputs, values of the params) as two dictionnaries
+            inputs: the names of the timeseries columns or of the other nodes it is computed from
+            params: the names of the scenario parameters it directly depends on
+        """
+        dependencies = set(params)
+        upstream: set[str] = set()
+        for input_name in inputs:
+            if input_name in self.nodes:
+                dependencies.update(self.dependencies[input_name])
+                upstream.update(self.upstream[input_name] | {input_name})
+            elif input_name not in self.base.columns:
+                raise ValueError(
+                    f"Input '{input_name}' of node '{name}' is neither a node nor a timeseries column"
+                )
+        self.nodes[name] = Dataflow_Node(name, function, inputs, params)
+        self.dependencies[name] = tuple(sorted(dependencies))
+        self.upstream[name] = frozenset(upstream)
+        for key in list(self.cache.get(name, ())):
+            self._drop(name, key)
+        self.cache[name] = OrderedDict()
+        return
+
+    def has(self, name: str) -> bool:
+        """
+        Function purpose: Checks whether a quantity can be asked to the graph \n
+        Outputs: True if name is a node or a timeseries column
+        Args:
+            name: the name of the quantity
+        """
+        return name in self.nodes or name in self.base.columns
+
+    def get(self, name: str, params: dict[str, Any]) -> Any:
+        """
+        Function purpose: Evaluates a node (and, lazily, only the inputs it needs) for the given scenario parameters \n
+        Outputs: the value of the node, straight from the cache if it was already computed for the same dependencies
+        Args:
+            name: the name of the node or timeseries column
+            params: the scenario parameters (may contain more parameters than the node needs)
+        """
+        if name not in self.nodes:
+            return self.base[name].to_numpy()
+
+        key = tuple(params[param] for param in self.dependencies[name])
+        node_cache = self.cache[name]
+        if key in node_cache:
+            self.hits += 1
+            node_cache.move_to_end(key)
+            self.recency.move_to_end((name, key))
+            return node_cache[key]
+
+        self.misses += 1
+        node = self.nodes[name]
+        values = {
+            input_name: self.get(input_name, params) for input_name in node.inputs
+        }
+        result = node.function(values, {param: params[param] for param in node.params})
+
+        self._store(name, key, result)
+        return result
+
+    def put(self, name: str, params: dict[str, Any], value: Any) -> None:
+        """
+        Function purpose: Stores a value of a node computed outside of the graph (ex: a block of scenarios solved at once)
+        Note: The results of the nodes computed from it for the same parameters are dropped, they are computed again from
+        the stored value when asked (unless the very same value is stored again).
+        Args:
+            name: the name of the node
+            params: the scenario parameters the value was computed for
+            value: the value of the node
+        """
+        key = tuple(params[param] for param in self.dependencies[name])
+        if key in self.cache[name] and self.cache[name][key] is value:
+            self.cache[name].move_to_end(key)
+            self.recency.move_to_end((name, key))
+            return
+        for dependant in self.nodes:
+            if name not in self.upstream[dependant]:
+                continue
+            # The dependencies of a node include those of its inputs
+            positions = [
+                self.dependencies[dependant].index(param)
+                for param in self.dependencies[name]
+            ]
+            for cached_key in list(self.cache[dependant]):
+                if tuple(cached_key[i] for i in positions) == key:
+                    self._drop(dependant, cached_key)
+        self._store(name, key, value)
+        return
+
+    def _store(self, name: str, key: tuple[Any, ...], value: Any) -> None:
+        # Caches a result, then drops the least recently used ones above the entry and byte bounds
+        node_cache = self.cache[name]
+        if key in node_cache:
+            self._drop(name, key)
+        node_cache[key] = value
+        size = result_bytes(value)
+        self.recency[(name, key)] = size
+        self.cached_bytes += size
+        while len(node_cache) > self.cache_size:
+            self._drop(name, next(iter(node_cache)))
+        while self.cached_bytes > self.max_bytes and len(self.recency) > 1:
+            self._drop(*next(iter(self.recency)))
+        return
+
+    def _drop(self, name: str, key: tuple[Any, ...]) -> None:
+        # Removes a result from the cache
+        del self.cache[name][key]
+        self.cached_bytes -= self.recency.pop((name, key))
+        return
+
+    def clear(self) -> None:
+        """
+        Function purpose: Empties the cache of every node (ex: after the timeseries has been modified)
+        """
+        for node_cache in self.cache.values():
+            node_cache.clear()
+        self.recency.clear()
+        self.cached_bytes = 0
+        return
+
+
+class Dataflow_View:
+    def __init__(self, graph: Dataflow_Graph, params: dict[str, Any]):
+        """
+        Function purpose: Gives dataframe-like access (view["column"]) to the nodes of a graph for one scenario
+        Args:
+            graph: the graph holding the nodes
+            params: the parameters of the scenario
+        """
+        self.graph = graph
+        self.params = params
+        return
+
+    def __getitem__(self, name: str) -> Any:
+        return self.graph.get(name, self.params)
+
+    def __contains__(self, name: str) -> bool:
+        return self.graph.has(name)
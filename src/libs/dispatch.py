@@ -0,0 +1,448 @@
+# ============================================================================================================================
+# dispatch.py - File containing the dispatch strategies of the storage beyond the price rules (see DISPATCH_STRATEGIES)
+# ============================================================================================================================
+# External Imports
+from typing import Any, Mapping
+
+import numpy as np
+
+# ============================================================================================================================
+# The SOC is split into levels. A backward dynamic program gives, for every timestep and level, the best income from then on,
+# each step being vectorized over all the levels and moves (the next values are read through a sliding window, no Python
+# loop over levels or moves). Besides the whole-level moves, every timestep can move exactly as much as its bounds allow,
+# which lands between two levels: the income from there on is interpolated between them. A forward pass then follows the
+# best moves from the actual SOC.
+
+# The columns of the graph the income of a move is computed from (see move_incomes)
+DISPATCH_COLUMNS: tuple[str, ...] = (
+    "bal_income",
+    "bal_power",
+    "Revenue Balancing Prices",
+    "deltapower",
+    "Exported Power [MW]",
+    "Wholesale_Price",
+    "max_discharging",
+)
+
+# Amount of timesteps whose move incomes are held in memory at once
+INCOME_BLOCK_ROWS: int = 4096
+
+
+def dispatch_columns(columns: Mapping[str, Any]) -> dict[str, np.ndarray]:
+    """
+    Function purpose: Reads the columns of DISPATCH_COLUMNS once in float64, so the windows of the dynamic programs are
+    views of them instead of copies \n
+    Outputs: the columns by name
+    Args:
+        columns: the view of the scenario on the graph (or the values of a node)
+    """
+    return {
+        name: np.asarray(columns[name], dtype=np.float64) for name in DISPATCH_COLUMNS
+    }
+
+
+class Soc_Grid:
+    def __init__(
+        self,
+        columns: dict[str, np.ndarray],
+        params: dict[str, Any],
+        capacity: float,
+        timestep: float,
+        soc_levels: int,
+    ):
+        """
+        Function purpose: Holds the SOC levels of a scenario and the moves between them, bounded like the rule-based
+        dispatch: the charging power by the overproduction (or the power rating otherwise) after losses, the discharging
+        power by max_discharging
+        Args:
+            columns: the columns of DISPATCH_COLUMNS (see dispatch_columns)
+            params: the scenario parameters (see read_scenario)
+            capacity: the storage capacity (see storage_capacity)
+            timestep: the timestep of the SOC recurrence (see soc_timestep)
+            soc_levels: the amount of SOC levels
+        """
+        if soc_levels < 2:
+            raise ValueError("The optimized dispatches need at least 2 SOC levels")
+        deltapower = columns["deltapower"]
+        self.efficiency = params["efficiency"]
+        self.timestep = timestep
+
+        # Bounds of the energy moved into the storage at each timestep (after losses)
+        self.highest = np.nan_to_num(
+            np.where(deltapower < 0, -deltapower, params["power_level"])
+            * self.efficiency
+            * timestep
+        )
+        self.lowest = np.nan_to_num(columns["max_discharging"] * timestep)
+
+        self.capacity = capacity
+        self.soc_levels = soc_levels
+        self.level_energy = capacity / (soc_levels - 1)
+        self.level_soc = np.arange(soc_levels) * self.level_energy
+        self.tolerance = 1e-9 * self.level_energy
+        self.moves = np.arange(
+            max(
+                int(np.floor((self.lowest.min() + self.tolerance) / self.level_energy)),
+                1 - soc_levels,
+            ),
+            min(
+                int(
+                    np.floor((self.highest.max() + self.tolerance) / self.level_energy)
+                ),
+                soc_levels - 1,
+            )
+            + 1,
+        )
+        self.energy = self.moves * self.level_energy
+        self.eff_charge_discharge = self.grid_power(self.energy)
+        return
+
+    def grid_power(self, energy: np.ndarray) -> np.ndarray:
+        """
+        Function purpose: Converts energies moved into the storage to the power at the grid connection \n
+        Outputs: the power in (>0) or out (<0) at the grid connection [MW]
+        Args:
+            energy: the energies moved into the storage (after losses) in one timestep
+        """
+        charge_discharge = energy / self.timestep
+        return np.where(
+            charge_discharge >= 0,
+            charge_discharge / self.efficiency,
+            charge_discharge * self.efficiency,
+        )
+
+    def feasible(self, rows: slice) -> np.ndarray:
+        """
+        Function purpose: Tells which whole-level moves are possible at each timestep \n
+        Outputs: a (timesteps x moves) boolean array
+        Args:
+            rows: the timesteps
+        """
+        return (self.energy[None, :] >= self.lowest[rows, None] - self.tolerance) & (
+            self.energy[None, :] <= self.highest[rows, None] + self.tolerance
+        )
+
+    def bound_moves(self, rows: slice, soc: np.ndarray) -> np.ndarray:
+        """
+        Function purpose: Gives the moves discharging and charging as much as each timestep allows from some SOCs \n
+        Outputs: a (timesteps x SOCs x 2) array of the energy of both moves, clamped to the capacity
+        Args:
+            rows: the timesteps
+            soc: the SOCs the moves start from
+        """
+        soc = soc[None, :]
+        return np.stack(
+            (
+                np.maximum(soc + self.lowest[rows, None], 0.0) - soc,
+                np.minimum(soc + self.highest[rows, None], self.capacity) - soc,
+            ),
+            axis=-1,
+        )
+
+
+def move_incomes(
+    columns: dict[str, np.ndarray],
+    params: dict[str, Any],
+    rows: slice,
+    eff_charge_discharge: np.ndarray,
+    weights: np.ndarray | None = None,
+) -> np.ndarray:
+    """
+    Function purpose: Computes the income of every timestep for every move, with the revenue rules of the engine
+    (storage_income and extra_generation_income of build_graph, which it must follow) \n
+    Outputs: a (timesteps x moves) array of the income [€], NaN incomes counting as 0 like in the aggregate pass
+    Args:
+        columns: the columns of DISPATCH_COLUMNS (see dispatch_columns)
+        params: the scenario parameters (see read_scenario)
+        rows: the timesteps
+        eff_charge_discharge: the power in (>0) or out (<0) at the grid connection of every move [MW], the same moves at
+        every timestep (moves) or their own moves (timesteps x moves)
+        weights: the amount of times each row counts, None for once
+    """
+    power_level = params["power_level"]
+    settlement_period = params["settlement_period"]
+    bal_income = columns["bal_income"][rows, None]
+    bal_power = columns["bal_power"][rows, None]
+    prices = columns["Revenue Balancing Prices"][rows, None]
+    deltapower = columns["deltapower"][rows, None]
+    exported = columns["Exported Power [MW]"][rows, None]
+    wholesale = columns["Wholesale_Price"]
+    if wholesale.ndim:
+        wholesale = wholesale[rows, None]
+    power = (
+        eff_charge_discharge
+        if eff_charge_discharge.ndim == 2
+        else eff_charge_discharge[None, :]
+    )
+
+    charging_income = np.select(
+        [power_level <= bal_power, power_level <= exported],
+        [
+            bal_income - power * prices * settlement_period,  # [D]
+            bal_income
+            - bal_power * prices * settlement_period
+            - (power - bal_power) * (wholesale + prices) * settlement_period,  # [E]
+        ],
+        (bal_power - power_level) * prices * settlement_period,  # [F]
+    )
+    storage_income = np.where(
+        power == 0,
+        bal_income,  # [A]
+        np.where(
+            power < 0,
+            bal_income - power * prices * settlement_period,  # [B]
+            np.where(deltapower < 0, bal_income, charging_income),  # [C]
+        ),
+    )
+    extra_generation_income = (
+        np.where(deltapower < 0, power, 0)
+        * params["green_certificate"]
+        * settlement_period
+    )
+    incomes = np.nan_to_num(storage_income + extra_generation_income)
+    return incomes if weights is None else incomes * weights[rows, None]
+
+
+def best_soc_path(
+    columns: dict[str, np.ndarray],
+    params: dict[str, Any],
+    grid: Soc_Grid,
+    rows: slice,
+    start_soc: float,
+    idle_first: bool = False,
+    weights: np.ndarray | None = None,
+    kept: int | None = None,
+) -> np.ndarray:
+    """
+    Function purpose: Finds the moves maximizing the income over some timesteps, knowing all their prices in advance \n
+    Outputs: the SOC at the end of the first kept timesteps of rows
+    Note: Backward pass over the timesteps (O(timesteps x levels x moves)), keeping the best income from every level, then
+    forward pass from start_soc, one timestep at a time. The storage may end empty, nothing is worth keeping after the
+    last timestep.
+    Args:
+        columns: the columns of DISPATCH_COLUMNS (see dispatch_columns)
+        params: the scenario parameters (see read_scenario)
+        grid: the SOC levels and moves of the scenario
+        rows: the timesteps (a slice without step)
+        start_soc: the SOC before the first timestep
+        idle_first: if True the first timestep doesn't move (its power isn't counted, see charge_discharge)
+        weights: the amount of times each row counts, None for once
+        kept: the amount of timesteps whose SOC is returned, None for all of them
+    """
+    start, stop = rows.start, rows.stop
+    soc_levels = grid.soc_levels
+    moves = grid.moves
+    level_soc = grid.level_soc
+
+    # value[t, i] is the best income from timestep start + t on, starting from level i
+    value = np.zeros((stop - start + 1, soc_levels))
+    padded = np.full(soc_levels + len(moves) - 1, -np.inf)
+    for block_end in range(stop, start, -INCOME_BLOCK_ROWS):
+        block = slice(max(block_end - INCOME_BLOCK_ROWS, start), block_end)
+        incomes = move_incomes(
+            columns, params, block, grid.eff_charge_discharge, weights
+        )
+        feasible = grid.feasible(block)
+        bound_energy = grid.bound_moves(block, level_soc)
+        bound_incomes = move_incomes(
+            columns,
+            params,
+            block,
+            grid.grid_power(bound_energy).reshape(len(bound_energy), -1),
+            weights,
+        ).reshape(bound_energy.shape)
+        if idle_first and block.start == start:
+            feasible[0] = moves == 0
+            bound_incomes[0] = -np.inf
+        incomes = np.where(feasible, incomes, -np.inf)
+        for t in range(block.stop - block.start - 1, -1, -1):
+            position = block.start - start + t
+            padded[-moves[0] : -moves[0] + soc_levels] = value[position + 1]
+            level_moves = np.max(
+                np.lib.stride_tricks.sliding_window_view(padded, len(moves))
+                + incomes[t],
+                axis=1,
+            )
+            bound_moves = np.max(
+                bound_incomes[t]
+                + np.interp(
+                    level_soc[:, None] + bound_energy[t], level_soc, value[position + 1]
+                ),
+                axis=1,
+            )
+            value[position] = np.maximum(level_moves, bound_moves)
+
+    soc = min(max(start_soc, 0.0), grid.capacity)
+    path = np.empty(stop - start if kept is None else min(kept, stop - start))
+    for block_start in range(0, len(path), INCOME_BLOCK_ROWS):
+        block = slice(
+            start + block_start,
+            start + min(block_start + INCOME_BLOCK_ROWS, len(path)),
+        )
+        # The incomes of the whole-level moves and of the bound moves, those clamped to the capacity are computed when met
+        bounds = np.stack((grid.lowest[block], grid.highest[block]), axis=1)
+        powers = np.concatenate(
+            (
+                np.broadcast_to(grid.eff_charge_discharge, (len(bounds), len(moves))),
+                grid.grid_power(bounds),
+            ),
+            axis=1,
+        )
+        incomes = move_incomes(columns, params, block, powers, weights)
+        # The bound moves are always possible, the whole-level moves within their bounds (and the capacity, see below)
+        feasible = np.concatenate(
+            (grid.feasible(block), np.ones((len(bounds), 2), dtype=bool)), axis=1
+        )
+        energy = np.concatenate((grid.energy, [0.0, 0.0]))
+        for t in range(len(bounds)):
+            position = block_start + t
+            if not (idle_first and position == 0):
+                energy[len(moves) :] = bounds[t]
+                income = incomes[t]
+                if soc + bounds[t, 0] < 0 or soc + bounds[t, 1] > grid.capacity:
+                    energy[len(moves) :] = (
+                        np.clip(soc + bounds[t], 0.0, grid.capacity) - soc
+                    )
+                    income = income.copy()
+                    income[len(moves) :] = move_incomes(
+                        columns,
+                        params,
+                        slice(block.start + t, block.start + t + 1),
+                        grid.grid_power(energy[len(moves) :]),
+                        weights,
+                    )[0]
+                landing = soc + energy
+                candidates = np.where(
+                    feasible[t]
+                    & (landing >= -grid.tolerance)
+                    & (landing <= grid.capacity + grid.tolerance),
+                    income + np.interp(landing, level_soc, value[position + 1]),
+                    -np.inf,
+                )
+                soc = min(max(landing[np.argmax(candidates)], 0.0), grid.capacity)
+            path[position] = soc
+    return path
+
+
+# _____________________________________________________________________________________________________________________________
+def optimal_soc(
+    columns: Mapping[str, Any],
+    params: dict[str, Any],
+    capacity: float,
+    timestep: float,
+    soc_levels: int,
+    weights: np.ndarray | None = None,
+) -> np.ndarray:
+    """
+    Function purpose: Finds the perfect-foresight dispatch of a scenario, maximizing its income over the whole timeseries \n
+    Outputs: the SOC at the end of every timestep
+    Note: The first timestep stays idle, as its power isn't counted (see charge_discharge). The income from a SOC between
+    two levels being interpolated, the result is close to the best dispatch (the closer the more levels) but not
+    guaranteed to beat every strategy.
+    Args:
+        columns: the view of the scenario on the graph (or the values of a node)
+        params: the scenario parameters (see read_scenario)
+        capacity: the storage capacity (see storage_capacity)
+        timestep: the timestep of the SOC recurrence (see soc_timestep)
+        soc_levels: the amount of SOC levels
+        weights: the amount of times each row counts, None for once
+    """
+    columns = dispatch_columns(columns)
+    grid = Soc_Grid(columns, params, capacity, timestep, soc_levels)
+    return best_soc_path(
+        columns,
+        params,
+        grid,
+        slice(0, len(columns["deltapower"])),
+        params["initial_soc"],
+        True,
+        weights,
+    )
+
+
+def rolling_horizon_soc(
+    columns: Mapping[str, Any],
+    params: dict[str, Any],
+    capacity: float,
+    timestep: float,
+    soc_levels: int,
+    horizon: int,
+    step: int,
+) -> np.ndarray:
+    """
+    Function purpose: Finds the dispatch of a storage planning over the next horizon timesteps (ex: day-ahead prices),
+    replanning every step timesteps \n
+    Outputs: the SOC at the end of every timestep
+    Note: Every step timesteps the best dispatch over the window of the next horizon timesteps is solved from the current
+    SOC (see best_soc_path, the window being a view of the columns), its first step moves are kept and the SOC is carried
+    over to the next window. The cost is about timesteps / step x horizon, so linear in the timesteps.
+    Args:
+        columns: the view of the scenario on the graph (or the values of a node)
+        params: the scenario parameters (see read_scenario)
+        capacity: the storage capacity (see storage_capacity)
+        timestep: the timestep of the SOC recurrence (see soc_timestep)
+        soc_levels: the amount of SOC levels
+        horizon: the amount of timesteps each plan looks ahead
+        step: the amount of timesteps kept from each plan (at most horizon)
+    """
+    if not 1 <= step <= horizon:
+        raise ValueError(
+            f"The rolling horizon needs 1 <= step ({step}) <= horizon ({horizon}) timesteps"
+        )
+    columns = dispatch_columns(columns)
+    grid = Soc_Grid(columns, params, capacity, timestep, soc_levels)
+    length = len(columns["deltapower"])
+
+    path = np.empty(length)
+    soc = params["initial_soc"]
+    for start in range(0, length, step):
+        kept = best_soc_path(
+            columns,
+            params,
+            grid,
+            slice(start, min(start + horizon, length)),
+            soc,
+            start == 0,
+            kept=step,
+        )
+        path[start : start + len(kept)] = kept
+        soc = float(kept[-1])
+    return path
+
+
+def daily_extremes(
+    prices: np.ndarray, periods_per_day: int, count: int
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Function purpose: Finds the count cheapest and the count dearest timesteps of every day \n
+    Outputs: the masks of the cheapest and of the dearest timesteps
+    Note: The prices are laid out as a (days x periods per day) matrix, the days being consecutive blocks of timesteps from
+    the first one (the last day is padded), and np.argpartition picks the extremes of all the days at once. A NaN price is
+    never picked.
+    Args:
+        prices: the prices
+        periods_per_day: the amount of timesteps per day
+        count: the amount of timesteps picked per day, at most half of a day
+    """
+    length = len(prices)
+    count = min(max(int(count), 0), periods_per_day // 2)
+    cheapest = np.zeros(length, dtype=bool)
+    dearest = np.zeros(length, dtype=bool)
+    if count == 0 or length == 0:
+        return cheapest, dearest
+
+    days = -(-length // periods_per_day)
+    day_prices = np.full(days * periods_per_day, np.nan)
+    day_prices[:length] = prices
+    day_prices = day_prices.reshape(days, periods_per_day)
+    missing = np.isnan(day_prices)
+    offsets = (np.arange(days) * periods_per_day)[:, None]
+
+    for mask, ranked in (
+        (cheapest, np.where(missing, np.inf, day_prices)),
+        (dearest, np.where(missing, np.inf, -day_prices)),
+    ):
+        picked = np.argpartition(ranked, count - 1, axis=1)[:, :count]
+        picked = (offsets + picked)[~np.take_along_axis(missing, picked, axis=1)]
+        mask[picked[picked < length]] = True
+    return cheapest, dearest
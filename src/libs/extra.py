@@ -113,3 +113,13 @@ def safe_irr(cash_flows) -> float:
         return np.nan
     else:
         return irr
+
+
+def safe_irr_values(irr: np.ndarray) -> np.ndarray:
+    """
+    Function purpose: Cleans an array of IRRs the way safe_irr cleans one
+
+    Outputs: the cleaned IRRs, -0.20 where the IRR isn't computable and NaN where it is above 100%
+    Args: irr: the IRRs, NaN where they aren't computable (ex: matrix_irr of libs/finance.py)
+    """
+    return np.where(np.isnan(irr), -0.20, np.where(irr > 1.0, np.nan, irr))
@@ -0,0 +1,371 @@
+# ============================================================================================================================
+# finance.py - File containing the closed-form financials of a storage project, vectorized over many draws of its inputs
+# ============================================================================================================================
+# External Imports
+from typing import Callable
+
+import numpy as np
+
+# ============================================================================================================================
+
+
+class Scenario_Financials:
+    def __init__(
+        self,
+        power_level: float,
+        storage_time_hr: float,
+        annual_net_income: float,
+        faded_income: float = 0.0,
+        retention: Callable[[int], np.ndarray] | None = None,
+    ):
+        """
+        Function purpose: Holds what the financials of a scenario need from its simulation, so that they can be recomputed
+        for other financial inputs without simulating the scenario again
+        Args:
+            power_level: the Storage Power Rating of the scenario [MW]
+            storage_time_hr: the Duration of the scenario [h]
+            annual_net_income: the annual income attributed to the storage, before OPEX [€/year]
+            faded_income: the part of annual_net_income which fades with the capacity of the storage [€/year]
+            retention: gives the share of the capacity left in each year of a project life, None without capacity fade
+        """
+        self.power_level = power_level
+        self.storage_time_hr = storage_time_hr
+        self.annual_net_income = annual_net_income
+        self.faded_income = faded_income
+        self.retention = retention
+        return
+
+
+def storage_capex(
+    unit_capex_kw: np.ndarray | float,
+    unit_capex_kwh: np.ndarray | float,
+    power_level: float,
+    storage_time_hr: float,
+) -> np.ndarray | float:
+    """
+    Function purpose: Computes the CAPEX of the storage \n
+    Outputs: the CAPEX [€], with the shape of the unit CAPEX given
+    Args:
+        unit_capex_kw: the Power Unit CAPEX [€/kW]
+        unit_capex_kwh: the Capacity Unit CAPEX [€/kWh]
+        power_level: the Storage Power Rating [MW]
+        storage_time_hr: the Duration [h]
+    """
+    return 1e3 * (
+        unit_capex_kw * power_level + unit_capex_kwh * (storage_time_hr * power_level)
+    )
+
+
+def annuity_factor(
+    rate: np.ndarray | float, life: np.ndarray | float
+) -> np.ndarray | float:
+    """
+    Function purpose: Computes the present value of 1 € received every year of the project life \n
+    Outputs: the annuity factor, with the broadcast shape of rate and life
+    Note: Matches the NPV of compute_outputs (npf.npv of the yearly cash flows), which doesn't discount the first year:
+    sum of (1 + rate)^-t for t from 0 to life - 1.
+    Args:
+        rate: the discount rate
+        life: the project life [years]
+    """
+    rate = np.asarray(rate, dtype=float)
+    life = np.asarray(life, dtype=float)
+    safe_rate = np.where(rate == 0, 1.0, rate)
+    factor = (1 - (1 + safe_rate) ** -life) / safe_rate * (1 + safe_rate)
+    return np.where(rate == 0, life, factor)
+
+
+def annuity_npv(
+    capex: np.ndarray | float,
+    annual_cash: np.ndarray | float,
+    rate: np.ndarray | float,
+    life: np.ndarray | float,
+) -> np.ndarray | float:
+    """
+    Function purpose: Computes the NPV of a project paying capex once then annual_cash every year, in closed form \n
+    Outputs: the NPV, with the broadcast shape of the inputs
+    Args:
+        capex: the investment of year 0
+        annual_cash: the net cash flow of every following year (income - OPEX)
+        rate: the discount rate
+        life: the project life [years]
+    """
+    return annual_cash * annuity_factor(rate, life) - capex
+
+
+def annuity_irr(
+    capex: np.ndarray | float,
+    annual_cash: np.ndarray | float,
+    life: np.ndarray | float,
+    iterations: int = 64,
+) -> np.ndarray:
+    """
+    Function purpose: Computes the IRR of many projects paying capex once then annual_cash every year, all at once \n
+    Outputs: the IRR of every project, NaN where the cash flows don't change sign (like npf.irr)
+    Note: The NPV of such a project decreases with the rate, its IRR is found by bisection between -1 and
+    annual_cash / capex (the IRR of a perpetuity, always above the one of a finite life). Every bisection step works on
+    all the projects at once.
+    Args:
+        capex: the investment of year 0
+        annual_cash: the net cash flow of every following year
+        life: the project life [years]
+        iterations: the amount of bisection steps (64 reaches the float64 precision)
+    """
+    capex, annual_cash, life = np.broadcast_arrays(
+        np.asarray(capex, dtype=float),
+        np.asarray(annual_cash, dtype=float),
+        np.asarray(life, dtype=float),
+    )
+    valid = (capex > 0) & (annual_cash > 0) & (life >= 1)
+    safe_capex = np.where(valid, capex, 1.0)
+    ratio = np.where(valid, annual_cash, 1.0) / safe_capex
+    life = np.where(valid, life, 1.0)
+
+    # Bisection on the NPV per € of CAPEX, discounting the year t cash flow by (1 + irr)^-t
+    low = np.full(capex.shape, -1.0 + 1e-12)
+    high = ratio.copy()
+    for _ in range(iterations):
+        middle = (low + high) / 2
+        npv = (
+            ratio * (1 - (1 + middle) ** -life) / np.where(middle == 0, 1.0, middle) - 1
+        )
+        npv = np.where(middle == 0, ratio * life - 1, npv)
+        positive = npv > 0
+        low = np.where(positive, middle, low)
+        high = np.where(positive, high, middle)
+    return np.where(valid, (low + high) / 2, np.nan)
+
+
+# ============================================================================================================================
+# The year-by-year cash flows of many projects at once: one row per project, column 0 the investment and column t the net
+# cash flow of year t of the project life. Years past the life of a project are 0, which changes neither its NPV nor its IRR.
+
+
+class Cash_Flow_Model:
+    def __init__(
+        self,
+        revenue_escalation: float = 0.0,
+        opex_escalation: float = 0.0,
+        augmentation: dict[int, float] | None = None,
+        tax_rate: float = 0.0,
+        depreciation_years: int = 0,
+    ):
+        """
+        Function purpose: Describes how the annual income and OPEX of a project turn into its yearly cash flows
+        Args:
+            revenue_escalation: the yearly growth of the income (ex: 0.02 for 2% per year)
+            opex_escalation: the yearly growth of the OPEX
+            augmentation: for each year of the project life, the share of the CAPEX spent that year to restore the capacity
+            of the storage (see capacity_retention of libs/degradation.py)
+            tax_rate: the tax rate of the yearly profit, a loss isn't taxed nor carried forward
+            depreciation_years: the amount of years the CAPEX is depreciated over (straight line), 0 for no depreciation
+        """
+        self.revenue_escalation = revenue_escalation
+        self.opex_escalation = opex_escalation
+        self.augmentation = dict(augmentation or {})
+        self.tax_rate = tax_rate
+        self.depreciation_years = depreciation_years
+        if revenue_escalation <= -1 or opex_escalation <= -1:
+            raise ValueError("The escalation rates must be above -100%")
+        if not 0 <= tax_rate < 1:
+            raise ValueError(f"The tax rate must be between 0 and 1, not {tax_rate}")
+        if depreciation_years < 0:
+            raise ValueError("The amount of depreciation years can't be negative")
+        if any(year < 1 for year in self.augmentation):
+            raise ValueError("The augmentation years start at year 1")
+        return
+
+    def flat(self) -> bool:
+        """
+        Function purpose: Checks whether the cash flows are the same every year (no escalation, augmentation nor tax) \n
+        Outputs: True if the NPV and IRR are those of an annuity (see annuity_npv and annuity_irr)
+        """
+        return (
+            self.revenue_escalation == 0
+            and self.opex_escalation == 0
+            and not any(self.augmentation.values())
+            and self.tax_rate == 0
+        )
+
+    def augmentation_years(self) -> list[int]:
+        """
+        Function purpose: Lists the years the capacity of the storage is restored \n
+        Outputs: the years with a positive augmentation, sorted
+        """
+        return sorted(year for year, share in self.augmentation.items() if share > 0)
+
+    def matrix(
+        self,
+        capex: np.ndarray | float,
+        annual_income: np.ndarray | float,
+        opex: np.ndarray | float,
+        life: np.ndarray | int,
+        faded_income: np.ndarray | float = 0.0,
+        retention: np.ndarray | None = None,
+    ) -> np.ndarray:
+        """
+        Function purpose: Builds the yearly cash flows of many projects in one broadcast \n
+        Outputs: the (projects x 1 + longest life) cash flows, column 0 being -capex
+        Note: The income of year t is annual_income - faded_income x (1 - retention of year t), both escalated by
+        (1 + revenue_escalation)^(t - 1), the OPEX is escalated by (1 + opex_escalation)^(t - 1). The augmentation is
+        expensed in its year, the taxable profit being the income - OPEX - augmentation - depreciation.
+        Args:
+            capex: the investment of each project
+            annual_income: the income of the first year of each project, before OPEX
+            opex: the OPEX of the first year of each project
+            life: the project life of each project [years]
+            faded_income: the part of annual_income which fades with the capacity of the storage
+            retention: the share of the capacity left in each year, for every project (projects x years) or all of them
+            (years), None for no fade
+        """
+        capex, annual_income, opex, faded_income, life = np.broadcast_arrays(
+            np.asarray(capex, dtype=np.float64),
+            np.asarray(annual_income, dtype=np.float64),
+            np.asarray(opex, dtype=np.float64),
+            np.asarray(faded_income, dtype=np.float64),
+            np.asarray(life),
+        )
+        capex, annual_income, opex, faded_income, life = (
+            np.atleast_1d(values)[:, None]
+            for values in (capex, annual_income, opex, faded_income, life)
+        )
+        years = np.arange(1, int(life.max(initial=0)) + 1)
+        revenue_factors = (1 + self.revenue_escalation) ** (years - 1)
+        opex_factors = (1 + self.opex_escalation) ** (years - 1)
+
+        income = annual_income * revenue_factors
+        if retention is not None:
+            fade = 1 - retention[..., : len(years)]
+            income = income - faded_income * fade * revenue_factors
+        operating = income - opex * opex_factors
+        augmentation = capex * np.array(
+            [self.augmentation.get(int(year), 0.0) for year in years]
+        )
+        cash_flows = operating - augmentation
+        if self.tax_rate:
+            depreciation = capex * np.where(
+                years <= self.depreciation_years,
+                1 / max(self.depreciation_years, 1),
+                0.0,
+            )
+            cash_flows = cash_flows - self.tax_rate * np.maximum(
+                operating - augmentation - depreciation, 0.0
+            )
+        cash_flows = np.where(years <= life, cash_flows, 0.0)
+        return np.concatenate((-capex, cash_flows), axis=1)
+
+
+def discount_factors(rate: np.ndarray | float, years: int) -> np.ndarray:
+    """
+    Function purpose: Computes the factor each column of a cash-flow matrix is discounted by \n
+    Outputs: the factors of columns 0 to years, with a trailing axis added to the shape of rate
+    Note: Same convention as the NPV of compute_outputs (see annuity_factor): the investment and the first year aren't
+    discounted, year t is discounted by (1 + rate)^-(t - 1).
+    Args:
+        rate: the discount rate
+        years: the amount of years of the matrix
+    """
+    rate = np.asarray(rate, dtype=np.float64)[..., None]
+    exponents = np.maximum(np.arange(years + 1) - 1, 0)
+    return (1 + rate) ** -exponents
+
+
+def matrix_npv(cash_flows: np.ndarray, rate: np.ndarray | float) -> np.ndarray:
+    """
+    Function purpose: Computes the NPV of every row of a cash-flow matrix \n
+    Outputs: the NPV of every project
+    Args:
+        cash_flows: the (projects x 1 + years) cash flows (see Cash_Flow_Model.matrix)
+        rate: the discount rate, the same for every project or one per project
+    """
+    factors = discount_factors(rate, cash_flows.shape[1] - 1)
+    if factors.ndim == 1:
+        return cash_flows @ factors
+    return np.einsum("ij,ij->i", cash_flows, factors)
+
+
+# Rates the IRR is searched between, denser where the IRR of a project usually lies
+IRR_GRID: np.ndarray = np.concatenate(
+    (
+        [-0.999, -0.99, -0.95],
+        np.linspace(-0.9, -0.3, 7),
+        np.linspace(-0.25, 0.5, 31),
+        [0.6, 0.8, 1.0, 1.5, 2.0, 3.0, 5.0, 10.0, 100.0],
+    )
+)
+
+
+def present_values(
+    cash_flows: np.ndarray, rate: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Function purpose: Computes the present value of every row of a cash-flow matrix at year 0, by Horner's method \n
+    Outputs: the sum of cash flow t x (1 + rate)^-t of every project, and its derivative with respect to the rate
+    Args:
+        cash_flows: the (projects x 1 + years) cash flows
+        rate: the rate of every project (> -1)
+    """
+    discount = 1 / (1 + rate)
+    value = np.zeros(len(cash_flows))
+    slope = np.zeros(len(cash_flows))
+    for column in cash_flows.T[::-1]:
+        slope = slope * discount + value
+        value = value * discount + column
+    # d(discount) / d(rate) = -discount^2
+    return value, -slope * discount**2
+
+
+def matrix_irr(
+    cash_flows: np.ndarray, grid: np.ndarray = IRR_GRID, iterations: int = 64
+) -> np.ndarray:
+    """
+    Function purpose: Computes the IRR of every row of a cash-flow matrix, all the rows at once \n
+    Outputs: the IRR of every project, NaN where the present value doesn't change sign between the rates of the grid
+    Note: The present value of every project is evaluated on every rate of the grid by one matrix product, the interval
+    where it changes sign closest to a rate of 0 is kept (like npf.irr keeps the root closest to 0). The root is then
+    refined by Newton steps, a step leaving the interval being replaced by a bisection. Every step works on all the
+    projects at once.
+    Args:
+        cash_flows: the (projects x 1 + years) cash flows (see Cash_Flow_Model.matrix)
+        grid: the sorted rates bracketing the IRR (> -1)
+        iterations: the maximum amount of refinement steps
+    """
+    cash_flows = np.atleast_2d(np.asarray(cash_flows, dtype=np.float64))
+    rows = np.arange(len(cash_flows))
+    signs = np.sign(cash_flows @ (1 + grid) ** -np.arange(cash_flows.shape[1])[:, None])
+    changes = signs[:, :-1] != signs[:, 1:]
+    # Distance of each interval to a rate of 0 (0 if it holds it)
+    gaps = np.where(
+        (grid[:-1] <= 0) & (grid[1:] >= 0),
+        0.0,
+        np.minimum(np.abs(grid[:-1]), np.abs(grid[1:])),
+    )
+    interval = np.argmin(np.where(changes, gaps, np.inf), axis=1)
+    found = changes[rows, interval]
+    low, high = grid[interval], grid[interval + 1]
+    low_sign = signs[rows, interval]
+
+    rate = (low + high) / 2
+    # Rows still being refined
+    active = np.flatnonzero(found)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for _ in range(iterations):
+            if not len(active):
+                break
+            value, slope = present_values(cash_flows[active], rate[active])
+            same = np.sign(value) == low_sign[active]
+            low[active] = np.where(same, rate[active], low[active])
+            high[active] = np.where(same, high[active], rate[active])
+            step = rate[active] - value / slope
+            step = np.where(
+                (step > low[active]) & (step < high[active]),
+                step,
+                (low[active] + high[active]) / 2,
+            )
+            step = np.where(value == 0, rate[active], step)
+            converged = np.abs(step - rate[active]) <= 1e-12 * np.maximum(
+                np.abs(rate[active]), 1.0
+            )
+            rate[active] = step
+            active = active[~converged]
+    return np.where(found, rate, np.nan)
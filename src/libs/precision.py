@@ -0,0 +1,101 @@
+# ============================================================================================================================
+# precision.py - File containing the functions used by the float32 compute mode and its accuracy report
+# ============================================================================================================================
+# External Imports
+import copy
+from typing import Any, Callable
+
+import numpy as np
+import pandas as pd
+
+# ============================================================================================================================
+# Internal Imports
+from libs.logger import log_print
+
+# ============================================================================================================================
+
+# The result containers of a business case filled by the run modes (see modify/bca_class.py), the float64 reference of the
+# accuracy report gets its own so that it doesn't overwrite the results of the float32 run
+RESULT_CONTAINERS: tuple[str, ...] = (
+    "sweeps",
+    "sizings",
+    "monte_carlo",
+    "bootstraps",
+    "revenue_bases",
+    "dispatch_benchmarks",
+)
+
+
+def cast_timeseries(df: pd.DataFrame, dtype: type) -> pd.DataFrame:
+    """
+    Function purpose: Casts every floating point column of the timeseries to the compute dtype \n
+    Outputs: the timeseries dataframe with its floating point columns cast (other columns are left untouched)
+    Args:
+        df: the timeseries dataframe
+        dtype: the dtype to cast to (ex: np.float32)
+    """
+    float_columns = df.select_dtypes(include="floating").columns
+    return df.astype({column: dtype for column in float_columns})
+
+
+# _____________________________________________________________________________________________________________________________
+def accuracy_report(
+    business_case: Any,
+    scenario_index: int,
+    run_scenario: Callable[[Any, int], None],
+    tolerance: float,
+) -> pd.DataFrame:
+    """
+    Function purpose: Compares the outputs of a scenario computed in float32 mode against the same scenario computed in float64 \n
+    Outputs: a dataframe with, for each output column, both values, their relative deviation and whether it is flagged
+    Note: Must be called after the scenario has been computed (in float32) on business_case. The reference runs on the
+    timeseries as read (business_case.float64_df), so that the deviation includes the rounding of the inputs, or on the
+    timeseries cast back to float64 if it wasn't kept. Only the IRR and NPV deviations are flagged, the other outputs are
+    reported for information.
+    Args:
+        business_case: the business case computed in float32 mode
+        scenario_index: the row of the scenario to compare (usually the first scenario)
+        run_scenario: the function computing a scenario on a business case, takes (business_case, scenario_index)
+        tolerance: the relative deviation above which the IRR or NPV is flagged
+    """
+    reference = copy.copy(business_case)
+    reference.compute_dtype = np.float64
+    reference.df = (
+        cast_timeseries(business_case.df, np.float64)
+        if business_case.float64_df is None
+        else business_case.float64_df.copy()
+    )
+    reference.float64_df = None
+    reference.param_df = business_case.param_df.copy()
+    reference.dataflow = {}
+    for name in RESULT_CONTAINERS:
+        setattr(reference, name, {})
+    reference.traces = None
+    run_scenario(reference, scenario_index)
+
+    output_columns = list(business_case.param_df.columns)
+    output_columns = output_columns[output_columns.index("Duration") + 1 :]
+
+    rows = []
+    for column in output_columns:
+        try:
+            value_64 = float(reference.param_df.loc[scenario_index, column])
+            value_32 = float(business_case.param_df.loc[scenario_index, column])
+        except (TypeError, ValueError):
+            continue
+        deviation = abs(value_32 - value_64) / max(abs(value_64), np.finfo(float).tiny)
+        flagged = str(column).strip().lower() in ("irr", "npv") and not (
+            deviation <= tolerance
+        )
+        rows.append([column, value_64, value_32, deviation, flagged])
+        if flagged:
+            log_print(
+                f"Warning: float32 {column} deviates by {deviation:.2e} (relative) from float64, above the tolerance of {tolerance:.1e}"
+            )
+
+    report = pd.DataFrame(
+        rows,
+        columns=["Output", "float64", "float32", "Relative Deviation", "Flagged"],
+    )
+    log_print(f"Float32 accuracy report (scenario row {scenario_index}): \n {report}")
+    return report
@@ -0,0 +1,139 @@
+# ============================================================================================================================
+# rolling_quantile.py - File containing the sliding-window quantile of a timeseries, in O(n log window)
+# ============================================================================================================================
+# External Imports
+import heapq
+import math
+
+import numpy as np
+
+# ============================================================================================================================
+# The window is split into two heaps: the lower one (a max-heap) holds the k + 1 smallest values, k being the rank below the
+# quantile, the upper one (a min-heap) holds the others. Both tops are then the two values the quantile is interpolated
+# between. A value leaving the window is only marked, and dropped once it reaches the top of its heap (lazy deletion).
+
+
+class Rolling_Quantile:
+    def __init__(self, quantile: float):
+        """
+        Function purpose: Holds the values of a sliding window, sorted around one of its quantiles
+        Args:
+            quantile: the quantile, between 0 and 1
+        """
+        if not 0 <= quantile <= 1:
+            raise ValueError(f"The quantile must be between 0 and 1, not {quantile}")
+        self.quantile = quantile
+        ## Heaps of (value, position) pairs, the lower one holding negated pairs
+        self.lower: list[tuple[float, int]] = []
+        self.upper: list[tuple[float, int]] = []
+        ## Amount of values of the window in each heap, and the positions which left the window but are still in a heap
+        self.lower_size = 0
+        self.upper_size = 0
+        self.removed: set[int] = set()
+        return
+
+    def _prune(self) -> None:
+        # Drops the values which left the window from the tops of the heaps
+        while self.lower and -self.lower[0][1] in self.removed:
+            self.removed.discard(-heapq.heappop(self.lower)[1])
+        while self.upper and self.upper[0][1] in self.removed:
+            self.removed.discard(heapq.heappop(self.upper)[1])
+        return
+
+    def _rebalance(self) -> None:
+        # Moves the tops between the heaps until the lower one holds the k + 1 smallest values
+        size = self.lower_size + self.upper_size
+        target = math.floor(self.quantile * (size - 1)) + 1 if size else 0
+        while self.lower_size > target:
+            self._prune()
+            value, position = heapq.heappop(self.lower)
+            heapq.heappush(self.upper, (-value, -position))
+            self.lower_size -= 1
+            self.upper_size += 1
+        while self.lower_size < target:
+            self._prune()
+            value, position = heapq.heappop(self.upper)
+            heapq.heappush(self.lower, (-value, -position))
+            self.upper_size -= 1
+            self.lower_size += 1
+        self._prune()
+        return
+
+    def add(self, value: float, position: int) -> None:
+        """
+        Function purpose: Adds a value to the window
+        Args:
+            value: the value (not NaN)
+            position: the position of the value in the timeseries, unique
+        """
+        if self.lower_size and (value, position) <= (
+            -self.lower[0][0],
+            -self.lower[0][1],
+        ):
+            heapq.heappush(self.lower, (-value, -position))
+            self.lower_size += 1
+        else:
+            heapq.heappush(self.upper, (value, position))
+            self.upper_size += 1
+        self._rebalance()
+        return
+
+    def remove(self, value: float, position: int) -> None:
+        """
+        Function purpose: Removes a value from the window
+        Args:
+            value: the value, as it was added
+            position: the position it was added with
+        """
+        self.removed.add(position)
+        if self.lower_size and (value, position) <= (
+            -self.lower[0][0],
+            -self.lower[0][1],
+        ):
+            self.lower_size -= 1
+        else:
+            self.upper_size -= 1
+        self._rebalance()
+        return
+
+    def value(self) -> float:
+        """
+        Function purpose: Gives the quantile of the window, linearly interpolated between the closest ranks (as pandas) \n
+        Outputs: the quantile, NaN if the window is empty
+        """
+        size = self.lower_size + self.upper_size
+        if not size:
+            return np.nan
+        rank = self.quantile * (size - 1)
+        below = -self.lower[0][0]
+        if not self.upper_size or rank == math.floor(rank):
+            return below
+        return below + (rank - math.floor(rank)) * (self.upper[0][0] - below)
+
+
+def rolling_quantile(values: np.ndarray, window: int, quantile: float) -> np.ndarray:
+    """
+    Function purpose: Computes the quantile of a timeseries over a trailing window \n
+    Outputs: for each timestep, the quantile of the values of the last window timesteps (itself included)
+    Note: Same result as pd.Series(values).rolling(window, min_periods=1).quantile(quantile), the NaN values being
+    skipped, in O(n log window) instead of sorting every window.
+    Args:
+        values: the timeseries
+        window: the amount of timesteps of the window
+        quantile: the quantile, between 0 and 1
+    """
+    if window < 1:
+        raise ValueError(f"The window must hold at least 1 timestep, not {window}")
+    values = np.asarray(values, dtype=np.float64)
+    present = ~np.isnan(values)
+    entries = values.tolist()
+    window_quantile = Rolling_Quantile(quantile)
+    result = np.empty(len(entries))
+    for position, value in enumerate(entries):
+        if present[position]:
+            window_quantile.add(value, position)
+        leaving = position - window
+        if leaving >= 0 and present[leaving]:
+            window_quantile.remove(entries[leaving], leaving)
+        result[position] = window_quantile.value()
+    return result
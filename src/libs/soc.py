@@ -0,0 +1,476 @@
+# ============================================================================================================================
+# soc.py - File containing the State-Of-Charge (SOC) engines used by the BC methods
+# ============================================================================================================================
+# External Imports
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+import numpy as np
+
+# ============================================================================================================================
+# Internal Imports
+from libs.logger import log_print
+
+# ============================================================================================================================
+# Every step of the SOC recurrence, soc = clip(soc + x[i] * dt, 0, capacity), is a clamped-affine map s -> clip(s + a, lo, hi).
+# Composing two such maps gives another one, so the whole recurrence is an associative scan which can be split across cores.
+
+# Below this amount of rows the chunking overhead outweighs the gain of the parallel engine
+PARALLEL_MIN_ROWS: int = 500_000
+
+
+def soc_sequential(
+    max_charge_discharge: np.ndarray,
+    settlement_period: float,
+    capacity: float,
+    initial_soc: float = 0.0,
+) -> np.ndarray:
+    """
+    Function purpose: Computes the end-of-period SOC one timestep after the other (the reference engine) \n
+    Outputs: an array containing the SOC at the end of every timestep
+    Args:
+        max_charge_discharge: the charging (>0) or discharging (<0) power requested at each timestep
+        settlement_period: the length of a timestep as a fraction of an hour
+        capacity: the storage capacity, the SOC is clipped between 0 and this value
+        initial_soc: the SOC before the first timestep
+    """
+    capacity = float(capacity)
+    soc_val = float(initial_soc)
+    soc_values = []
+    for power in (np.asarray(max_charge_discharge) * settlement_period).tolist():
+        soc_val = min(max(soc_val + power, 0.0), capacity)
+        soc_values.append(soc_val)
+    return np.array(soc_values, dtype=float)
+
+
+def soc_bounded(
+    max_charge_discharge: np.ndarray,
+    settlement_period: float,
+    capacity: float,
+    floors: np.ndarray | float,
+    ceilings: np.ndarray | float,
+    initial_soc: float = 0.0,
+) -> np.ndarray:
+    """
+    Function purpose: Computes the end-of-period SOC of a storage which doesn't discharge below a floor nor charge above a
+    ceiling (ex: a share of the capacity kept for balancing) \n
+    Outputs: an array containing the SOC at the end of every timestep
+    Note: A discharge stops at the floor and a charge at the ceiling, a SOC already beyond a bound isn't moved by it:
+    soc = median(soc, soc + x[i] * dt, bound), clipped between 0 and capacity. These steps aren't clamped-affine maps, so
+    this engine is stepped one timestep after the other like soc_sequential. With a floor of 0 and a ceiling of capacity
+    it gives the same result as soc_sequential.
+    Args:
+        max_charge_discharge: the charging (>0) or discharging (<0) power requested at each timestep
+        settlement_period: the length of a timestep as a fraction of an hour
+        capacity: the storage capacity, the SOC is clipped between 0 and this value
+        floors: the SOC below which the storage doesn't discharge, for every timestep or all of them
+        ceilings: the SOC above which the storage doesn't charge, for every timestep or all of them
+        initial_soc: the SOC before the first timestep
+    """
+    length = len(max_charge_discharge)
+    capacity = float(capacity)
+    soc_val = float(initial_soc)
+    soc_values = []
+    for power, floor, ceiling in zip(
+        (np.asarray(max_charge_discharge) * settlement_period).tolist(),
+        np.broadcast_to(np.asarray(floors, dtype=float), length).tolist(),
+        np.broadcast_to(np.asarray(ceilings, dtype=float), length).tolist(),
+    ):
+        if power < 0:
+            soc_val = min(soc_val, max(soc_val + power, floor))
+        elif power > 0:
+            soc_val = max(soc_val, min(soc_val + power, ceiling))
+        soc_val = min(max(soc_val, 0.0), capacity)
+        soc_values.append(soc_val)
+    return np.array(soc_values, dtype=float)
+
+
+# _____________________________________________________________________________________________________________________________
+def compose_clamp(
+    first: tuple[np.ndarray, np.ndarray, np.ndarray],
+    second: tuple[np.ndarray, np.ndarray, np.ndarray],
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Function purpose: Composes two (arrays of) clamped-affine maps s -> clip(s + a, lo, hi), applying first then second \n
+    Outputs: the (a, lo, hi) triplet of the composed map
+    Args:
+        first: the (a, lo, hi) triplet of the map applied first
+        second: the (a, lo, hi) triplet of the map applied second
+    """
+    a_1, lo_1, hi_1 = first
+    a_2, lo_2, hi_2 = second
+    return (
+        a_1 + a_2,
+        np.clip(lo_1 + a_2, lo_2, hi_2),
+        np.clip(hi_1 + a_2, lo_2, hi_2),
+    )
+
+
+def scan_clamp(
+    steps: np.ndarray, lower: float, upper: float
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Function purpose: Computes, for every timestep, the composition of all the clamped-affine maps up to that timestep \n
+    Outputs: the (a, lo, hi) triplets of the prefix maps, so that soc[i] = clip(initial_soc + a[i], lo[i], hi[i])
+    Note: This is a Hillis-Steele scan, it does log2(n) vectorized passes instead of n scalar steps
+    Args:
+        steps: the energy added (>0) or removed (<0) at each timestep
+        lower: the lower clamp of every step (0)
+        upper: the upper clamp of every step (the capacity)
+    """
+    a = np.array(steps, dtype=float)
+    lo = np.full(len(a), lower, dtype=float)
+    hi = np.full(len(a), upper, dtype=float)
+
+    offset = 1
+    while offset < len(a):
+        a_new, lo_new, hi_new = compose_clamp(
+            (a[:-offset], lo[:-offset], hi[:-offset]),
+            (a[offset:], lo[offset:], hi[offset:]),
+        )
+        a[offset:], lo[offset:], hi[offset:] = a_new, lo_new, hi_new
+        offset *= 2
+    return a, lo, hi
+
+
+def soc_parallel_prefix(
+    max_charge_discharge: np.ndarray,
+    settlement_period: float,
+    capacity: float,
+    initial_soc: float = 0.0,
+    n_chunks: int | None = None,
+    max_workers: int | None = None,
+) -> np.ndarray:
+    """
+    Function purpose: Computes the end-of-period SOC by splitting the timeseries into chunks which are solved in parallel \n
+    Outputs: an array containing the SOC at the end of every timestep
+    Note: Each chunk's clamp map is composed in its own thread (numpy releases the GIL), the chunk-entry SOCs are then
+    propagated from one chunk to the next and finally every chunk is filled in parallel.
+    Args:
+        max_charge_discharge: the charging (>0) or discharging (<0) power requested at each timestep
+        settlement_period: the length of a timestep as a fraction of an hour
+        capacity: the storage capacity, the SOC is clipped between 0 and this value
+        initial_soc: the SOC before the first timestep
+        n_chunks: the number of chunks to split the timeseries into (defaults to the number of workers)
+        max_workers: the number of threads to use (defaults to the number of cores)
+    """
+    steps = np.asarray(max_charge_discharge, dtype=float) * settlement_period
+    if len(steps) == 0:
+        return steps
+
+    max_workers = max_workers or os.cpu_count() or 1
+    n_chunks = max(1, min(n_chunks or max_workers, len(steps)))
+    chunks = np.array_split(steps, n_chunks)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        prefix_maps = list(
+            executor.map(lambda chunk: scan_clamp(chunk, 0.0, float(capacity)), chunks)
+        )
+
+        # Propagate the SOC from the entry of one chunk to the entry of the next (n_chunks steps only)
+        entry_socs = [float(initial_soc)]
+        for a, lo, hi in prefix_maps[:-1]:
+            entry_socs.append(min(max(entry_socs[-1] + a[-1], lo[-1]), hi[-1]))
+
+        soc_chunks = list(
+            executor.map(
+                lambda args: np.clip(args[0] + args[1][0], args[1][1], args[1][2]),
+                zip(entry_socs, prefix_maps),
+            )
+        )
+    return np.concatenate(soc_chunks)
+
+
+# _____________________________________________________________________________________________________________________________
+class Soc_Runs:
+    def __init__(
+        self,
+        starts: np.ndarray,
+        ends: np.ndarray,
+        directions: np.ndarray,
+        entry_socs: np.ndarray,
+        exit_socs: np.ndarray,
+        cumulative: np.ndarray,
+        capacity: float,
+    ):
+        """
+        Function purpose: Holds the compact output of the event-driven engine: one entry per run of same-signed steps
+        Args:
+            starts: the index of the first timestep of each run
+            ends: the index after the last timestep of each run
+            directions: +1 for a charging run, -1 for a discharging run and 0 for an idle run
+            entry_socs: the SOC at the start of each run
+            exit_socs: the SOC at the end of each run
+            cumulative: the cumulative sum of the steps, starting with a 0
+            capacity: the storage capacity
+        """
+        self.starts = starts
+        self.ends = ends
+        self.directions = directions
+        self.entry_socs = entry_socs
+        self.exit_socs = exit_socs
+        self.cumulative = cumulative
+        self.capacity = capacity
+        return
+
+    def final_soc(self) -> float:
+        """
+        Function purpose: Gives the SOC at the end of the simulation without expanding the runs \n
+        Outputs: the final SOC
+        """
+        return float(self.exit_socs[-1]) if len(self.exit_socs) else 0.0
+
+    def expand(self) -> np.ndarray:
+        """
+        Function purpose: Expands the runs back into the per-timestep SOC \n
+        Outputs: an array containing the SOC at the end of every timestep
+        """
+        lengths = self.ends - self.starts
+        directions = np.repeat(self.directions, lengths)
+        unclipped = np.repeat(self.entry_socs, lengths) + (
+            self.cumulative[1:] - np.repeat(self.cumulative[self.starts], lengths)
+        )
+        return np.where(
+            directions > 0,
+            np.minimum(unclipped, self.capacity),
+            np.where(
+                directions < 0,
+                np.maximum(unclipped, 0.0),
+                np.repeat(self.entry_socs, lengths),
+            ),
+        )
+
+
+def soc_event_driven(
+    max_charge_discharge: np.ndarray,
+    settlement_period: float,
+    capacity: float,
+    initial_soc: float = 0.0,
+    expand: bool = True,
+) -> np.ndarray | Soc_Runs:
+    """
+    Function purpose: Computes the SOC by jumping from one sign change of the charging/discharging signal to the next \n
+    Outputs: an array containing the SOC at the end of every timestep, or the compact Soc_Runs if expand is False
+    Note: Within a run of same-signed steps the SOC is monotonic, so only one of the two clamps can be hit and the SOC at the
+    end of the run is known analytically from a cumulative sum. Idle runs and runs where the storage is already full (or empty)
+    therefore cost a single step, making the cost proportional to the number of runs instead of the number of timesteps.
+    Args:
+        max_charge_discharge: the charging (>0) or discharging (<0) power requested at each timestep
+        settlement_period: the length of a timestep as a fraction of an hour
+        capacity: the storage capacity, the SOC is clipped between 0 and this value
+        initial_soc: the SOC before the first timestep
+        expand: if True returns the per-timestep SOC, otherwise only the runs
+    """
+    steps = np.asarray(max_charge_discharge, dtype=float) * settlement_period
+    capacity = float(capacity)
+    signs = np.sign(steps).astype(np.int8)
+
+    # Run-length encode the sign of the signal
+    boundaries = np.flatnonzero(signs[1:] != signs[:-1]) + 1
+    starts = np.concatenate(([0], boundaries)) if len(steps) else boundaries
+    ends = np.concatenate((boundaries, [len(steps)])) if len(steps) else boundaries
+    directions = signs[starts]
+    cumulative = np.concatenate(([0.0], np.cumsum(steps)))
+    deltas = cumulative[ends] - cumulative[starts]
+
+    entry_socs = []
+    exit_socs = []
+    soc_val = float(initial_soc)
+    for direction, delta in zip(directions.tolist(), deltas.tolist()):
+        entry_socs.append(soc_val)
+        if direction > 0:
+            soc_val = min(soc_val + delta, capacity)
+        elif direction < 0:
+            soc_val = max(soc_val + delta, 0.0)
+        exit_socs.append(soc_val)
+
+    runs = Soc_Runs(
+        starts,
+        ends,
+        directions,
+        np.array(entry_socs, dtype=float),
+        np.array(exit_socs, dtype=float),
+        cumulative,
+        capacity,
+    )
+    if expand:
+        return runs.expand()
+    return runs
+
+
+# _____________________________________________________________________________________________________________________________
+def soc_batched(
+    max_charge_discharge: np.ndarray,
+    settlement_period: float,
+    capacities: np.ndarray,
+    initial_soc: float = 0.0,
+    floors: np.ndarray | None = None,
+    ceilings: np.ndarray | None = None,
+) -> np.ndarray:
+    """
+    Function purpose: Computes the end-of-period SOC of several scenarios at once (ex: a block of a parameter sweep) \n
+    Outputs: a (scenarios x timesteps) array containing the SOC of every scenario at the end of every timestep
+    Note: The recurrence is still stepped one timestep after the other, but each step updates every scenario with a single
+    vectorized operation, so the cost of the loop is shared by the whole block. The result is the same as soc_sequential's
+    (soc_bounded's with floors and ceilings).
+    Args:
+        max_charge_discharge: a (scenarios x timesteps) array of the charging (>0) or discharging (<0) power requested
+        settlement_period: the length of a timestep as a fraction of an hour
+        capacities: the storage capacity of each scenario
+        initial_soc: the SOC before the first timestep
+        floors: a (scenarios x timesteps) array of the SOC below which the storage doesn't discharge, None for 0
+        ceilings: a (scenarios x timesteps) array of the SOC above which the storage doesn't charge, None for the capacity
+    """
+    # Timesteps along the first axis so that each step reads a contiguous row
+    steps = np.ascontiguousarray(
+        (np.asarray(max_charge_discharge, dtype=float) * settlement_period).T
+    )
+    capacities = np.asarray(capacities, dtype=float)
+    soc_values = np.empty_like(steps)
+    soc_val = np.full(steps.shape[1], float(initial_soc))
+    if floors is not None or ceilings is not None:
+        floors = np.ascontiguousarray(
+            np.broadcast_to(0.0 if floors is None else floors, steps.T.shape).T
+        )
+        ceilings = np.ascontiguousarray(
+            np.broadcast_to(
+                capacities[:, None] if ceilings is None else ceilings, steps.T.shape
+            ).T
+        )
+        for step, floor, ceiling, soc_row in zip(steps, floors, ceilings, soc_values):
+            target = soc_val + step
+            soc_val = np.where(
+                step < 0,
+                np.minimum(soc_val, np.maximum(target, floor)),
+                np.maximum(soc_val, np.minimum(target, ceiling)),
+            )
+            np.maximum(soc_val, 0.0, out=soc_val)
+            np.minimum(soc_val, capacities, out=soc_val)
+            soc_row[:] = soc_val
+        return soc_values.T
+    for step, soc_row in zip(steps, soc_values):
+        np.add(soc_val, step, out=soc_val)
+        np.maximum(soc_val, 0.0, out=soc_val)
+        np.minimum(soc_val, capacities, out=soc_val)
+        soc_row[:] = soc_val
+    return soc_values.T
+
+
+def restart_rows(length: int, period: int, offset: int = 0) -> np.ndarray:
+    """
+    Function purpose: Finds the timesteps before which soc_restarting empties the storage \n
+    Outputs: the rows offset + k x period within the timeseries, the first row excluded (nothing is carried into it)
+    Args:
+        length: the amount of timesteps
+        period: the amount of timesteps between two restarts
+        offset: the first restart
+    """
+    rows = np.arange(offset % period, length, period)
+    return rows[rows > 0]
+
+
+def soc_restarting(
+    max_charge_discharge: np.ndarray,
+    settlement_period: float,
+    capacity: float,
+    period: int,
+    offset: int = 0,
+    floors: np.ndarray | float | None = None,
+    ceilings: np.ndarray | float | None = None,
+) -> np.ndarray:
+    """
+    Function purpose: Computes the end-of-period SOC of a storage emptied every period timesteps (ex: at the start of
+    every block of days of a bootstrap) \n
+    Outputs: an array containing the SOC at the end of every timestep
+    Note: The storage is empty before timestep 0 and before every timestep offset + k x period (see restart_rows), the
+    emptying moving no power. The segments are solved at once with soc_batched, the first (partial) segment being padded
+    with idle timesteps.
+    Args:
+        max_charge_discharge: the charging (>0) or discharging (<0) power requested at each timestep
+        settlement_period: the length of a timestep as a fraction of an hour
+        capacity: the storage capacity, the SOC is clipped between 0 and this value
+        period: the amount of timesteps between two restarts
+        offset: the first restart
+        floors: the SOC below which the storage doesn't discharge, for every timestep or all of them (see soc_bounded)
+        ceilings: the SOC above which the storage doesn't charge, for every timestep or all of them
+    """
+    length = len(max_charge_discharge)
+    padding_front = (period - offset % period) % period
+    padding_back = -(length + padding_front) % period
+
+    def segments(values: np.ndarray | float) -> np.ndarray:
+        # The padding timesteps are idle, their bounds don't matter
+        return np.concatenate(
+            (
+                np.zeros(padding_front),
+                np.broadcast_to(np.asarray(values, dtype=float), length),
+                np.zeros(padding_back),
+            )
+        ).reshape(-1, period)
+
+    requests = segments(max_charge_discharge)
+    soc_values = soc_batched(
+        requests,
+        settlement_period,
+        np.full(len(requests), float(capacity)),
+        floors=None if floors is None else segments(floors),
+        ceilings=None if ceilings is None else segments(ceilings),
+    )
+    return soc_values.ravel()[padding_front : padding_front + length]
+
+
+# _____________________________________________________________________________________________________________________________
+SOC_ENGINES: dict[str, Callable[..., np.ndarray]] = {
+    "sequential": soc_sequential,
+    "parallel": soc_parallel_prefix,
+    "event": soc_event_driven,
+}
+
+
+def simulate_soc(
+    max_charge_discharge: np.ndarray,
+    settlement_period: float,
+    capacity: float,
+    engine: str = "auto",
+    initial_soc: float = 0.0,
+    floors: np.ndarray | float | None = None,
+    ceilings: np.ndarray | float | None = None,
+) -> np.ndarray:
+    """
+    Function purpose: Entry point to the SOC engines, picks the engine to use and runs it \n
+    Outputs: an array containing the SOC at the end of every timestep
+    Note: "auto" uses the parallel engine for long timeseries (see PARALLEL_MIN_ROWS) and the sequential one otherwise. With
+    SOC floors or ceilings the bounded engine is always used (see soc_bounded).
+    Args:
+        max_charge_discharge: the charging (>0) or discharging (<0) power requested at each timestep
+        settlement_period: the length of a timestep as a fraction of an hour
+        capacity: the storage capacity, the SOC is clipped between 0 and this value
+        engine: the name of the engine to use (a key of SOC_ENGINES or "auto")
+        initial_soc: the SOC before the first timestep
+        floors: the SOC below which the storage doesn't discharge, None for 0
+        ceilings: the SOC above which the storage doesn't charge, None for the capacity
+    """
+    if floors is not None or ceilings is not None:
+        log_print("Computing SOC with the bounded engine")
+        return soc_bounded(
+            max_charge_discharge,
+            settlement_period,
+            capacity,
+            0.0 if floors is None else floors,
+            capacity if ceilings is None else ceilings,
+            initial_soc,
+        )
+    if engine == "auto":
+        if len(max_charge_discharge) >= PARALLEL_MIN_ROWS and (os.cpu_count() or 1) > 1:
+            engine = "parallel"
+        else:
+            engine = "sequential"
+    if engine not in SOC_ENGINES:
+        raise ValueError(
+            f"Invalid SOC engine '{engine}'. Use one of {list(SOC_ENGINES)} or 'auto'."
+        )
+    log_print(f"Computing SOC with the {engine} engine")
+    return SOC_ENGINES[engine](
+        max_charge_discharge, settlement_period, capacity, initial_soc
+    )
@@ -0,0 +1,176 @@
+# ============================================================================================================================
+# trace_store.py - File containing the compact store of the per-scenario dispatch traces (for deferred plots and exports)
+# ============================================================================================================================
+# External Imports
+import zlib
+from typing import Any, Sequence
+
+import numpy as np
+import pandas as pd
+
+# ============================================================================================================================
+# Internal Imports
+from libs.logger import log_print
+
+# ============================================================================================================================
+
+# Columns kept for every scenario
+TRACE_COLUMNS: tuple[str, ...] = ("end_soc_values", "eff_charge_discharge")
+
+# Supported encodings: float32, or 16 bit integers spread between the min and the max of the trace
+TRACE_ENCODINGS: tuple[str, ...] = ("float32", "int16")
+
+
+class Trace:
+    def __init__(self, values: np.ndarray, encoding: str, compress: bool):
+        """
+        Function purpose: Encodes (and optionally compresses) a single trace
+        Note: A trace holding NaNs or infinities can't be quantized, it is then kept in float32
+        Args:
+            values: the trace
+            encoding: "float32" or "int16"
+            compress: if True the encoded trace is compressed with zlib
+        """
+        values = np.asarray(values, dtype=np.float64)
+        self.length = len(values)
+        self.offset = 0.0
+        self.scale = 1.0
+
+        if encoding == "int16" and len(values) and np.isfinite(values).all():
+            self.offset = float(values.min())
+            self.scale = (float(values.max()) - self.offset) / 65535 or 1.0
+            encoded = (np.round((values - self.offset) / self.scale) - 32768).astype(
+                np.int16
+            )
+        else:
+            encoding = "float32"
+            encoded = values.astype(np.float32)
+
+        self.encoding = encoding
+        self.compressed = compress
+        payload = encoded.tobytes()
+        self.payload = zlib.compress(payload, 1) if compress else payload
+        return
+
+    def decode(self) -> np.ndarray:
+        """
+        Function purpose: Decodes the trace \n
+        Outputs: the trace as a float64 array (quantized traces are within half a quantization step of the original)
+        """
+        payload = zlib.decompress(self.payload) if self.compressed else self.payload
+        if self.encoding == "int16":
+            encoded = np.frombuffer(payload, dtype=np.int16, count=self.length)
+            return (encoded.astype(np.float64) + 32768) * self.scale + self.offset
+        return np.frombuffer(payload, dtype=np.float32, count=self.length).astype(
+            np.float64
+        )
+
+
+class Trace_Store:
+    def __init__(
+        self,
+        encoding: str = "float32",
+        compress: bool = False,
+        columns: Sequence[str] = TRACE_COLUMNS,
+    ):
+        """
+        Function purpose: Keeps, for every computed scenario, its dispatch traces and its aggregates
+        Args:
+            encoding: the encoding of the traces, one of TRACE_ENCODINGS
+            compress: if True the traces are compressed with zlib
+            columns: the columns to keep for every scenario
+        """
+        if encoding not in TRACE_ENCODINGS:
+            raise ValueError(
+                f"Invalid trace encoding '{encoding}'. Use one of {list(TRACE_ENCODINGS)}."
+            )
+        self.encoding = encoding
+        self.compress = compress
+        self.columns = tuple(columns)
+        self.traces: dict[str, dict[str, Trace]] = {}
+        self.scenario_values: dict[str, dict[str, Any]] = {}
+        return
+
+    def add(self, scenario_name: str, business_case: Any) -> None:
+        """
+        Function purpose: Stores the traces and aggregates of the scenario which was just computed
+        Args:
+            scenario_name: the name of the scenario
+            business_case: the business case the scenario was computed on
+        """
+        self.traces[scenario_name] = {
+            column: Trace(
+                business_case.column(column).to_numpy(), self.encoding, self.compress
+            )
+            for column in self.columns
+        }
+        self.scenario_values[scenario_name] = {
+            "power_level": business_case.power_level,
+            "aggregates": business_case.aggregates,
+        }
+        return
+
+    def get(self, scenario_name: str, column: str) -> np.ndarray:
+        """
+        Function purpose: Gives a stored trace \n
+        Outputs: the decoded trace
+        Args:
+            scenario_name: the name of the scenario
+            column: the name of the column
+        """
+        return self.traces[scenario_name][column].decode()
+
+    def scenarios(self) -> list[str]:
+        """
+        Function purpose: Lists the stored scenarios \n
+        Outputs: the names of the stored scenarios, in the order they were computed
+        """
+        return list(self.traces)
+
+    def restore(self, scenario_name: str, business_case: Any) -> None:
+        """
+        Function purpose: Puts a stored scenario back on the business case, so that the plots can be drawn after the run
+        Args:
+            scenario_name: the name of the scenario
+            business_case: the business case to restore the scenario on
+        """
+        business_case.power_level = self.scenario_values[scenario_name]["power_level"]
+        business_case.aggregates = self.scenario_values[scenario_name]["aggregates"]
+        business_case.columns = {
+            column: self.get(scenario_name, column) for column in self.columns
+        }
+        return
+
+    def to_dataframe(
+        self, column: str, scenario_names: Sequence[str] | None = None
+    ) -> pd.DataFrame:
+        """
+        Function purpose: Gathers a trace of several scenarios side by side (ex: to export or compare them) \n
+        Outputs: a dataframe with one column per scenario
+        Args:
+            column: the name of the trace
+            scenario_names: the scenarios to gather, all of them if None
+        """
+        if scenario_names is None:
+            scenario_names = self.scenarios()
+        return pd.DataFrame({name: self.get(name, column) for name in scenario_names})
+
+    def nbytes(self) -> int:
+        """
+        Function purpose: Computes the memory used by the stored traces \n
+        Outputs: the size of the stored traces in bytes
+        """
+        return sum(
+            len(trace.payload)
+            for traces in self.traces.values()
+            for trace in traces.values()
+        )
+
+    def log_size(self) -> None:
+        """
+        Function purpose: Logs the amount of stored scenarios and the memory they use
+        """
+        log_print(
+            f"Trace store: {len(self.traces)} scenario(s), {self.nbytes() / 1e6:.2f} MB ({self.encoding}{', compressed' if self.compress else ''})"
+        )
+        return
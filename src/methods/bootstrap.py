@@ -0,0 +1,290 @@
+# ============================================================================================================================
+# bootstrap.py - File containing the block bootstrap of the outputs of a scenario over resampled blocks of days
+# ============================================================================================================================
+# External Imports
+import math
+
+import numpy as np
+import pandas as pd
+
+# ============================================================================================================================
+# Internal Imports
+from libs.aggregates import SOC_BINS, Scenario_Aggregates, period_sums
+from libs.dataflow import Dataflow_View
+from libs.logger import log_print
+from methods.engine import (
+    Method_Profile,
+    compute_outputs,
+    outputs_from_aggregates,
+    read_scenario,
+    scenario_view,
+    select_layout,
+    summed_columns,
+)
+from modify.bca_class import Business_Case
+
+# ============================================================================================================================
+
+# How the SOC is handled at the boundaries of the resampled blocks
+SOC_MODES: tuple[str, ...] = (
+    "carry",  # every day keeps the SOC it had in the simulation of the whole timeseries
+    "restart",  # every block starts from an empty storage
+)
+
+
+class Daily_Aggregates:
+    def __init__(self, sums: dict[str, np.ndarray], soc_exit: np.ndarray):
+        """
+        Function purpose: Holds the per-day partial sums of a scenario, one row per simulation of the scenario (one per
+        restart offset with the "restart" SOC mode, a single one with "carry")
+        Args:
+            sums: for each summed column, an (offsets x days) array of its sum over every day
+            soc_exit: an (offsets x days) array of the SOC at the end of every day
+        """
+        self.sums = sums
+        self.soc_exit = soc_exit
+        return
+
+
+class Bootstrap_Result:
+    def __init__(
+        self,
+        scenario_name: str,
+        outputs: list[str],
+        point: list[float],
+        replicates: np.ndarray,
+        confidence: float,
+    ):
+        """
+        Function purpose: Holds the outputs of a scenario over the bootstrap replicates
+        Args:
+            scenario_name: the name of the scenario
+            outputs: the names of the outputs (the output columns of param_df)
+            point: the outputs of the scenario on the timeseries itself
+            replicates: a (replicates x outputs) array of the outputs of every replicate
+            confidence: the level of the confidence intervals (ex: 0.9)
+        """
+        self.scenario_name = scenario_name
+        self.outputs = outputs
+        self.point = point
+        self.replicates = replicates
+        self.confidence = confidence
+        return
+
+    def intervals(self) -> pd.DataFrame:
+        """
+        Function purpose: Gives the percentile confidence interval of every output \n
+        Outputs: a dataframe with, for each output, its value on the timeseries, the mean and standard deviation over the
+        replicates and the bounds of the interval (replicates where an output can't be computed are ignored)
+        """
+        tail = (1 - self.confidence) / 2 * 100
+        rows = []
+        for i, output in enumerate(self.outputs):
+            values = self.replicates[:, i]
+            values = values[np.isfinite(values)]
+            if len(values) == 0:
+                low = high = mean = std = np.nan
+            else:
+                low, high = np.percentile(values, (tail, 100 - tail))
+                mean, std = float(np.mean(values)), float(np.std(values))
+            rows.append(
+                [self.scenario_name, output, self.point[i], mean, std, low, high]
+            )
+        return pd.DataFrame(
+            rows,
+            columns=[
+                "Scenario",
+                "Output",
+                "Value",
+                "Bootstrap Mean",
+                "Bootstrap Std",
+                f"CI Low ({self.confidence:.0%})",
+                f"CI High ({self.confidence:.0%})",
+            ],
+        )
+
+
+def daily_aggregates(
+    business_case: Business_Case,
+    profile: Method_Profile,
+    scenario: dict[str, object],
+    sum_names: list[str],
+    rows_per_day: int,
+    restart_days: int | None,
+) -> Daily_Aggregates:
+    """
+    Function purpose: Computes the per-day partial sums and end-of-day SOC of a scenario \n
+    Outputs: the Daily_Aggregates of the scenario
+    Note: With restart_days, the scenario is simulated once per offset, the storage being emptied every restart_days days
+    from that offset, so that every block of restart_days days starting on any day has been simulated from empty.
+    Args:
+        business_case: the class which contains all useful information about the business case
+        profile: the profile of the method
+        scenario: the scenario parameters (see read_scenario)
+        sum_names: the columns to sum
+        rows_per_day: the amount of timesteps per day
+        restart_days: the length of the blocks starting from an empty storage, None to carry the SOC over
+    """
+    graph = scenario_view(business_case, profile, scenario).graph
+    if restart_days is None:
+        restarts = [None]
+    else:
+        restarts = [
+            (restart_days * rows_per_day, offset * rows_per_day)
+            for offset in range(restart_days)
+        ]
+
+    sums: dict[str, list[np.ndarray]] = {name: [] for name in dict.fromkeys(sum_names)}
+    soc_exit = []
+    for restart in restarts:
+        columns = Dataflow_View(graph, {**scenario, "soc_restart": restart})
+        if restart is not None:
+            # Emptying the storage at a restart moves no power (see charge_discharge): no timestep may move more than the
+            # power requested by the dispatch, itself within the power rating
+            excess = np.nanmax(
+                np.abs(columns["charge_discharge"])
+                - np.abs(columns["maximum_charge_discharge"]),
+                initial=0.0,
+            )
+            if excess > 1e-4 * scenario["power_level"]:
+                raise ValueError(
+                    f"The storage moves {excess:.2f} MW more than requested in the restart mode, a restart must move no power"
+                )
+        for name in sums:
+            sums[name].append(period_sums(columns[name], rows_per_day))
+        end_soc_values = np.asarray(columns["end_soc_values"], dtype=np.float64)
+        day_ends = np.minimum(
+            np.arange(rows_per_day, len(end_soc_values) + rows_per_day, rows_per_day),
+            len(end_soc_values),
+        )
+        soc_exit.append(end_soc_values[day_ends - 1])
+    return Daily_Aggregates(
+        {name: np.stack(values) for name, values in sums.items()}, np.stack(soc_exit)
+    )
+
+
+def resample_days(
+    full_days: int, block_days: int, replicates: int, rng: np.random.Generator
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Function purpose: Draws the days of the replicates, as blocks of consecutive days drawn with replacement \n
+    Outputs: two (replicates x full_days) arrays: the day each day of each replicate is taken from, and the first day of
+    its block modulo block_days (the restart offset whose simulation holds the block)
+    Args:
+        full_days: the amount of full days of the timeseries
+        block_days: the amount of days per block
+        replicates: the amount of replicates
+        rng: the random generator
+    """
+    blocks = math.ceil(full_days / block_days)
+    starts = rng.integers(0, full_days - block_days + 1, (replicates, blocks))
+    days = (starts[:, :, None] + np.arange(block_days)).reshape(replicates, -1)
+    offsets = np.repeat(starts % block_days, block_days, axis=1)
+    return days[:, :full_days], offsets[:, :full_days]
+
+
+# _____________________________________________________________________________________________________________________________
+def bootstrap_scenario(
+    business_case: Business_Case,
+    scenario_index: int,
+    profile: Method_Profile,
+    replicates: int,
+    block_days: int,
+    soc_mode: str = "carry",
+    confidence: float = 0.9,
+    seed: int = 0,
+) -> Bootstrap_Result:
+    """
+    Function purpose: Estimates how much the outputs of a scenario depend on the days of the timeseries, by recomputing
+    them on timeseries rebuilt from resampled blocks of consecutive days \n
+    Outputs: the Bootstrap_Result of the scenario
+    Note: The scenario is simulated once (or once per offset with the "restart" SOC mode) and reduced to per-day partial
+    sums, each replicate then only adds up the sums of its days, which costs O(days) instead of O(timesteps). A trailing
+    partial day is kept at the end of every replicate, as simulated. With "carry" the final SOC of a replicate is the SOC
+    its last day ended on.
+    Args:
+        business_case: the class which contains all useful information about the business case
+        scenario_index: the row number of the scenario
+        profile: the profile of the method
+        replicates: the amount of bootstrap replicates
+        block_days: the amount of consecutive days per resampled block
+        soc_mode: one of SOC_MODES
+        confidence: the level of the confidence intervals
+        seed: the seed of the resampling, the same seed gives the same replicates
+    """
+    if soc_mode not in SOC_MODES:
+        raise ValueError(
+            f"Invalid SOC mode '{soc_mode}'. Use one of {list(SOC_MODES)}."
+        )
+    if business_case.row_weights is not None:
+        raise ValueError(
+            "The bootstrap needs the whole timeseries, not representative days"
+        )
+    rows_per_day = 24 * 60 / business_case.input_values["Settlement Period"]
+    if not rows_per_day.is_integer():
+        raise ValueError("The settlement period must divide a day to resample days")
+    rows_per_day = int(rows_per_day)
+    full_days = len(business_case.df) // rows_per_day
+    if full_days < block_days:
+        raise ValueError(
+            f"The timeseries covers {full_days} days, less than a bootstrap block of {block_days} days"
+        )
+
+    scenario = read_scenario(business_case, scenario_index)
+    columns = scenario_view(business_case, profile, scenario)
+    layout = select_layout(profile, columns)
+    point = compute_outputs(business_case, profile, columns, scenario)
+    # The cycles aren't resampled: every replicate wears the storage as the whole timeseries does (see degradation)
+    cycles = business_case.aggregates.cycles
+
+    daily = daily_aggregates(
+        business_case,
+        profile,
+        scenario,
+        summed_columns(layout),
+        rows_per_day,
+        block_days if soc_mode == "restart" else None,
+    )
+    rng = np.random.default_rng(seed)
+    days, offsets = resample_days(full_days, block_days, replicates, rng)
+    if soc_mode == "carry":
+        offsets = np.zeros_like(offsets)
+    partial_day = len(business_case.df) % rows_per_day > 0
+
+    sums = {
+        name: values[offsets, days].sum(axis=1)
+        + (values[0, -1] if partial_day else 0.0)
+        for name, values in daily.sums.items()
+    }
+    if partial_day:
+        final_soc = np.full(replicates, daily.soc_exit[0, -1])
+    else:
+        final_soc = daily.soc_exit[offsets[:, -1], days[:, -1]]
+
+    values = np.full((replicates, len(layout)), np.nan)
+    for replicate in range(replicates):
+        aggregates = Scenario_Aggregates(
+            {name: float(total[replicate]) for name, total in sums.items()},
+            float(final_soc[replicate]),
+            np.nan,
+            np.nan,
+            np.nan,
+            np.zeros(len(SOC_BINS) - 1),
+            SOC_BINS,
+            np.zeros(0),
+            np.zeros(1),
+            cycles=cycles,
+        )
+        values[replicate] = outputs_from_aggregates(
+            business_case, profile, layout, aggregates, scenario
+        )
+
+    # Leave the business case on the scenario itself (for the plots and exports)
+    business_case.columns = columns
+
+    scenario_name = str(business_case.param_df.iloc[scenario_index, 0])
+    log_print(
+        f"Bootstrap of {scenario_name}: {replicates} replicates of {full_days} days in blocks of {block_days} days"
+        f" (SOC {soc_mode})"
+    )
+    return Bootstrap_Result(scenario_name, layout, point, values, confidence)
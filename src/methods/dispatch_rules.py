@@ -0,0 +1,42 @@
+# ============================================================================================================================
+# dispatch_rules.py - File containing the plug-in dispatch strategies, registered in DISPATCH_STRATEGY_SET of modify/settings.py
+# ============================================================================================================================
+# External Imports
+from typing import Any
+
+# ============================================================================================================================
+# Internal Imports
+from methods.engine import Dispatch_Strategy, Method_Profile, threshold_requests
+
+# ============================================================================================================================
+# A plug-in strategy is a Dispatch_Strategy: its requests are vectorized signals computed once per scenario, its bounds the
+# SOC-dependent rules applied at each step of the SOC engine. Its functions must be defined at module level, the Multi-Year
+# mode sending the strategies to its worker processes.
+
+
+def reserve_bounds(
+    values: dict[str, Any],
+    params: dict[str, Any],
+    profile: Method_Profile,
+    options: dict[str, Any],
+) -> tuple[float, float]:
+    """
+    Function purpose: Keeps a share of the capacity in reserve (ex: for balancing) and a share free (ex: to absorb
+    curtailment) \n
+    Outputs: the (floor, ceiling) of the SOC, as shares of the capacity
+    """
+    floor = options.get("reserve_share", 0.2)
+    ceiling = 1 - options.get("headroom_share", 0.0)
+    if not 0 <= floor <= ceiling <= 1:
+        raise ValueError(
+            f"The reserve share ({floor}) and headroom share ({1 - ceiling}) must leave a part of the capacity free"
+        )
+    return floor, ceiling
+
+
+THRESHOLD_RESERVE = Dispatch_Strategy(
+    threshold_requests,
+    ["eff_charging", "theor_discharging"],
+    [],
+    bounds=reserve_bounds,
+)
@@ -0,0 +1,1378 @@
+# ============================================================================================================================
+# engine.py - File containing the BC engine shared by every method, a method is only described by its Method_Profile
+# ============================================================================================================================
+# External Imports
+import copy
+import functools
+from typing import Any, Callable, Sequence
+
+import numpy as np
+import pandas as pd
+
+# ============================================================================================================================
+# Internal Imports
+from libs.aggregates import Scenario_Aggregates, aggregate_columns
+from libs.dataflow import Dataflow_Graph, Dataflow_View
+from libs.degradation import capacity_retention
+from libs.dispatch import (
+    DISPATCH_COLUMNS,
+    daily_extremes,
+    optimal_soc,
+    rolling_horizon_soc,
+)
+from libs.extra import coerce_byte, safe_irr, safe_irr_values
+from libs.finance import Cash_Flow_Model, Scenario_Financials, matrix_npv
+from libs.logger import log_print
+from libs.rolling_quantile import rolling_quantile
+from libs.soc import restart_rows, simulate_soc, soc_restarting
+from modify.bca_class import Business_Case
+
+# ============================================================================================================================
+
+# Default mapping of the "Market Type" parameter to the price column used for the balancing market
+DEFAULT_PRICES: dict[str | None, str] = {
+    "IMB": "Imbalance Prices [Euro/MWh]",
+    "INTRA": "Intra-Day Prices [Euro/MWh]",
+}
+
+# Default discharge rule: the storage discharges when the balancing prices are more than this times the wholesale price
+# (see theor_discharging), unless the Parametric Analysis sheet has a "Discharge Price Ratio" column
+DISCHARGE_PRICE_RATIO: float = 1.3
+# Default charge rule: the storage charges from the grid when the balancing prices are below this [€/MWh] (see
+# theor_charging), unless the Parametric Analysis sheet has a "Charge Price Threshold" column
+CHARGE_PRICE_THRESHOLD: float = 0.0
+
+
+class Method_Profile:
+    def __init__(
+        self,
+        name: str,
+        layouts: Sequence[Sequence[str]],
+        result_start: int = 7,
+        inputs: Callable[[Business_Case, Dataflow_Graph], None] | None = None,
+        prices: dict[str | None, str] = DEFAULT_PRICES,
+        revenue_prices: str | None = None,
+        balancing_divisor: float = 1,
+        balancing_base: str = "Exported Power [MW]",
+        limit_discharge: bool = True,
+        per_period_energy: bool = False,
+        annualise: bool = True,
+        irr: Callable[[list[float]], float] = safe_irr,
+        irr_values: Callable[[np.ndarray], np.ndarray] | None = safe_irr_values,
+    ):
+        """
+        Function purpose: Describes everything that differs between two BC methods, the engine does the rest
+        Args:
+            name: the name of the method (also used to key its dataflow graph)
+            layouts: the output names (see compute_outputs) written to param_df, if an output can't be computed with the
+            first layout (ex: missing timeseries column) the next one is used
+            result_start: the first column of param_df the result is written to
+            inputs: adds the method-specific input quantities (available power, transmission capacity, prices...) as nodes of
+            the graph, and sets business_case.years_covered if needed. None if the timeseries already holds them
+            prices: the price column to use for each "Market Type" (upper case), the key None means "whatever the market type"
+            revenue_prices: the price column used for the storage revenue instead of the market type one, if the timeseries has it
+            balancing_divisor: the "Balancing Market Participation" is divided by this (1 for a fraction, 100 for a percentage)
+            balancing_base: the power the balancing market participation is a share of
+            limit_discharge: if True the discharge is limited by the available transmission capacity, otherwise by the power rating only
+            per_period_energy: if True the energies (SOC, capacity and energy outputs) are in MW x settlement period instead of MWh
+            annualise: if True the outputs are divided by the years covered by the timeseries
+            irr: the function computing the IRR from the cash flows
+            irr_values: the same cleaning as irr for an array of IRRs (NaN where not computable), used by the run modes
+            solving many of them at once. None if irr doesn't clean them
+        """
+        self.name = name
+        self.layouts = [list(layout) for layout in layouts]
+        self.result_start = result_start
+        self.inputs = inputs
+        self.prices = prices
+        self.revenue_prices = revenue_prices
+        self.balancing_divisor = balancing_divisor
+        self.balancing_base = balancing_base
+        self.limit_discharge = limit_discharge
+        self.per_period_energy = per_period_energy
+        self.annualise = annualise
+        self.irr = irr
+        self.irr_values = irr_values
+        return
+
+
+# _____________________________________________________________________________________________________________________________
+def launch_profile(
+    business_case: Business_Case, scenario_index: int, profile: Method_Profile
+) -> None:
+    """
+    Function purpose: Computes a scenario with the given method profile and writes the result to param_df
+    Args:
+        business_case: the class which contains all useful information about the business case
+        scenario_index: the row number of the scenario
+        profile: the profile of the method
+    """
+    result = run_scenario(business_case, scenario_index, profile)
+    business_case.param_df.iloc[
+        scenario_index, profile.result_start : profile.result_start + len(result)
+    ] = result  # type: ignore
+    return
+
+
+def run_scenario(
+    business_case: Business_Case, scenario_index: int, profile: Method_Profile
+) -> list[float]:
+    """
+    Function purpose: Computes a scenario with the given method profile \n
+    Outputs: the result of the scenario, in the order of the first layout of the profile that can be computed
+    Args:
+        business_case: the class which contains all useful information about the business case
+        scenario_index: the row number of the scenario
+        profile: the profile of the method
+    """
+    scenario = read_scenario(business_case, scenario_index)
+    columns = scenario_view(business_case, profile, scenario)
+    return compute_outputs(business_case, profile, columns, scenario)
+
+
+def read_scenario(business_case: Business_Case, scenario_index: int) -> dict[str, Any]:
+    """
+    Function purpose: Reads the parameters of a scenario from param_df (and the user inputs they are combined with) \n
+    Outputs: a dictionnary of the scenario parameters, used as the parameters of the dataflow graph
+    Args:
+        business_case: the class which contains all useful information about the business case
+        scenario_index: the row number of the scenario
+    """
+    param_df = business_case.param_df
+
+    try:
+        price_type = param_df.loc[scenario_index, "Market Type"]
+        price_type = coerce_byte(price_type, [str])
+    except Exception:
+        log_print(f"An error has occured with price_type assignment: {Exception}")
+        price_type = ""
+
+    if business_case.case_type == 1:
+        solar_MWp = param_df.loc[scenario_index, "Solar Installed (MWp)"]
+        solar_MWp = coerce_byte(solar_MWp, [int, float])
+    else:
+        solar_MWp = 0
+
+    power_level = param_df.loc[scenario_index, "Storage Power Rating"]
+    business_case.power_level = coerce_byte(power_level, [int, float])
+
+    # Optional columns of the Parametric Analysis sheet, the defaults apply where they are missing or empty
+    def optional_parameter(name: str, default: float) -> float:
+        if name not in param_df.columns or pd.isna(param_df.loc[scenario_index, name]):
+            return default
+        return coerce_byte(param_df.loc[scenario_index, name], [int, float])
+
+    return {
+        "ppa_price": coerce_byte(
+            param_df.loc[scenario_index, "PPA Price"], [int, float]
+        ),
+        "balancing_percentage": coerce_byte(
+            param_df.loc[scenario_index, "Balancing Market Participation"], [float]
+        ),
+        "price_type": price_type,
+        "discharge_ratio": optional_parameter(
+            "Discharge Price Ratio", DISCHARGE_PRICE_RATIO
+        ),
+        "charge_threshold": optional_parameter(
+            "Charge Price Threshold", CHARGE_PRICE_THRESHOLD
+        ),
+        # the perturbed price path the prices are replaced with (see methods/price_paths.py), None for the timeseries prices
+        "price_path": None,
+        "power_level": business_case.power_level,
+        "storage_time_hr": coerce_byte(
+            param_df.loc[scenario_index, "Duration"], [int, float]
+        ),
+        "solar_MWp": solar_MWp,
+        # settlement period as a fraction of an hour: 15 min = 0.25
+        "settlement_period": business_case.input_values["Settlement Period"] / 60,
+        # efficiency charging and discharging: square root of the RTE
+        "efficiency": business_case.input_values["Storage RTE"] ** 0.5,
+        "green_certificate": business_case.input_values["Green-Certificate Price"],
+        "soc_engine": business_case.soc_engine,
+        # the node giving the SOC instead of the rule-based dispatch and its parameters, as (node, ((name, value), ...)) (see methods/optimal_dispatch.py), None for the rules
+        "dispatch": None,
+        # restart the SOC from empty every (period, from offset) timesteps (see methods/bootstrap.py), None to carry it over
+        "soc_restart": None,
+        # the SOC before the first timestep (ex: carried over from the previous year, see methods/multi_year.py)
+        "initial_soc": 0.0,
+        "dtype": business_case.compute_dtype,
+    }
+
+
+def scenario_view(
+    business_case: Business_Case, profile: Method_Profile, scenario: dict[str, Any]
+) -> Dataflow_View:
+    """
+    Function purpose: Gives access to the derived columns of a scenario, building the graph of the method on first use \n
+    Outputs: the view of the scenario on the graph (also kept in business_case.columns for the plots)
+    Args:
+        business_case: the class which contains all useful information about the business case
+        profile: the profile of the method
+        scenario: the scenario parameters (see read_scenario)
+    """
+    if profile.name not in business_case.dataflow:
+        business_case.dataflow[profile.name] = build_graph(business_case, profile)
+    business_case.columns = Dataflow_View(
+        business_case.dataflow[profile.name], scenario
+    )
+    return business_case.columns
+
+
+def materialize_inputs(
+    business_case: Business_Case, profile: Method_Profile
+) -> tuple[pd.DataFrame, Method_Profile]:
+    """
+    Function purpose: Computes the scenario-independent inputs of a method (ex: the power curve applied to the wind speed)
+    and adds them to a copy of the timeseries, so that its rows can be regrouped or resampled \n
+    Outputs: the timeseries with the inputs as columns, and a copy of the profile which doesn't recompute them
+    Note: Also sets business_case.years_covered (see Method_Profile.inputs) from the full timeseries.
+    Args:
+        business_case: the class which contains all useful information about the business case
+        profile: the profile of the method
+    """
+    df = business_case.df.copy()
+    if profile.inputs is not None:
+        inputs_graph = Dataflow_Graph(business_case.df, **business_case.dataflow_cache)
+        profile.inputs(business_case, inputs_graph)
+        for name in inputs_graph.nodes:
+            if not inputs_graph.dependencies[name]:
+                df[name] = inputs_graph.get(name, {})
+    materialized_profile = copy.copy(profile)
+    materialized_profile.inputs = None
+    return df, materialized_profile
+
+
+def materialize_reference_inputs(
+    business_case: Business_Case, profile: Method_Profile
+) -> pd.DataFrame | None:
+    """
+    Function purpose: Computes the scenario-independent inputs of a method on the float64 timeseries kept for the accuracy
+    report of the float32 mode (see accuracy_report in libs/precision.py) \n
+    Outputs: the float64 timeseries with the inputs as columns (see materialize_inputs), None if it wasn't kept
+    Args:
+        business_case: the class which contains all useful information about the business case
+        profile: the profile of the method
+    """
+    if business_case.float64_df is None:
+        return None
+    reference = copy.copy(business_case)
+    reference.df = business_case.float64_df
+    reference.compute_dtype = np.float64
+    return materialize_inputs(reference, profile)[0]
+
+
+# _____________________________________________________________________________________________________________________________
+def storage_capacity(profile: Method_Profile, params: dict[str, Any]) -> float:
+    """
+    Function purpose: Computes the storage capacity of a scenario \n
+    Outputs: the capacity, in MWh or in MW x settlement period (see Method_Profile.per_period_energy)
+    Args:
+        profile: the profile of the method
+        params: the scenario parameters
+    """
+    if profile.per_period_energy:
+        # Storage capacity (corrected for settlement period)
+        storage_time = (1 / params["settlement_period"]) * params["storage_time_hr"]
+        return params["power_level"] * storage_time
+    return params["power_level"] * params["storage_time_hr"]
+
+
+def soc_timestep(profile: Method_Profile, params: dict[str, Any]) -> float:
+    """
+    Function purpose: Gives the timestep of the SOC recurrence of a scenario \n
+    Outputs: the settlement period, or 1 with per_period_energy (the capacity is then already corrected for it)
+    Args:
+        profile: the profile of the method
+        params: the scenario parameters
+    """
+    return 1 if profile.per_period_energy else params["settlement_period"]
+
+
+def stacked_soc_bounds(
+    graph: Dataflow_Graph, block_params: list[dict[str, Any]], length: int
+) -> tuple[np.ndarray | None, np.ndarray | None]:
+    """
+    Function purpose: Gathers the SOC bounds of the dispatch strategy (see soc_bounds) of a block of scenarios solved at
+    once with soc_batched \n
+    Outputs: the (scenarios x timesteps) floors and ceilings, (None, None) if the strategy has no bounds
+    Args:
+        graph: the dataflow graph of the method
+        block_params: the parameters of each scenario of the block
+        length: the amount of timesteps
+    """
+    bounds = [graph.get("soc_bounds", params) for params in block_params]
+    if bounds[0] is None:
+        return None, None
+    return (
+        np.stack([np.broadcast_to(floor, length) for floor, _ in bounds]),
+        np.stack([np.broadcast_to(ceiling, length) for _, ceiling in bounds]),
+    )
+
+
+class Dispatch_Strategy:
+    def __init__(
+        self,
+        requests: Callable[
+            [dict[str, Any], dict[str, Any], Method_Profile, dict[str, Any]], np.ndarray
+        ],
+        inputs: Sequence[str],
+        params: Sequence[str],
+        nodes: Callable[[Dataflow_Graph, dict[str, Any]], None] | None = None,
+        bounds: (
+            Callable[
+                [dict[str, Any], dict[str, Any], Method_Profile, dict[str, Any]],
+                tuple[np.ndarray | float | None, np.ndarray | float | None],
+            ]
+            | None
+        ) = None,
+    ):
+        """
+        Function purpose: Describes how the storage decides to charge and discharge, the SOC engine then applies the
+        capacity to the requested power
+        Args:
+            requests: computes the charging (>0) or discharging (<0) power requested at each timestep from (values of the
+            inputs, values of the params, profile of the method, options of the strategy in the settings)
+            inputs: the names of the graph columns it is computed from
+            params: the names of the scenario parameters it directly depends on
+            nodes: adds the nodes of the strategy to the graph, from (graph, options of the strategy), before the requests
+            (ex: columns shared by every scenario)
+            bounds: the SOC-dependent rules, computes from the same arguments as requests the (floor, ceiling) of the SOC as
+            shares of the capacity, for every timestep or all of them (None for no bound): the storage doesn't discharge
+            below the floor nor charge above the ceiling. They are applied inside the SOC recurrence (see soc_bounded),
+            ex: "reserve 20% for balancing" is a floor of 0.2
+        """
+        self.requests = requests
+        self.inputs = tuple(inputs)
+        self.params = tuple(params)
+        self.nodes = nodes
+        self.bounds = bounds
+        return
+
+
+def threshold_requests(
+    values: dict[str, Any],
+    params: dict[str, Any],
+    profile: Method_Profile,
+    options: dict[str, Any],
+) -> np.ndarray:
+    """
+    Function purpose: The price rules: charges with the overproduction or below the charge threshold, discharges above
+    the discharge ratio x the wholesale price (see theor_charging and theor_discharging) \n
+    Outputs: the requested power, where Charging is zero the theoretical discharge output, elsewhere the charging power
+    """
+    return np.where(
+        values["eff_charging"] == 0,
+        values["theor_discharging"],
+        values["eff_charging"],
+    )
+
+
+def rolling_horizon_requests(
+    values: dict[str, Any],
+    params: dict[str, Any],
+    profile: Method_Profile,
+    options: dict[str, Any],
+) -> np.ndarray:
+    """
+    Function purpose: Plans the best dispatch over the next horizon_hr hours every step_hr hours, with soc_levels SOC levels
+    (see rolling_horizon_soc in libs/dispatch.py) \n
+    Outputs: the requested power, the changes of the SOC of the plan which the SOC engine then reproduces
+    """
+    timestep = soc_timestep(profile, params)
+    end_soc_values = rolling_horizon_soc(
+        values,
+        params,
+        storage_capacity(profile, params),
+        timestep,
+        options.get("soc_levels", 101),
+        max(1, round(options.get("horizon_hr", 24) / params["settlement_period"])),
+        max(1, round(options.get("step_hr", 6) / params["settlement_period"])),
+    )
+    soc_values = np.concatenate(([params["initial_soc"]], end_soc_values))
+    return np.diff(soc_values) / timestep
+
+
+def price_ranking_requests(
+    values: dict[str, Any],
+    params: dict[str, Any],
+    profile: Method_Profile,
+    options: dict[str, Any],
+) -> np.ndarray:
+    """
+    Function purpose: Charges in the cheapest and discharges in the dearest periods of each day (see daily_extremes in
+    libs/dispatch.py), periods of them per day or by default the duration of the storage. The overproduction is charged
+    and nothing is discharged above the transmission capacity, as with the price rules \n
+    Outputs: the requested power, the SOC engine then applies the capacity
+    """
+    periods_per_day = max(1, round(24 / params["settlement_period"]))
+    periods = options.get("periods")
+    if periods is None:
+        periods = int(np.ceil(params["storage_time_hr"] / params["settlement_period"]))
+    cheapest, dearest = daily_extremes(
+        values["Balancing Prices"], periods_per_day, periods
+    )
+    charging = (
+        np.where(
+            values["deltapower"] < 0,
+            -values["deltapower"],
+            np.where(cheapest, params["power_level"], 0),
+        )
+        * params["efficiency"]
+    )
+    return np.where(
+        charging == 0,
+        np.where(dearest, values["max_discharging"], 0),
+        charging,
+    )
+
+
+def rolling_quantile_nodes(graph: Dataflow_Graph, options: dict[str, Any]) -> None:
+    """
+    Function purpose: Adds the charge and discharge thresholds of the rolling quantile strategy: the charge_quantile and
+    discharge_quantile of the balancing prices over the last window_hr hours (see libs/rolling_quantile.py). As nodes of
+    the graph they are computed once per price type and shared by every scenario
+    """
+    for name, quantile, default in (
+        ("Rolling Charge Threshold", "charge_quantile", 0.2),
+        ("Rolling Discharge Threshold", "discharge_quantile", 0.8),
+    ):
+
+        def threshold(values, params, quantile=options.get(quantile, default)):
+            window = round(options.get("window_hr", 168) / params["settlement_period"])
+            return rolling_quantile(
+                values["Balancing Prices"], max(1, window), quantile
+            )
+
+        graph.add_node(name, threshold, ["Balancing Prices"], ["settlement_period"])
+    return
+
+
+def rolling_quantile_requests(
+    values: dict[str, Any],
+    params: dict[str, Any],
+    profile: Method_Profile,
+    options: dict[str, Any],
+) -> np.ndarray:
+    """
+    Function purpose: The price rules with the rolling quantiles of the balancing prices as thresholds (see
+    rolling_quantile_nodes): charges with the overproduction or below the charge threshold, discharges above the
+    discharge threshold \n
+    Outputs: the requested power, the SOC engine then applies the capacity
+    """
+    prices = values["Balancing Prices"]
+    charging = (
+        np.where(
+            values["deltapower"] < 0,
+            -values["deltapower"],
+            np.where(
+                prices < values["Rolling Charge Threshold"], params["power_level"], 0
+            ),
+        )
+        * params["efficiency"]
+    )
+    return np.where(
+        charging == 0,
+        np.where(
+            prices > values["Rolling Discharge Threshold"], values["max_discharging"], 0
+        ),
+        charging,
+    )
+
+
+# The dispatch strategy used when none is set
+THRESHOLD_DISPATCH: str = "threshold"
+# The dispatch strategies offered in the settings (see modify/settings.py)
+DISPATCH_STRATEGIES: dict[str, Dispatch_Strategy] = {
+    THRESHOLD_DISPATCH: Dispatch_Strategy(
+        threshold_requests, ["eff_charging", "theor_discharging"], []
+    ),
+    "price_ranking": Dispatch_Strategy(
+        price_ranking_requests,
+        ["Balancing Prices", "deltapower", "max_discharging"],
+        ["power_level", "efficiency", "settlement_period", "storage_time_hr"],
+    ),
+    "rolling_quantile": Dispatch_Strategy(
+        rolling_quantile_requests,
+        [
+            "Balancing Prices",
+            "deltapower",
+            "max_discharging",
+            "Rolling Charge Threshold",
+            "Rolling Discharge Threshold",
+        ],
+        ["power_level", "efficiency"],
+        rolling_quantile_nodes,
+    ),
+    "rolling_horizon": Dispatch_Strategy(
+        rolling_horizon_requests,
+        DISPATCH_COLUMNS,
+        [
+            "power_level",
+            "storage_time_hr",
+            "settlement_period",
+            "efficiency",
+            "green_certificate",
+            "initial_soc",
+        ],
+    ),
+}
+
+
+def build_graph(
+    business_case: Business_Case, profile: Method_Profile
+) -> Dataflow_Graph:
+    """
+    Function purpose: Builds the dataflow graph holding every derived column of a method \n
+    Outputs: the graph, whose nodes are only computed when a result, plot or export asks for them
+    Note: Each node declares the columns/nodes it is computed from and the scenario parameters it directly uses, it is then
+    memoized under a key made of only the parameters it (recursively) depends on.
+    Args:
+        business_case: the class which contains all useful information about the business case
+        profile: the profile of the method
+    """
+    graph = Dataflow_Graph(business_case.df, **business_case.dataflow_cache)
+    if profile.inputs is not None:
+        profile.inputs(business_case, graph)
+
+    # #Adjust Solar Power based on Scenario (Default Data is for 15 MWp)
+    if business_case.case_type == 1:
+
+        def available_power(values, params):
+            return values["Belwind (181MW)"] + (
+                (params["solar_MWp"] / 15) * values["OOE Production (15MWp) [MW]"]
+            )
+
+        graph.add_node(
+            "Available Power [MW]",
+            available_power,
+            ["Belwind (181MW)", "OOE Production (15MWp) [MW]"],
+            ["solar_MWp"],
+        )
+    # for hybrid projects: (Wind+Solar), Available Power [MW] should already account for combined energy sources
+
+    # Limit Exported Power to the Transmission Capacity: This corresponds to the "No Storage" scenario and is used for calculating over-production available for charging
+    def exported_power(values, params):
+        return np.where(
+            values["Available Power [MW]"]
+            > values["Available Transmission Capacity [MW]"],
+            values["Available Transmission Capacity [MW]"],
+            values["Available Power [MW]"],
+        )
+
+    graph.add_node(
+        "Exported Power [MW]",
+        exported_power,
+        ["Available Power [MW]", "Available Transmission Capacity [MW]"],
+    )
+
+    # deltapower: delta between available power and transmission capacity, -ve values correspond to overproduction wrt to max power
+    # deltapower > 0: underproduction relative to Available Transmission Capacity
+    # deltapower < 0: overproduction relative to Available Transmission Capacity
+    def deltapower(values, params):
+        return (
+            values["Available Transmission Capacity [MW]"]
+            - values["Available Power [MW]"]
+        )
+
+    graph.add_node(
+        "deltapower",
+        deltapower,
+        ["Available Transmission Capacity [MW]", "Available Power [MW]"],
+    )
+
+    # Balancing power [MW]
+    # amount of power to be allocated to balancing market as a share of the balancing base (exported or available power)
+    def bal_power(values, params):
+        return (
+            params["balancing_percentage"]
+            / profile.balancing_divisor
+            * values[profile.balancing_base]
+        )
+
+    graph.add_node(
+        "bal_power", bal_power, [profile.balancing_base], ["balancing_percentage"]
+    )
+
+    # Determine which Energy Prices to Use (based on "Market Type Parameter")
+    # the price paths of methods/price_paths.py are stored in this node under their own price_path
+    def balancing_prices(values, params):
+        if params["price_path"] is not None:
+            raise ValueError(
+                f"The prices of price path {params['price_path']} must be stored in the graph before use"
+            )
+        if None in profile.prices:
+            return graph.get(profile.prices[None], params)
+        price_type = str(params["price_type"]).upper()
+        if price_type not in profile.prices:
+            raise ValueError("Invalid price type. Use 'IMB' or 'INTRA'.")
+        return graph.get(profile.prices[price_type], params)
+
+    graph.add_node(
+        "Balancing Prices", balancing_prices, [], ["price_type", "price_path"]
+    )
+
+    # The storage revenue uses the revenue price column of the profile whenever the timeseries has one
+    def revenue_balancing_prices(values, params):
+        if profile.revenue_prices is not None and graph.has(profile.revenue_prices):
+            return graph.get(profile.revenue_prices, params)
+        return values["Balancing Prices"]
+
+    graph.add_node(
+        "Revenue Balancing Prices", revenue_balancing_prices, ["Balancing Prices"]
+    )
+
+    # ppa_price = input_values['PPA Price'].iloc[-1]
+    # df['Day Ahead Price [Euro/MWh]']*(1-discount_on_wholesale)
+    def wholesale_price(values, params):
+        return params["dtype"](params["ppa_price"])
+
+    graph.add_node("Wholesale_Price", wholesale_price, [], ["ppa_price", "dtype"])
+
+    # Total income when considering balancing market participation (no storage): directly exporting portion of energy to balancing market, e.g 85% wholesale + 15% Balancing Market
+    def bal_income(values, params):
+        balancing_share = params["balancing_percentage"] / profile.balancing_divisor
+        green_certificate = params["green_certificate"]
+        settlement_period = params["settlement_period"]
+        return (
+            (values["Wholesale_Price"] + green_certificate)
+            * (
+                values["Exported Power [MW]"]
+                * (1 - balancing_share)
+                * settlement_period
+            )
+        ) + (
+            balancing_share
+            * values["Exported Power [MW]"]
+            * (values["Balancing Prices"] + green_certificate)
+            * settlement_period
+        )
+
+    graph.add_node(
+        "bal_income",
+        bal_income,
+        ["Wholesale_Price", "Exported Power [MW]", "Balancing Prices"],
+        ["balancing_percentage", "green_certificate", "settlement_period"],
+    )
+
+    #### Charging and Discharging Strategy
+
+    # CHARGING
+    # theor_charging: Power being pulled from the grid [MW]:
+    # when there is overproduction relative to transmission (deltapower < 0): the maximum charging is the overproduced power
+    # when there is underproduction (deltapower ≥ 0):
+    # if balancing prices are below the charge threshold (-ve by default): Charge at max power
+    # otherwise: do nothing
+    def theor_charging(values, params):
+        return np.where(
+            values["deltapower"] < 0,
+            -values["deltapower"],
+            np.where(
+                (values["Balancing Prices"] < params["charge_threshold"]),
+                params["power_level"],
+                0,
+            ),
+        )
+
+    graph.add_node(
+        "theor_charging",
+        theor_charging,
+        ["deltapower", "Balancing Prices"],
+        ["power_level", "charge_threshold"],
+    )
+
+    # efficiency charging: actual energy GOING INTO THE STORAGE SYSTEM after conversion losses
+    def eff_charging(values, params):
+        return values["theor_charging"] * params["efficiency"]
+
+    graph.add_node("eff_charging", eff_charging, ["theor_charging"], ["efficiency"])
+
+    # DISCHARGING
+    # this is the maximum possible discharging rate:
+    # based on the rated power of the storage system and the maximum available transmission capacity (which ever is the smallest)
+    # corrected for effiency since this is the discharge from storage (before conversion)
+    # without limit_discharge, the storage discharges at its full rated power
+    def max_discharging(values, params):
+        if not profile.limit_discharge:
+            return np.where(values["deltapower"] < 0, 0, -params["power_level"])
+        return np.where(
+            values["deltapower"] < 0,
+            0,
+            -1
+            * np.minimum(
+                params["power_level"], values["deltapower"] / params["efficiency"]
+            ),
+        )
+
+    graph.add_node(
+        "max_discharging",
+        max_discharging,
+        ["deltapower"],
+        ["power_level", "efficiency"],
+    )
+
+    # theor_discharging: discharge at full rated output of the storage system
+    # when there is overproduction relative to transmission constraint (deltapower < 0): do nothing
+    # when there is underproduction (deltapower ≥ 0):
+    # if balancing prices are MORE than X (discharge_ratio) * the day-ahead or fixed price (e.g. PPA): Discharge at the maximum possible discharging rate: df['max_discharging']
+    # if balancing prices are LESS than X * the day-ahead or fixed price (e.g. PPA): do nothing
+    def theor_discharging(values, params):
+        return np.where(
+            values["deltapower"] < 0,
+            0,
+            np.where(
+                values["Balancing Prices"]
+                > (params["discharge_ratio"] * values["Wholesale_Price"]),
+                values["max_discharging"],
+                0,
+            ),
+        )
+
+    graph.add_node(
+        "theor_discharging",
+        theor_discharging,
+        ["deltapower", "Balancing Prices", "Wholesale_Price", "max_discharging"],
+        ["discharge_ratio"],
+    )
+
+    # Maximum charging or discharging power: the power requested by the dispatch strategy of the business case (the price
+    # rules above by default, see DISPATCH_STRATEGIES and the plug-in strategies of the business case), used for
+    # calculating the end_soc_values
+    strategies = {**DISPATCH_STRATEGIES, **business_case.dispatch_strategies}
+    if business_case.dispatch_strategy not in strategies:
+        raise ValueError(
+            f"Invalid dispatch strategy '{business_case.dispatch_strategy}'. Use one of {list(strategies)}."
+        )
+    strategy = strategies[business_case.dispatch_strategy]
+    options = business_case.dispatch_options.get(business_case.dispatch_strategy, {})
+    if strategy.nodes is not None:
+        strategy.nodes(graph, options)
+
+    def maximum_charge_discharge(values, params):
+        return strategy.requests(values, params, profile, options)
+
+    graph.add_node(
+        "maximum_charge_discharge",
+        maximum_charge_discharge,
+        strategy.inputs,
+        strategy.params,
+    )
+
+    # soc_bounds: the (floor, ceiling) of the SOC set by the rules of the strategy, None if it has none
+    def soc_bounds(values, params):
+        if strategy.bounds is None:
+            return None
+        capacity = storage_capacity(profile, params)
+        floor, ceiling = strategy.bounds(values, params, profile, options)
+        return (
+            0.0 if floor is None else np.asarray(floor, dtype=np.float64) * capacity,
+            (
+                capacity
+                if ceiling is None
+                else np.asarray(ceiling, dtype=np.float64) * capacity
+            ),
+        )
+
+    graph.add_node(
+        "soc_bounds",
+        soc_bounds,
+        strategy.inputs if strategy.bounds is not None else [],
+        [*strategy.params, "power_level", "storage_time_hr", "settlement_period"],
+    )
+
+    ## State of Charge Calculations
+
+    # optimal_soc: the SOC of the perfect-foresight dispatch over optimal_soc_levels SOC levels (see optimal_soc in
+    # libs/dispatch.py and methods/optimal_dispatch.py), only for the methods whose graph has the columns it needs. The
+    # row weights are those of the timeseries of the graph (a new graph is built for other ones)
+    if all(graph.has(name) for name in DISPATCH_COLUMNS):
+        row_weights = business_case.row_weights
+
+        def optimal_soc_values(values, params):
+            return optimal_soc(
+                values,
+                params,
+                storage_capacity(profile, params),
+                soc_timestep(profile, params),
+                params["optimal_soc_levels"],
+                row_weights,
+            ).astype(params["dtype"])
+
+        graph.add_node(
+            "optimal_soc",
+            optimal_soc_values,
+            DISPATCH_COLUMNS,
+            [
+                "power_level",
+                "storage_time_hr",
+                "settlement_period",
+                "efficiency",
+                "green_certificate",
+                "initial_soc",
+                "optimal_soc_levels",
+                "dtype",
+            ],
+        )
+
+    # end_soc_values: the SOC at the end of each timestep, starting from an empty storage (see libs/soc.py for the engines)
+    # with per_period_energy the capacity is already corrected for the settlement period, so each timestep adds the power as is (see soc_timestep)
+    def end_soc_values(values, params):
+        if params["dispatch"] is not None:
+            # The dispatch parameter holds every parameter of the node, so each of their values keys its own SOC
+            name, dispatch_params = params["dispatch"]
+            return graph.get(name, dict(dispatch_params))
+        floors, ceilings = values["soc_bounds"] or (None, None)
+        if params["soc_restart"] is not None:
+            return soc_restarting(
+                values["maximum_charge_discharge"],
+                soc_timestep(profile, params),
+                storage_capacity(profile, params),
+                *params["soc_restart"],
+                floors=floors,
+                ceilings=ceilings,
+            ).astype(params["dtype"])
+        return simulate_soc(
+            values["maximum_charge_discharge"],
+            soc_timestep(profile, params),
+            storage_capacity(profile, params),
+            params["soc_engine"],
+            params["initial_soc"],
+            floors,
+            ceilings,
+        ).astype(params["dtype"])
+
+    graph.add_node(
+        "end_soc_values",
+        end_soc_values,
+        ["maximum_charge_discharge", "soc_bounds"],
+        [
+            "power_level",
+            "storage_time_hr",
+            "settlement_period",
+            "soc_engine",
+            "soc_restart",
+            "initial_soc",
+            "dispatch",
+            "dtype",
+        ],
+    )
+
+    # create the charging/discharging parameter
+    #'charge_discharge': energy in (>0) and out (<0) of the system
+    # Power = d(SOC)/dt, 0 on the first line unless the SOC is carried over from a previous timeseries
+    # With soc_restart the storage is emptied before each restart row without moving power: the change is counted from 0
+    def charge_discharge(values, params):
+        end_soc_values = values["end_soc_values"]
+        if params["initial_soc"]:
+            first_change = end_soc_values[:1] - params["initial_soc"]
+        else:
+            first_change = end_soc_values[:1] * 0
+        energy_change = np.concatenate((first_change, np.diff(end_soc_values)))
+        if params["soc_restart"] is not None:
+            restarts = restart_rows(len(end_soc_values), *params["soc_restart"])
+            energy_change[restarts] = end_soc_values[restarts]
+        if profile.per_period_energy:
+            return energy_change
+        return energy_change / params["settlement_period"]
+
+    graph.add_node(
+        "charge_discharge",
+        charge_discharge,
+        ["end_soc_values"],
+        ["settlement_period", "initial_soc", "soc_restart"],
+    )
+
+    # define discharge efficiency
+    #'eff_charge_discharge': energy in (>0) and out (<0) out at storage-grid connection point (used for revenue calculation)
+    def eff_charge_discharge(values, params):
+        return np.where(
+            values["charge_discharge"] >= 0,
+            values["charge_discharge"] / params["efficiency"],
+            values["charge_discharge"] * params["efficiency"],
+        )
+
+    graph.add_node(
+        "eff_charge_discharge",
+        eff_charge_discharge,
+        ["charge_discharge"],
+        ["efficiency"],
+    )
+
+    # create the percentage state of charge
+    def per_state_of_charge(values, params):
+        return (values["end_soc_values"] * 100) / storage_capacity(profile, params)
+
+    graph.add_node(
+        "per_state_of_charge",
+        per_state_of_charge,
+        ["end_soc_values"],
+        ["power_level", "storage_time_hr", "settlement_period"],
+    )
+
+    ## Revenue Calculations
+
+    # power price
+    # green_certificate: €/MWh renewable energy producers receive these in proportion to their production, and offshore wind projects benefit by law from a guaranteed 4 June 2014 purchase of these "green certificates" by Elia, the Belgian grid operator, at a fixed price of 107 EUR/MWh for 20 years.
+
+    # Theoretical Windfarm revenue
+    # Standard wind farm income based on Exported Power (as imported from Excel)
+    def baseline_income(values, params):
+        return (
+            (values["Wholesale_Price"] + params["green_certificate"])
+            * values["Exported Power [MW]"]
+        ) * params["settlement_period"]
+
+    graph.add_node(
+        "baseline_income",
+        baseline_income,
+        ["Wholesale_Price", "Exported Power [MW]"],
+        ["green_certificate", "settlement_period"],
+    )
+
+    # Storage Revenue (only attributed directly to storage) SIGN OF BALANCING PRICES: (-ve Balance Price = PAID TO CHARGE)
+    # [A]: IDLE (Not Charging or Discharging): assign balancing market income
+    # [B]: DISCHARGING: assign balancing market income corrected for what is being delivered by storage system (if balancing prices are +ve then it will increase the income)
+    # [C]: CHARGING: If there is Over Production (delta power < 0) (can't discharge): attribute the full balancing market income to storage (based on Exported Power -> so already corrected for transmission constraint)
+    # [D]: CHARGING: If Storage Power Rating < Balancing Market Assigned Power (X% of Available Power): All Charging from Balancing Market: assign balancing market income corrected for what is being charged by storage system (if balancing prices are -ve then it will increase the income during charging)
+    # [E]: CHARGING: If Storage Power Rating < Exported Power: attribute Charging from Balancing Market (charging here happens only when Balance Prices are -ve)
+    # [F]: CHARGING: Otherwise: Exported < Storage Power Rating: pull down output into negative (charging from grid) (charging here only happens only when Balance Prices are -ve)
+    def storage_income(values, params):
+        power_level = params["power_level"]
+        settlement_period = params["settlement_period"]
+        eff_charge_discharge = values["eff_charge_discharge"]
+        prices = values["Revenue Balancing Prices"]
+        return np.where(
+            eff_charge_discharge == 0,
+            values["bal_income"],  # [A]
+            np.where(
+                eff_charge_discharge < 0,
+                values["bal_income"]
+                - eff_charge_discharge * prices * settlement_period,  # [B]
+                np.where(
+                    values["deltapower"] < 0,
+                    values["bal_income"],  # [C]
+                    np.where(
+                        power_level <= values["bal_power"],
+                        values["bal_income"]
+                        - eff_charge_discharge * prices * settlement_period,  # [D]
+                        np.where(
+                            power_level <= values["Exported Power [MW]"],
+                            values["bal_income"]
+                            - values["bal_power"] * prices * settlement_period
+                            - (eff_charge_discharge - values["bal_power"])
+                            * (values["Wholesale_Price"] + prices)
+                            * settlement_period,  # [E]
+                            (values["bal_power"] - power_level)
+                            * prices
+                            * settlement_period,  # [F]
+                        ),
+                    ),
+                ),
+            ),
+        )
+
+    graph.add_node(
+        "storage_income",
+        storage_income,
+        [
+            "eff_charge_discharge",
+            "Revenue Balancing Prices",
+            "bal_income",
+            "deltapower",
+            "bal_power",
+            "Exported Power [MW]",
+            "Wholesale_Price",
+        ],
+        ["power_level", "settlement_period"],
+    )
+
+    # correct Exported Power for what is discharged and charged from the grid:
+    # when charging: What is produced - what has been charged = what is exported / but clipped to the transmission capacity (n case SOC = 100% and cannot charge any more)
+    # when discharging: what is produced + what has been discharged (should be automatically clipped to the transmission given discharing rate calc)
+    def net_exported_power(values, params):
+        return np.minimum(
+            values["Available Power [MW]"] - values["eff_charge_discharge"],
+            values["Available Transmission Capacity [MW]"],
+        )
+
+    graph.add_node(
+        "Net Exported Power_Storage [MW]",
+        net_exported_power,
+        [
+            "Available Power [MW]",
+            "eff_charge_discharge",
+            "Available Transmission Capacity [MW]",
+        ],
+    )
+
+    # Extra income from Generation-Based Compenstation: since baseline_income and bal_income are both computed on the basis of EXPORTED output
+    # Generation that was above transmission constraint AND stored:
+    def extra_generation(values, params):
+        return np.where(values["deltapower"] < 0, values["eff_charge_discharge"], 0)
+
+    graph.add_node(
+        "extra_generation", extra_generation, ["deltapower", "eff_charge_discharge"]
+    )
+
+    # Extra income on green certificates awarded for generation of clean energy
+    def extra_generation_income(values, params):
+        return (
+            values["extra_generation"]
+            * params["green_certificate"]
+            * params["settlement_period"]
+        )
+
+    graph.add_node(
+        "extra_generation_income",
+        extra_generation_income,
+        ["extra_generation"],
+        ["green_certificate", "settlement_period"],
+    )
+
+    # %%
+    # Calculate effective curtailment rate: when delta_power < 0 (over production):
+    # if SOC < 100% |delta_power| = charging_rate (charge with over production) and there is no curtailment
+    # if SOC = 100% (or No Storage): |delta_power| - charging_rate = curtailed energy
+    # so to calculate effective curtailment, simply do: |delta_power| - charging_rate and sum all non-zero instances:
+    def curtailed_power(values, params):
+        return np.where(
+            values["Available Power [MW]"] > values["Exported Power [MW]"],
+            np.where(
+                values["eff_charge_discharge"] > 0,
+                values["Available Power [MW]"]
+                - (values["Exported Power [MW]"] + values["eff_charge_discharge"]),
+                values["Available Power [MW]"] - values["Exported Power [MW]"],
+            ),
+            0,
+        )
+
+    graph.add_node(
+        "Curtailed Power [MW]",
+        curtailed_power,
+        ["Available Power [MW]", "Exported Power [MW]", "eff_charge_discharge"],
+    )
+
+    return graph
+
+
+# _____________________________________________________________________________________________________________________________
+# Columns summed by the aggregate pass for each output (the financials always need the revenue columns)
+OUTPUT_SUMS: dict[str, tuple[str, ...]] = {
+    "Potential Generation": ("Potential Generation [MW]",),
+    "Generation Constraint": ("Generation Constraint [MW]",),
+    "Available Energy": ("Available Power [MW]",),
+    "Curtailed Energy": ("Curtailed Power [MW]",),
+    "Generated Energy": ("Exported Power [MW]", "extra_generation"),
+    "Exported Energy": ("Exported Power [MW]",),
+    "Storage Losses": (
+        "Exported Power [MW]",
+        "extra_generation",
+        "Net Exported Power_Storage [MW]",
+    ),
+    "Exported Energy With Storage": ("Net Exported Power_Storage [MW]",),
+    "Revenue A": ("bal_income",),
+    "Revenue B": ("storage_income", "bal_income"),
+}
+FINANCIAL_SUMS: tuple[str, ...] = (
+    "storage_income",
+    "extra_generation_income",
+    "baseline_income",
+    "bal_income",  # splits the income fading with the storage capacity from the direct balancing income (see degradation)
+)
+
+
+def select_layout(profile: Method_Profile, columns: Dataflow_View) -> list[str]:
+    """
+    Function purpose: Picks the layout of the result, the first one of the profile whose outputs can all be computed
+
+    Outputs: the names of the outputs of the layout
+    Args:
+        profile: the profile of the method
+        columns: the view of the scenario on the graph
+    """
+    for layout in profile.layouts:
+        if all(
+            name in columns for output in layout for name in OUTPUT_SUMS.get(output, ())
+        ):
+            return layout
+    raise ValueError(
+        f"None of the result layouts of the {profile.name} method can be computed from the timeseries"
+    )
+
+
+def compute_outputs(
+    business_case: Business_Case,
+    profile: Method_Profile,
+    columns: Dataflow_View,
+    scenario: dict[str, Any],
+) -> list[float]:
+    """
+    Function purpose: Computes the financials of a scenario and lays its outputs out as described by the profile \n
+    Outputs: the values of the first layout of the profile whose outputs can all be computed
+    Note: Every column is reduced once by the aggregate pass (see libs/aggregates.py), the aggregates are kept in
+    business_case.aggregates for the plots, and what the financials need in business_case.financials (see
+    libs/finance.py). Each row counts business_case.row_weights times if set (see
+    methods/representative_days.py).
+    Args:
+        business_case: the class which contains all useful information about the business case
+        profile: the profile of the method
+        columns: the view of the scenario on the graph
+        scenario: the scenario parameters (see read_scenario)
+    """
+    layout = select_layout(profile, columns)
+    aggregates = aggregate_columns(
+        columns,
+        summed_columns(layout),
+        scenario["power_level"],
+        weights=business_case.row_weights,
+        initial_soc=scenario["initial_soc"],
+        capacity=storage_capacity(profile, scenario),
+        soc_restart=scenario["soc_restart"],
+    )
+    business_case.aggregates = aggregates
+    business_case.financials = Scenario_Financials(
+        scenario["power_level"],
+        scenario["storage_time_hr"],
+        annual_net_income(business_case, profile, aggregates),
+        faded_income(business_case, profile, aggregates),
+        retention_curve(
+            business_case, profile, aggregates, cash_flow_model(business_case)
+        ),
+    )
+    return outputs_from_aggregates(business_case, profile, layout, aggregates, scenario)
+
+
+def summed_columns(layout: Sequence[str]) -> list[str]:
+    """
+    Function purpose: Lists the columns the aggregate pass must sum for the outputs of a layout \n
+    Outputs: the names of the summed columns (the revenue columns of the financials always included)
+    Args:
+        layout: the names of the outputs
+    """
+    sum_names = [name for output in layout for name in OUTPUT_SUMS.get(output, ())]
+    return sum_names + list(FINANCIAL_SUMS)
+
+
+def annual_net_income(
+    business_case: Business_Case,
+    profile: Method_Profile,
+    aggregates: Scenario_Aggregates,
+) -> float:
+    """
+    Function purpose: Computes the annual income attributed to the storage, before OPEX \n
+    Outputs: the annual net income [€/year]
+    Args:
+        business_case: the class which contains all useful information about the business case
+        profile: the profile of the method
+        aggregates: the aggregates of the scenario
+    """
+    total = aggregates.sums
+    years_covered = business_case.years_covered if profile.annualise else 1
+    storage_total_income = (
+        total["storage_income"] + total["extra_generation_income"]
+    )  # Wind + Storage total income
+    return (
+        storage_total_income - total["baseline_income"]
+    ) / years_covered  # Annualise Income only attrubuted to storgae: [A] + [B] + [C]
+
+
+def faded_income(
+    business_case: Business_Case,
+    profile: Method_Profile,
+    aggregates: Scenario_Aggregates,
+) -> float:
+    """
+    Function purpose: Computes the part of the annual income which fades with the capacity of the storage \n
+    Outputs: the annual income the storage brings itself [€/year]: Revenue B and C, not the direct balancing (Revenue A)
+    Args:
+        business_case: the class which contains all useful information about the business case
+        profile: the profile of the method
+        aggregates: the aggregates of the scenario
+    """
+    total = aggregates.sums
+    years_covered = business_case.years_covered if profile.annualise else 1
+    return (
+        total["storage_income"] - total["bal_income"] + total["extra_generation_income"]
+    ) / years_covered
+
+
+def outputs_from_aggregates(
+    business_case: Business_Case,
+    profile: Method_Profile,
+    layout: Sequence[str],
+    aggregates: Scenario_Aggregates,
+    scenario: dict[str, Any],
+) -> list[float]:
+    """
+    Function purpose: Computes the outputs of a layout from the aggregates of a scenario \n
+    Outputs: the values of the outputs, in the order of the layout
+    Note: Only reads the sums and the final SOC of the aggregates, so that they can also come from a resampled timeseries
+    (see methods/bootstrap.py).
+    Args:
+        business_case: the class which contains all useful information about the business case
+        profile: the profile of the method
+        layout: the names of the outputs (see select_layout)
+        aggregates: the aggregates of the scenario
+        scenario: the scenario parameters (see read_scenario)
+    """
+    power_level = scenario["power_level"]
+    storage_time_hr = scenario["storage_time_hr"]
+    energy_scale = 1 if profile.per_period_energy else scenario["settlement_period"]
+    years_covered = business_case.years_covered if profile.annualise else 1
+    total = aggregates.sums
+
+    # %% NPV Calculation
+    # Storage CAPEX & OPEX
+    Unit_CAPEX_kW = business_case.input_values[
+        "Power Unit CAPEX"
+    ]  # €/kW (Cost of Power)
+    Unit_CAPEX_kWh = business_case.input_values[
+        "Capacity Unit CAPEX"
+    ]  # €/kWh (Cost of Capacity)
+    OPEX_rate = business_case.input_values["Annual OPEX Rate"]  # % of CAPEX per year
+
+    Storage_CAPEX = 1e3 * (
+        Unit_CAPEX_kW * power_level + Unit_CAPEX_kWh * (storage_time_hr * power_level)
+    )
+    Storage_OPEX = Storage_CAPEX * OPEX_rate
+
+    Project_Life = int(business_case.input_values["Project Life"])  # years
+
+    discount_rate = business_case.input_values["Discount Rate"]  # 10% discount rate
+
+    storage_total_income = (
+        total["storage_income"] + total["extra_generation_income"]
+    )  # Wind + Storage total income
+    storage_net_income_ANNUAL = annual_net_income(business_case, profile, aggregates)
+
+    # Yearly cash flows with the escalation, augmentation, capacity fade and tax of the settings (see libs/finance.py)
+    model = cash_flow_model(business_case)
+    retention = retention_curve(business_case, profile, aggregates, model)
+    cash_flows = model.matrix(
+        Storage_CAPEX,
+        storage_net_income_ANNUAL,
+        Storage_OPEX,
+        Project_Life,
+        faded_income(business_case, profile, aggregates),
+        None if retention is None else retention(Project_Life),
+    )
+
+    irr = profile.irr(cash_flows[0].tolist())
+    # npf.npv(discount_rate, cash_flows) Python NPV calc starts discounting from Year 0 / Excel NPV discounts from Year 1 <- more accepted method
+
+    # Same NPV as npf.npv(discount_rate, cash_flows[1:]) + cash_flows[0], as a matrix-vector product (see discount_factors)
+    npv = float(matrix_npv(cash_flows, discount_rate)[0])
+
+    outputs: dict[str, Callable[[], float]] = {
+        # Total Energy that could be generated assuming no generation constraint (Type B)
+        "Potential Generation": lambda: total["Potential Generation [MW]"]
+        * energy_scale
+        / years_covered,
+        # Total Energy Lost to Type B Curtailment (cannot be mitigate by storage)
+        "Generation Constraint": lambda: total["Generation Constraint [MW]"]
+        * energy_scale
+        / years_covered,
+        # Total Energy that could be produced assuming no transmission constraint (Type A)
+        "Available Energy": lambda: total["Available Power [MW]"]
+        * energy_scale
+        / years_covered,
+        # Total Energy Lost to Type A Curtailment (mitigated by storage, when capacity is available)
+        "Curtailed Energy": lambda: total["Curtailed Power [MW]"]
+        * energy_scale
+        / years_covered,
+        # Total Energy Generated (includes extra generation)
+        "Generated Energy": lambda: (
+            total["Exported Power [MW]"] + total["extra_generation"]
+        )
+        * energy_scale
+        / years_covered,
+        # Total Energy Exported without storage
+        "Exported Energy": lambda: total["Exported Power [MW]"]
+        * energy_scale
+        / years_covered,
+        # Energy lost to conversion inefficiency accross the simulation period, annnualised. Calculated as the difference between what is generated and exported minus anything still in storage at the end of the simulation
+        # (and plus anything already stored at its start)
+        "Storage Losses": lambda: (
+            (
+                total["Exported Power [MW]"]
+                + total["extra_generation"]
+                - total["Net Exported Power_Storage [MW]"]
+            )
+            * energy_scale
+            - (aggregates.final_soc - aggregates.initial_soc)
+        )
+        / years_covered,
+        # Energy Held in storage at the end of the simulation, annualised for year-fraction
+        "Final Storage Energy": lambda: aggregates.final_soc / years_covered,
+        # Total Energy Exported with Storage
+        "Exported Energy With Storage": lambda: total["Net Exported Power_Storage [MW]"]
+        * energy_scale
+        / years_covered,
+        "Storage CAPEX": lambda: Storage_CAPEX,
+        "Storage OPEX": lambda: Storage_OPEX,
+        # Baseline Revenue (no storage)
+        "Baseline Revenue": lambda: total["baseline_income"] / years_covered,
+        # Revenue (A) - Direct Balancing Market
+        "Revenue A": lambda: (total["bal_income"] - total["baseline_income"])
+        / years_covered,
+        # Revenue (B) - Stored Energy to Balancing Market
+        "Revenue B": lambda: (total["storage_income"] - total["bal_income"])
+        / years_covered,
+        # Revenue (C) - Extra Generation-Based Income
+        "Revenue C": lambda: total["extra_generation_income"] / years_covered,
+        # New Wind Farm Revenue with Storage [Nominal + A+B+C]
+        "Total Revenue": lambda: storage_total_income / years_covered,
+        "IRR": lambda: irr,  # Storage Project IRR
+        "NPV": lambda: npv,  # Storage Project NPV
+    }
+    return [outputs[name]() for name in layout]
+
+
+def cash_flow_model(business_case: Business_Case) -> Cash_Flow_Model:
+    """
+    Function purpose: Builds the cash-flow model of the business case (see CASH_FLOW in modify/settings.py) \n
+    Outputs: the Cash_Flow_Model, flat (an annuity) if business_case.cash_flow is empty
+    """
+    return Cash_Flow_Model(**business_case.cash_flow)
+
+
+def retention_curve(
+    business_case: Business_Case,
+    profile: Method_Profile,
+    aggregates: Scenario_Aggregates,
+    model: Cash_Flow_Model,
+) -> Callable[[int], np.ndarray] | None:
+    """
+    Function purpose: Describes the capacity the storage keeps over the project, worn by the rainflow cycles of its SOC
+    (see libs/degradation.py and DEGRADATION in modify/settings.py) \n
+    Outputs: the function giving the share of the capacity left in each year of a project life, None if the degradation
+    is disabled
+    Note: The cycles of the simulated timeseries are repeated every year, the SOC isn't simulated again with the faded
+    capacity. The augmentations of the cash-flow model restore the capacity.
+    Args:
+        business_case: the class which contains all useful information about the business case
+        profile: the profile of the method
+        aggregates: the aggregates of the scenario, holding its cycles
+        model: the cash-flow model of the business case
+    """
+    options = business_case.degradation
+    if not options.get("enabled", False):
+        return None
+    if aggregates.cycles is None:
+        raise ValueError(
+            "The degradation needs the rainflow cycles of the scenario, which weren't counted"
+        )
+    if options["cycle_life"] <= 0 or not 0 <= options["end_of_life_capacity"] <= 1:
+        raise ValueError(
+            "The cycle life must be positive and the end-of-life capacity between 0 and 1"
+        )
+    years_covered = business_case.years_covered if profile.annualise else 1
+    annual_damage = (
+        aggregates.cycles.damage(options["cycle_life"], options["dod_exponent"])
+        / years_covered
+    )
+    return functools.partial(
+        capacity_retention,
+        annual_damage,
+        end_of_life_capacity=options["end_of_life_capacity"],
+        augmentation_years=model.augmentation_years(),
+    )
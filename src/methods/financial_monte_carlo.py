@@ -0,0 +1,267 @@
+# ============================================================================================================================
+# financial_monte_carlo.py - File containing the Monte Carlo on the financial inputs, reusing the simulation of each scenario
+# ============================================================================================================================
+# External Imports
+from typing import Any, Callable, Sequence
+
+import numpy as np
+
+# ============================================================================================================================
+# Internal Imports
+from libs.finance import (
+    Cash_Flow_Model,
+    Scenario_Financials,
+    annuity_irr,
+    annuity_npv,
+    matrix_irr,
+    matrix_npv,
+    storage_capex,
+)
+from libs.logger import log_print
+
+# ============================================================================================================================
+
+# The financial inputs which can be drawn (names of the input_values)
+FINANCIAL_INPUTS: tuple[str, ...] = (
+    "Power Unit CAPEX",
+    "Capacity Unit CAPEX",
+    "Annual OPEX Rate",
+    "Discount Rate",
+    "Project Life",
+)
+
+# The distributions of the draws, with the names of their parameters (multipliers of the input value)
+DISTRIBUTIONS: dict[str, tuple[str, ...]] = {
+    "fixed": (),
+    "uniform": ("low", "high"),
+    "normal": ("mean", "std"),
+    "lognormal": ("median", "sigma"),
+    "triangular": ("low", "mode", "high"),
+}
+
+
+def draw_factors(
+    name: str, distribution: Sequence[Any], draws: int, rng: np.random.Generator
+) -> np.ndarray:
+    """
+    Function purpose: Draws the multipliers applied to a financial input \n
+    Outputs: an array with one multiplier per draw
+    Args:
+        name: the name of the input, for the error messages
+        distribution: the name of the distribution followed by its parameters (see DISTRIBUTIONS), ex: ("uniform", 0.8, 1.2)
+        draws: the amount of draws
+        rng: the random generator
+    """
+    kind, *params = distribution
+    if kind not in DISTRIBUTIONS:
+        raise ValueError(
+            f"Invalid distribution '{kind}' for {name}. Use one of {list(DISTRIBUTIONS)}."
+        )
+    if len(params) != len(DISTRIBUTIONS[kind]):
+        raise ValueError(
+            f"The {kind} distribution of {name} takes the parameters {DISTRIBUTIONS[kind]}, got {params}"
+        )
+
+    if kind == "fixed":
+        return np.ones(draws)
+    elif kind == "uniform":
+        return rng.uniform(params[0], params[1], draws)
+    elif kind == "normal":
+        return rng.normal(params[0], params[1], draws)
+    elif kind == "lognormal":
+        return params[0] * rng.lognormal(0.0, params[1], draws)
+    else:
+        return rng.triangular(params[0], params[1], params[2], draws)
+
+
+def draw_inputs(
+    input_values: dict[str, Any],
+    distributions: dict[str, Sequence[Any]],
+    draws: int,
+    seed: int,
+) -> dict[str, np.ndarray]:
+    """
+    Function purpose: Draws the financial inputs \n
+    Outputs: the draws of every input of FINANCIAL_INPUTS (the inputs without distribution keep their value)
+    Note: Each draw multiplies the value of the input given in the GUI, the Project Life is rounded to whole years (at
+    least 1).
+    Args:
+        input_values: the values of the inputs given in the GUI
+        distributions: the distribution of each drawn input (see draw_factors)
+        draws: the amount of draws
+        seed: the seed of the draws, the same seed gives the same draws
+    """
+    for name in distributions:
+        if name not in FINANCIAL_INPUTS:
+            raise ValueError(
+                f"'{name}' can't be drawn. Use one of {list(FINANCIAL_INPUTS)}."
+            )
+    rng = np.random.default_rng(seed)
+    samples = {
+        name: float(input_values[name])
+        * draw_factors(name, distributions.get(name, ("fixed",)), draws, rng)
+        for name in FINANCIAL_INPUTS
+    }
+    samples["Project Life"] = np.maximum(np.round(samples["Project Life"]), 1)
+    return samples
+
+
+class Monte_Carlo_Result:
+    def __init__(
+        self,
+        scenario_name: str,
+        samples: dict[str, np.ndarray],
+        npv: np.ndarray,
+        irr: np.ndarray,
+    ):
+        """
+        Function purpose: Holds the draws of a financial Monte Carlo and the NPV and IRR of each of them
+        Args:
+            scenario_name: the name of the scenario
+            samples: the draws of every financial input
+            npv: the NPV of every draw
+            irr: the IRR of every draw, NaN where it can't be computed (or is discarded by the cleaning of the method)
+        """
+        self.scenario_name = scenario_name
+        self.samples = samples
+        self.npv = npv
+        self.irr = irr
+        return
+
+    def get(self, output: str) -> np.ndarray:
+        """
+        Function purpose: Gives the draws of an output \n
+        Outputs: the array of the output
+        Args:
+            output: "NPV" or "IRR"
+        """
+        if output == "NPV":
+            return self.npv
+        elif output == "IRR":
+            return self.irr
+        raise ValueError(f"No output named '{output}'. Use 'NPV' or 'IRR'.")
+
+    def percentiles(
+        self, output: str, percentiles: Sequence[float]
+    ) -> dict[float, float]:
+        """
+        Function purpose: Gives percentiles of an output, ignoring the draws where it can't be computed \n
+        Outputs: the value of the output at each percentile
+        Args:
+            output: "NPV" or "IRR"
+            percentiles: the percentiles, between 0 and 100
+        """
+        values = self.get(output)
+        values = values[np.isfinite(values)]
+        if len(values) == 0:
+            return {percentile: np.nan for percentile in percentiles}
+        return dict(zip(percentiles, np.percentile(values, percentiles).tolist()))
+
+    def probability_positive_npv(self) -> float:
+        """
+        Function purpose: Gives the share of draws with a positive NPV \n
+        Outputs: the probability of NPV > 0
+        """
+        return float(np.mean(self.npv > 0))
+
+    def histogram(self, output: str, bins: int) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Function purpose: Gives the histogram of an output, ignoring the draws where it can't be computed \n
+        Outputs: the counts of each bin and the edges of the bins
+        Args:
+            output: "NPV" or "IRR"
+            bins: the amount of bins
+        """
+        values = self.get(output)
+        return np.histogram(values[np.isfinite(values)], bins)
+
+    def summary(self, percentiles: Sequence[float]) -> dict[str, Any]:
+        """
+        Function purpose: Summarizes the distributions of the NPV and IRR \n
+        Outputs: a row with the scenario name, the amount of draws, the mean and percentiles of the NPV, the probability
+        of NPV > 0 and the percentiles of the IRR
+        Args:
+            percentiles: the percentiles reported, between 0 and 100
+        """
+        row: dict[str, Any] = {
+            "Scenario": self.scenario_name,
+            "Draws": len(self.npv),
+            "NPV Mean": float(np.mean(self.npv)),
+        }
+        for percentile, value in self.percentiles("NPV", percentiles).items():
+            row[f"NPV P{percentile:g}"] = value
+        row["P(NPV > 0)"] = self.probability_positive_npv()
+        for percentile, value in self.percentiles("IRR", percentiles).items():
+            row[f"IRR P{percentile:g}"] = value
+        row["IRR Computable"] = float(np.mean(np.isfinite(self.irr)))
+        return row
+
+
+# _____________________________________________________________________________________________________________________________
+def financial_monte_carlo(
+    scenario_name: str,
+    financials: Scenario_Financials,
+    input_values: dict[str, Any],
+    distributions: dict[str, Sequence[Any]],
+    draws: int,
+    seed: int = 0,
+    model: Cash_Flow_Model | None = None,
+    irr_values: Callable[[np.ndarray], np.ndarray] | None = None,
+) -> Monte_Carlo_Result:
+    """
+    Function purpose: Draws the financial inputs of a scenario and computes the NPV and IRR of every draw \n
+    Outputs: the Monte_Carlo_Result of the scenario
+    Note: The financial inputs don't change the dispatch, so the annual net income of the simulated scenario is reused for
+    every draw. With a flat cash-flow model and no capacity fade the NPV of each draw is an annuity (see libs/finance.py),
+    otherwise the cash flows of all the draws are one (draws x years) matrix. Either way the IRR of every draw is solved
+    at once, so 10^5 to 10^6 draws take a few seconds.
+    Args:
+        scenario_name: the name of the scenario
+        financials: what the financials need from the simulation of the scenario (business_case.financials)
+        input_values: the values of the inputs given in the GUI
+        distributions: the distribution of each drawn input (see draw_factors)
+        draws: the amount of draws
+        seed: the seed of the draws, the same seed gives the same draws
+        model: the cash-flow model (see Cash_Flow_Model), None for a flat one
+        irr_values: the cleaning of the IRRs of the method (see Method_Profile of methods/engine.py), so that the draws
+        keeping the GUI values give the IRR of the scenario, None to keep them as they are
+    """
+    samples = draw_inputs(input_values, distributions, draws, seed)
+    capex = storage_capex(
+        samples["Power Unit CAPEX"],
+        samples["Capacity Unit CAPEX"],
+        financials.power_level,
+        financials.storage_time_hr,
+    )
+    model = model or Cash_Flow_Model()
+    if model.flat() and financials.retention is None:
+        annual_cash = financials.annual_net_income - capex * samples["Annual OPEX Rate"]
+        npv = annuity_npv(
+            capex, annual_cash, samples["Discount Rate"], samples["Project Life"]
+        )
+        irr = annuity_irr(capex, annual_cash, samples["Project Life"])
+    else:
+        life = samples["Project Life"].astype(int)
+        cash_flows = model.matrix(
+            capex,
+            financials.annual_net_income,
+            capex * samples["Annual OPEX Rate"],
+            life,
+            financials.faded_income,
+            (
+                None
+                if financials.retention is None
+                else financials.retention(int(life.max()))
+            ),
+        )
+        npv = matrix_npv(cash_flows, samples["Discount Rate"])
+        irr = matrix_irr(cash_flows)
+    if irr_values is not None:
+        irr = irr_values(irr)
+
+    result = Monte_Carlo_Result(scenario_name, samples, npv, irr)
+    log_print(
+        f"Monte Carlo of {scenario_name} over {draws} draws: P(NPV > 0) = {result.probability_positive_npv():.3f},"
+        f" NPV percentiles {result.percentiles('NPV', (5, 50, 95))}"
+    )
+    return result
@@ -0,0 +1,312 @@
+# ============================================================================================================================
+# multi_year.py - File containing the multi-year runs: each timeseries (ex: one per year) simulated on its own, then pooled
+# ============================================================================================================================
+# External Imports
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable
+
+import numpy as np
+import pandas as pd
+
+# ============================================================================================================================
+# Internal Imports
+from libs.aggregates import SOC_BINS, Scenario_Aggregates
+from libs.degradation import Cycle_Counts
+from libs.logger import log_print
+from libs.precision import cast_timeseries
+from methods.engine import (
+    Method_Profile,
+    compute_outputs,
+    outputs_from_aggregates,
+    read_scenario,
+    scenario_view,
+    select_layout,
+)
+from modify.bca_class import Business_Case
+
+# ============================================================================================================================
+
+# How the SOC goes from one year to the next
+SOC_MODES: tuple[str, ...] = (
+    "independent",  # every year starts from an empty storage, the years are simulated in parallel
+    "chained",  # every year starts with the SOC the previous one ended on, the scenarios are simulated in parallel
+)
+
+
+class Year_Result:
+    def __init__(
+        self,
+        outputs: list[str],
+        values: list[float],
+        sums: dict[str, float],
+        initial_soc: float,
+        final_soc: float,
+        years_covered: float,
+        cycles: Cycle_Counts | None = None,
+    ):
+        """
+        Function purpose: Holds the result of a scenario over one of the timeseries, along with what its pooling needs
+        Args:
+            outputs: the names of the outputs
+            values: the outputs of the scenario
+            sums: the sums of the aggregate pass (see libs/aggregates.py)
+            initial_soc: the SOC before the first timestep
+            final_soc: the SOC at the end of the timeseries
+            years_covered: the years covered by the timeseries
+            cycles: the rainflow cycles of the SOC (see libs/degradation.py)
+        """
+        self.outputs = outputs
+        self.values = values
+        self.sums = sums
+        self.initial_soc = initial_soc
+        self.final_soc = final_soc
+        self.years_covered = years_covered
+        self.cycles = cycles
+        return
+
+
+def simulate_years(
+    timeseries: list[pd.DataFrame],
+    param_df: pd.DataFrame,
+    input_values: dict[str, Any],
+    case_type: int,
+    method: int,
+    profile: Method_Profile,
+    scenario_indices: list[int],
+    chained: bool,
+    soc_engine: str,
+    compute_dtype: type,
+    dispatch_strategy: str,
+    dispatch_options: dict[str, dict[str, Any]],
+    dispatch_strategies: dict[str, Any],
+    degradation: dict[str, Any],
+    cash_flow: dict[str, Any],
+    dataflow_cache: dict[str, int],
+) -> dict[tuple[int, int], Year_Result]:
+    """
+    Function purpose: Computes scenarios over several timeseries, one after the other (the task of a worker process) \n
+    Outputs: the Year_Result of every (position of the timeseries, scenario row)
+    Note: Every timeseries gets its own business case, so its method inputs (ex: the power curve applied to the wind
+    speed) are computed once and shared by all its scenarios.
+    Args:
+        timeseries: the timeseries, in chronological order
+        param_df: the Parametric Analysis sheet
+        input_values: the values of the inputs given in the GUI
+        case_type: the type of case
+        method: the method being used to calculate the BC
+        profile: the profile of the method
+        scenario_indices: the rows of the scenarios to compute
+        chained: if True every timeseries starts with the SOC the previous one ended on, otherwise from an empty storage
+        soc_engine: the SOC engine (see libs/soc.py)
+        compute_dtype: the dtype of the timeseries and workspace
+        dispatch_strategy: the dispatch strategy (see DISPATCH_STRATEGIES)
+        dispatch_options: the options of the dispatch strategies
+        dispatch_strategies: the plug-in dispatch strategies (pickled to the workers, so made of module-level functions)
+        degradation: the options of the capacity fade of the storage
+        cash_flow: the options of the yearly cash flows
+        dataflow_cache: the bounds of the cache of the graphs
+    """
+    results: dict[tuple[int, int], Year_Result] = {}
+    final_socs = dict.fromkeys(scenario_indices, 0.0)
+    for year, df in enumerate(timeseries):
+        business_case = Business_Case()
+        business_case.df = (
+            df if compute_dtype == np.float64 else cast_timeseries(df, compute_dtype)
+        )
+        business_case.float64_df = None if compute_dtype == np.float64 else df
+        business_case.param_df = param_df
+        business_case.input_values = input_values
+        business_case.case_type = case_type
+        business_case.method = method
+        business_case.plotting = False
+        business_case.soc_engine = soc_engine
+        business_case.compute_dtype = compute_dtype
+        business_case.dispatch_strategy = dispatch_strategy
+        business_case.dispatch_options = dispatch_options
+        business_case.dispatch_strategies = dispatch_strategies
+        business_case.degradation = degradation
+        business_case.cash_flow = cash_flow
+        business_case.dataflow_cache = dataflow_cache
+
+        for scenario_index in scenario_indices:
+            scenario = read_scenario(business_case, scenario_index)
+            if chained:
+                scenario["initial_soc"] = final_socs[scenario_index]
+            columns = scenario_view(business_case, profile, scenario)
+            values = compute_outputs(business_case, profile, columns, scenario)
+            aggregates = business_case.aggregates
+            final_socs[scenario_index] = aggregates.final_soc
+            results[(year, scenario_index)] = Year_Result(
+                select_layout(profile, columns),
+                values,
+                aggregates.sums,
+                aggregates.initial_soc,
+                aggregates.final_soc,
+                business_case.years_covered if profile.annualise else 1.0,
+                aggregates.cycles,
+            )
+    return results
+
+
+def pool_years(
+    business_case: Business_Case,
+    profile: Method_Profile,
+    scenario_index: int,
+    years: list[Year_Result],
+    chained: bool,
+) -> list[float]:
+    """
+    Function purpose: Computes the outputs of a scenario over all the timeseries together \n
+    Outputs: the pooled outputs, annualised over the years covered by all the timeseries
+    Note: The sums of every year are added up. With chained years only the energy left at the end of the last year stays
+    in the storage, with independent years the energy left at the end of each year does.
+    Args:
+        business_case: the class which contains all useful information about the business case
+        profile: the profile of the method
+        scenario_index: the row of the scenario
+        years: the Year_Result of every timeseries, in chronological order
+        chained: whether the years were chained
+    """
+    sums = {name: sum(year.sums[name] for year in years) for name in years[0].sums}
+    if chained:
+        initial_soc, final_soc = years[0].initial_soc, years[-1].final_soc
+    else:
+        initial_soc = sum(year.initial_soc for year in years)
+        final_soc = sum(year.final_soc for year in years)
+    aggregates = Scenario_Aggregates(
+        sums,
+        final_soc,
+        np.nan,
+        np.nan,
+        np.nan,
+        np.zeros(len(SOC_BINS) - 1),
+        SOC_BINS,
+        np.zeros(0),
+        np.zeros(1),
+        initial_soc,
+        (
+            None
+            if any(year.cycles is None for year in years)
+            else Cycle_Counts.concatenate([year.cycles for year in years])
+        ),
+    )
+    pooled = Business_Case()
+    pooled.input_values = business_case.input_values
+    pooled.degradation = business_case.degradation
+    pooled.cash_flow = business_case.cash_flow
+    pooled.years_covered = sum(year.years_covered for year in years)
+    return outputs_from_aggregates(
+        pooled,
+        profile,
+        years[0].outputs,
+        aggregates,
+        read_scenario(business_case, scenario_index),
+    )
+
+
+# _____________________________________________________________________________________________________________________________
+def run_multi_year(
+    business_case: Business_Case,
+    profile: Method_Profile,
+    scenario_indices: list[int],
+    soc_mode: str = "independent",
+    workers: int | None = None,
+    progress: Callable[[float], None] | None = None,
+) -> pd.DataFrame:
+    """
+    Function purpose: Computes every scenario over each timeseries of business_case.timeseries (ex: one per year) and
+    over all of them pooled \n
+    Outputs: one row per scenario and timeseries, then one pooled row per scenario (Year "Pooled"), with the outputs
+    Note: The timeseries are simulated in separate processes: one per year if the years are independent, one per group
+    of scenarios if they are chained (each year then needs the SOC the previous one ended on).
+    Args:
+        business_case: the class which contains all useful information about the business case
+        profile: the profile of the method
+        scenario_indices: the rows of the scenarios to compute
+        soc_mode: one of SOC_MODES
+        workers: the amount of worker processes, the amount of CPUs if None
+        progress: called with the percentage of the tasks done after each one
+    """
+    if soc_mode not in SOC_MODES:
+        raise ValueError(
+            f"Invalid multi-year SOC mode '{soc_mode}'. Use one of {list(SOC_MODES)}."
+        )
+    chained = soc_mode == "chained"
+    timeseries = business_case.timeseries
+    workers = max(1, workers or os.cpu_count() or 1)
+
+    common = (
+        business_case.param_df,
+        business_case.input_values,
+        business_case.case_type,
+        business_case.method,
+        profile,
+    )
+    settings = (
+        business_case.soc_engine,
+        business_case.compute_dtype,
+        business_case.dispatch_strategy,
+        business_case.dispatch_options,
+        business_case.dispatch_strategies,
+        business_case.degradation,
+        business_case.cash_flow,
+        business_case.dataflow_cache,
+    )
+    if chained:
+        groups = [
+            list(group)
+            for group in np.array_split(
+                scenario_indices, min(workers, len(scenario_indices))
+            )
+            if len(group)
+        ]
+        tasks = [(timeseries, *common, group, True, *settings) for group in groups]
+        task_years = [list(range(len(timeseries)))] * len(tasks)
+    else:
+        tasks = [
+            ([df], *common, scenario_indices, False, *settings) for df in timeseries
+        ]
+        task_years = [[year] for year in range(len(timeseries))]
+
+    results: dict[tuple[int, int], Year_Result] = {}
+    log_print(
+        f"Simulating {len(scenario_indices)} scenarios over {len(timeseries)} timeseries ({soc_mode} years)"
+        f" with {min(workers, len(tasks))} processes"
+    )
+    with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+        futures = [pool.submit(simulate_years, *task) for task in tasks]
+        for done, (future, years) in enumerate(zip(futures, task_years), start=1):
+            for (position, scenario_index), result in future.result().items():
+                results[(years[position], scenario_index)] = result
+            if progress is not None:
+                progress(done / len(tasks) * 100)
+
+    rows = []
+    names = business_case.timeseries_names
+    for scenario_index in scenario_indices:
+        scenario_name = str(business_case.param_df.iloc[scenario_index, 0])
+        years = [results[(year, scenario_index)] for year in range(len(timeseries))]
+        for year, result in enumerate(years):
+            rows.append(
+                {
+                    "Scenario": scenario_name,
+                    "Year": names[year],
+                    **dict(zip(result.outputs, result.values)),
+                }
+            )
+        rows.append(
+            {
+                "Scenario": scenario_name,
+                "Year": "Pooled",
+                **dict(
+                    zip(
+                        years[0].outputs,
+                        pool_years(
+                            business_case, profile, scenario_index, years, chained
+                        ),
+                    )
+                ),
+            }
+        )
+    return pd.DataFrame(rows)
@@ -0,0 +1,125 @@
+# ============================================================================================================================
+# optimal_dispatch.py - File containing the perfect-foresight optimal dispatch, a benchmark of the dispatch strategies
+# ============================================================================================================================
+# External Imports
+import numpy as np
+import pandas as pd
+
+# ============================================================================================================================
+# Internal Imports
+from libs.dataflow import Dataflow_View
+from libs.logger import log_print
+from methods.engine import (
+    Method_Profile,
+    compute_outputs,
+    read_scenario,
+    scenario_view,
+    select_layout,
+)
+from modify.bca_class import Business_Case
+
+# ============================================================================================================================
+
+
+class Dispatch_Benchmark:
+    def __init__(
+        self,
+        scenario_name: str,
+        outputs: list[str],
+        heuristic: list[float],
+        optimal: list[float],
+        soc_levels: int,
+    ):
+        """
+        Function purpose: Holds the outputs of a scenario with its dispatch strategy and with the optimal dispatch
+        Args:
+            scenario_name: the name of the scenario
+            outputs: the names of the outputs
+            heuristic: the outputs with the dispatch strategy of the business case (see DISPATCH_STRATEGIES)
+            optimal: the outputs with the perfect-foresight optimal dispatch
+            soc_levels: the amount of SOC levels of the optimization
+        """
+        self.scenario_name = scenario_name
+        self.outputs = outputs
+        self.heuristic = heuristic
+        self.optimal = optimal
+        self.soc_levels = soc_levels
+        return
+
+    def table(self) -> pd.DataFrame:
+        """
+        Function purpose: Lays the outputs of both dispatches side by side \n
+        Outputs: a dataframe with, for each output, its value with both dispatches and what the optimal dispatch adds
+        """
+        heuristic = np.asarray(self.heuristic, dtype=float)
+        optimal = np.asarray(self.optimal, dtype=float)
+        return pd.DataFrame(
+            {
+                "Scenario": self.scenario_name,
+                "Output": self.outputs,
+                "Strategy": heuristic,
+                "Optimal": optimal,
+                "Difference": optimal - heuristic,
+            }
+        )
+
+
+# _____________________________________________________________________________________________________________________________
+def optimal_dispatch(
+    business_case: Business_Case,
+    scenario_index: int,
+    profile: Method_Profile,
+    soc_levels: int = 101,
+) -> Dispatch_Benchmark:
+    """
+    Function purpose: Computes a scenario with its dispatch strategy and with the perfect-foresight optimal dispatch, to
+    show how much income the strategy leaves on the table \n
+    Outputs: the Dispatch_Benchmark of the scenario
+    Note: The SOC of the optimal dispatch is the optimal_soc node of the graph (see build_graph), its revenues, energies and
+    financials are then computed by the engine exactly as for the dispatch strategy. The optimal dispatch interpolates
+    between SOC levels, so it can fall short of a strategy: a warning is then logged.
+    Args:
+        business_case: the class which contains all useful information about the business case
+        scenario_index: the row number of the scenario
+        profile: the profile of the method
+        soc_levels: the amount of SOC levels of the optimization (more is closer to the true optimum but slower)
+    """
+    base = read_scenario(business_case, scenario_index)
+    columns = scenario_view(business_case, profile, base)
+    outputs = select_layout(profile, columns)
+    heuristic = compute_outputs(business_case, profile, columns, base)
+
+    graph = columns.graph
+    if not graph.has("optimal_soc"):
+        raise ValueError(
+            f"The optimal dispatch isn't available for the {profile.name} method"
+        )
+    optimal_params = {**base, "optimal_soc_levels": soc_levels}
+    params = {
+        **optimal_params,
+        "dispatch": (
+            "optimal_soc",
+            tuple(
+                (name, optimal_params[name])
+                for name in graph.dependencies["optimal_soc"]
+            ),
+        ),
+    }
+    business_case.columns = Dataflow_View(graph, params)
+    optimal = compute_outputs(business_case, profile, business_case.columns, params)
+
+    scenario_name = str(business_case.param_df.iloc[scenario_index, 0])
+    benchmark = Dispatch_Benchmark(
+        scenario_name, outputs, heuristic, optimal, soc_levels
+    )
+    if "NPV" in outputs:
+        log_print(
+            f"Optimal dispatch of {scenario_name}: NPV {optimal[outputs.index('NPV')]:.0f} against"
+            f" {heuristic[outputs.index('NPV')]:.0f} with the {business_case.dispatch_strategy} dispatch"
+        )
+        if optimal[outputs.index("NPV")] < heuristic[outputs.index("NPV")]:
+            log_print(
+                f"Warning: the optimal dispatch of {scenario_name} is below the {business_case.dispatch_strategy}"
+                f" dispatch, use more SOC levels (currently {soc_levels})"
+            )
+    return benchmark
@@ -0,0 +1,305 @@
+# ============================================================================================================================
+# optimizer.py - File containing the storage sizing optimizer: searches the power rating and duration maximizing NPV or IRR
+# ============================================================================================================================
+# External Imports
+import math
+from typing import Any, Callable
+
+import numpy as np
+import pandas as pd
+
+# ============================================================================================================================
+# Internal Imports
+from libs.dataflow import Dataflow_View
+from libs.logger import log_print
+from methods.engine import (
+    Method_Profile,
+    compute_outputs,
+    read_scenario,
+    scenario_view,
+    select_layout,
+)
+from methods.sweep import SWEEP_AXES
+from modify.bca_class import Business_Case
+
+# ============================================================================================================================
+
+# Objectives the optimizer can maximize
+OBJECTIVES: tuple[str, ...] = ("NPV", "IRR")
+
+GOLDEN_RATIO: float = (1 + math.sqrt(5)) / 2
+
+
+def parse_bounds(
+    name: str, text: str, default: tuple[float, float, float]
+) -> tuple[float, float, float]:
+    """
+    Function purpose: Reads the search bounds of a sized parameter as typed by the user \n
+    Outputs: the (lowest value, highest value, resolution) of the search
+    Args:
+        name: the name of the parameter
+        text: "start:stop" or "start:stop:step", empty to use the default
+        default: the bounds used if text is empty, or the resolution if text has no step
+    """
+    text = str(text).strip()
+    if text == "":
+        return default
+    try:
+        values = [float(value) for value in text.split(":")]
+    except ValueError:
+        raise ValueError(f"Invalid bounds '{text}' for {name}, use 'start:stop:step'")
+    if len(values) == 2:
+        values.append(default[2])
+    if len(values) != 3 or values[2] <= 0 or values[1] < values[0]:
+        raise ValueError(
+            f"Invalid bounds '{text}' for {name}, use 'start:stop:step' with step > 0 and stop >= start"
+        )
+    return values[0], values[1], values[2]
+
+
+class Sizing_Result:
+    def __init__(
+        self,
+        scenario_name: str,
+        objective: str,
+        outputs: list[str],
+        best: dict[str, Any],
+        neighbourhood: pd.DataFrame,
+        evaluations: pd.DataFrame,
+    ):
+        """
+        Function purpose: Holds the result of a sizing optimization
+        Args:
+            scenario_name: the name of the optimized scenario
+            objective: the maximized output
+            outputs: the names of the outputs of the method
+            best: the scenario parameters and the outputs of the optimum
+            neighbourhood: the objective on the grid points surrounding the optimum (power along the rows, duration along
+            the columns), NaN where they weren't simulated
+            evaluations: every simulated (power, duration) pair with its outputs, in the order they were simulated
+        """
+        self.scenario_name = scenario_name
+        self.objective = objective
+        self.outputs = outputs
+        self.best = best
+        self.neighbourhood = neighbourhood
+        self.evaluations = evaluations
+        return
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """
+        Function purpose: Lays the optimum out like a row of the Parametric Analysis sheet \n
+        Outputs: a single row dataframe with the scenario name, its parameters and its outputs
+        """
+        return pd.DataFrame(
+            [{"Scenario": self.scenario_name, **self.best}],
+        )
+
+
+class Sizing_Optimizer:
+    def __init__(
+        self,
+        business_case: Business_Case,
+        scenario_index: int,
+        profile: Method_Profile,
+        power_bounds: tuple[float, float, float],
+        duration_bounds: tuple[float, float, float],
+        objective: str = "NPV",
+    ):
+        """
+        Function purpose: Searches the Storage Power Rating and Duration of a scenario maximizing its NPV or IRR
+        Note: The search works on the grid given by the resolution of each parameter, each grid point is simulated at most
+        once (see the memo table), the other parameters keep the scenario's value.
+        Args:
+            business_case: the class which contains all useful information about the business case
+            scenario_index: the row number of the scenario
+            profile: the profile of the method
+            power_bounds: the (lowest, highest, resolution) of the Storage Power Rating [MW]
+            duration_bounds: the (lowest, highest, resolution) of the Duration [h]
+            objective: the output to maximize, one of OBJECTIVES
+        """
+        if objective not in OBJECTIVES:
+            raise ValueError(
+                f"Invalid objective '{objective}'. Use one of {list(OBJECTIVES)}."
+            )
+        self.business_case = business_case
+        self.scenario_index = scenario_index
+        self.profile = profile
+        self.objective = objective
+        self.base = read_scenario(business_case, scenario_index)
+        self.graph = scenario_view(business_case, profile, self.base).graph
+        self.outputs = select_layout(profile, business_case.columns)
+
+        # Grid of the search: value = lowest + index * resolution
+        self.grids: list[np.ndarray] = [
+            np.round(np.arange(low, high + resolution / 2, resolution), 10)
+            for low, high, resolution in (power_bounds, duration_bounds)
+        ]
+        # Memo table: (power index, duration index) -> outputs
+        self.memo: dict[tuple[int, int], list[float]] = {}
+        return
+
+    def evaluate(self, position: tuple[int, int]) -> float:
+        """
+        Function purpose: Gives the objective at a grid point, simulating it only if it isn't in the memo table yet \n
+        Outputs: the objective (-inf if it can't be computed, ex: an IRR without sign change)
+        Args:
+            position: the (power index, duration index) of the grid point
+        """
+        if position not in self.memo:
+            params = {
+                **self.base,
+                SWEEP_AXES["Storage Power Rating"]: float(self.grids[0][position[0]]),
+                SWEEP_AXES["Duration"]: float(self.grids[1][position[1]]),
+            }
+            self.business_case.power_level = params["power_level"]
+            self.business_case.columns = Dataflow_View(self.graph, params)
+            self.memo[position] = compute_outputs(
+                self.business_case, self.profile, self.business_case.columns, params
+            )
+        value = self.memo[position][self.outputs.index(self.objective)]
+        return float(value) if np.isfinite(value) else -np.inf
+
+    def golden_section(
+        self, function: Callable[[int], float], low: int, high: int
+    ) -> int:
+        """
+        Function purpose: Maximizes a (mostly unimodal) function of a grid index with a golden-section search \n
+        Outputs: the index of the maximum
+        Args:
+            function: the function of the grid index to maximize
+            low: the lowest index of the search
+            high: the highest index of the search
+        """
+        while high - low > 3:
+            step = round((high - low) / GOLDEN_RATIO)
+            inner_low, inner_high = high - step, low + step
+            if inner_low >= inner_high:
+                inner_low, inner_high = inner_high - 1, inner_high
+            if function(inner_low) >= function(inner_high):
+                high = inner_high
+            else:
+                low = inner_low
+        return max(range(low, high + 1), key=function)
+
+    def search(self, max_passes: int = 3) -> tuple[int, int]:
+        """
+        Function purpose: Finds the grid point maximizing the objective \n
+        Outputs: the (power index, duration index) of the optimum
+        Note: A coordinate search (golden-section along the power, then along the duration, until neither moves) finds
+        the neighbourhood of the optimum, a local refinement then moves to the best of the 8 surrounding grid points until
+        none is better.
+        Args:
+            max_passes: the maximum amount of coordinate search passes
+        """
+        position = (len(self.grids[0]) // 2, len(self.grids[1]) // 2)
+        for _ in range(max_passes):
+            power = self.golden_section(
+                lambda i: self.evaluate((i, position[1])), 0, len(self.grids[0]) - 1
+            )
+            duration = self.golden_section(
+                lambda j: self.evaluate((power, j)), 0, len(self.grids[1]) - 1
+            )
+            if (power, duration) == position:
+                break
+            position = (power, duration)
+
+        while True:
+            neighbours = [
+                (position[0] + i, position[1] + j)
+                for i in (-1, 0, 1)
+                for j in (-1, 0, 1)
+                if 0 <= position[0] + i < len(self.grids[0])
+                and 0 <= position[1] + j < len(self.grids[1])
+            ]
+            best = max(neighbours, key=self.evaluate)
+            if self.evaluate(best) <= self.evaluate(position):
+                return position
+            position = best
+
+    def result(self, position: tuple[int, int]) -> Sizing_Result:
+        """
+        Function purpose: Gathers the optimum, its neighbourhood and the memo table \n
+        Outputs: the Sizing_Result of the search
+        Args:
+            position: the (power index, duration index) of the optimum
+        """
+        parameters = {name: self.base[key] for name, key in SWEEP_AXES.items()}
+
+        def row(point: tuple[int, int]) -> dict[str, Any]:
+            return {
+                **parameters,
+                "Storage Power Rating": float(self.grids[0][point[0]]),
+                "Duration": float(self.grids[1][point[1]]),
+                **dict(zip(self.outputs, self.memo[point])),
+            }
+
+        powers = range(
+            max(position[0] - 1, 0), min(position[0] + 2, len(self.grids[0]))
+        )
+        durations = range(
+            max(position[1] - 1, 0), min(position[1] + 2, len(self.grids[1]))
+        )
+        neighbourhood = pd.DataFrame(
+            [
+                [
+                    (
+                        self.memo[(i, j)][self.outputs.index(self.objective)]
+                        if (i, j) in self.memo
+                        else np.nan
+                    )
+                    for j in durations
+                ]
+                for i in powers
+            ],
+            index=pd.Index(self.grids[0][list(powers)], name="Storage Power Rating"),
+            columns=pd.Index(self.grids[1][list(durations)], name="Duration"),
+        )
+        return Sizing_Result(
+            str(self.business_case.param_df.iloc[self.scenario_index, 0]),
+            self.objective,
+            self.outputs,
+            row(position),
+            neighbourhood,
+            pd.DataFrame([row(point) for point in self.memo]),
+        )
+
+
+# _____________________________________________________________________________________________________________________________
+def optimize_sizing(
+    business_case: Business_Case,
+    scenario_index: int,
+    profile: Method_Profile,
+    power_bounds: tuple[float, float, float],
+    duration_bounds: tuple[float, float, float],
+    objective: str = "NPV",
+    max_passes: int = 3,
+) -> Sizing_Result:
+    """
+    Function purpose: Finds the Storage Power Rating and Duration of a scenario maximizing its NPV or IRR \n
+    Outputs: the Sizing_Result holding the optimum, its neighbourhood and every simulated pair
+    Note: Relies on the response being smooth and mostly unimodal in each parameter, which usually takes 20 to 50
+    simulations instead of the whole grid. The optimum is always a grid point at least as good as its 8 neighbours.
+    Args:
+        business_case: the class which contains all useful information about the business case
+        scenario_index: the row number of the scenario
+        profile: the profile of the method
+        power_bounds: the (lowest, highest, resolution) of the Storage Power Rating [MW]
+        duration_bounds: the (lowest, highest, resolution) of the Duration [h]
+        objective: the output to maximize, one of OBJECTIVES
+        max_passes: the maximum amount of coordinate search passes
+    """
+    optimizer = Sizing_Optimizer(
+        business_case,
+        scenario_index,
+        profile,
+        power_bounds,
+        duration_bounds,
+        objective,
+    )
+    result = optimizer.result(optimizer.search(max_passes))
+    log_print(
+        f"Sizing of {result.scenario_name}: {objective} = {result.best[objective]} at {result.best['Storage Power Rating']} MW"
+        f" / {result.best['Duration']} h after {len(optimizer.memo)} simulations (grid of {len(optimizer.grids[0]) * len(optimizer.grids[1])})"
+    )
+    return result
@@ -0,0 +1,251 @@
+# ============================================================================================================================
+# participation.py - File containing the closed-form evaluation of a scenario over many Balancing Market Participations
+# ============================================================================================================================
+# External Imports
+import copy
+from typing import Any, Sequence
+
+import numpy as np
+
+# ============================================================================================================================
+# Internal Imports
+from libs.aggregates import aggregate_columns
+from libs.dataflow import Dataflow_View
+from methods.engine import (
+    THRESHOLD_DISPATCH,
+    Method_Profile,
+    outputs_from_aggregates,
+    select_layout,
+    storage_capacity,
+    summed_columns,
+)
+from modify.bca_class import Business_Case
+
+# ============================================================================================================================
+
+# The summed columns which depend on the Balancing Market Participation (see build_graph), all the others don't
+PARTICIPATION_SUMS: tuple[str, ...] = ("bal_income", "storage_income")
+
+
+class Participation_Basis:
+    def __init__(
+        self,
+        bal_income: tuple[float, float],
+        storage_income: tuple[float, float],
+        thresholds: np.ndarray,
+        switch_constant: np.ndarray,
+        switch_slope: np.ndarray,
+    ):
+        """
+        Function purpose: Holds the sums of bal_income and storage_income of a scenario as functions of the balancing share
+        s (the participation divided by the balancing divisor of the profile). Both are affine in s on every row, except
+        for the charging rows switching to branch [D] of storage_income once s x balancing base >= power level
+        Args:
+            bal_income: the (constant, slope) of the sum of bal_income
+            storage_income: the (constant, slope) of the sum of storage_income, with every switching row outside of [D]
+            thresholds: the sorted shares from which each switching row is in branch [D]
+            switch_constant: the change of the constant once the first k switching rows are in [D], for k from 0 to
+            len(thresholds)
+            switch_slope: the change of the slope once the first k switching rows are in [D]
+        """
+        self.bal_income = bal_income
+        self.storage_income = storage_income
+        self.thresholds = thresholds
+        self.switch_constant = switch_constant
+        self.switch_slope = switch_slope
+        return
+
+    def sums(self, shares: np.ndarray) -> dict[str, np.ndarray]:
+        """
+        Function purpose: Evaluates the sums for many balancing shares at once \n
+        Outputs: the sum of each column of PARTICIPATION_SUMS for every share
+        Args:
+            shares: the balancing shares (>= 0)
+        """
+        switched = np.searchsorted(self.thresholds, shares, side="right")
+        return {
+            "bal_income": self.bal_income[0] + self.bal_income[1] * shares,
+            "storage_income": self.storage_income[0]
+            + self.switch_constant[switched]
+            + (self.storage_income[1] + self.switch_slope[switched]) * shares,
+        }
+
+
+def participation_basis(
+    columns: Dataflow_View,
+    profile: Method_Profile,
+    params: dict[str, Any],
+    weights: np.ndarray | None = None,
+) -> Participation_Basis:
+    """
+    Function purpose: Splits every row of bal_income and storage_income into a constant and a factor of the balancing
+    share, per branch of storage_income (see build_graph) \n
+    Outputs: the Participation_Basis of the scenario
+    Note: Only reads the columns which don't depend on the participation (the dispatch, the SOC and the prices), the rows
+    are summed in float64. A row whose income is NaN counts as 0, like in the aggregate pass.
+    Args:
+        columns: the view of the scenario on the graph
+        profile: the profile of the method
+        params: the scenario parameters (see read_scenario)
+        weights: the amount of times each row counts, None for once
+    """
+
+    def column(name: str) -> np.ndarray:
+        return np.asarray(columns[name], dtype=np.float64)
+
+    power_level = params["power_level"]
+    settlement_period = params["settlement_period"]
+    green_certificate = params["green_certificate"]
+    eff_charge_discharge = column("eff_charge_discharge")
+    deltapower = column("deltapower")
+    exported = column("Exported Power [MW]")
+    balancing_base = column(profile.balancing_base)
+    wholesale = np.broadcast_to(column("Wholesale_Price"), exported.shape)
+    prices = column("Balancing Prices")
+    revenue_prices = column("Revenue Balancing Prices")
+    weights = np.ones(len(exported)) if weights is None else weights
+
+    def total(values: np.ndarray) -> float:
+        return float(np.sum(np.nan_to_num(values) * weights))
+
+    # bal_income = wholesale share + s x (balancing - wholesale) share of the exported energy
+    bal_constant = (wholesale + green_certificate) * exported * settlement_period
+    bal_slope = exported * (prices - wholesale) * settlement_period
+
+    discharging = eff_charge_discharge < 0
+    charging = eff_charge_discharge > 0
+    switching = charging & (deltapower >= 0)
+    idle = ~(discharging | switching)  # [A], [C] and the rows whose dispatch is NaN
+    exporting = power_level <= exported
+
+    # Constant and slope of every row, the switching rows being in [E] or [F]
+    storage_constant = np.where(
+        idle,
+        bal_constant,
+        np.where(
+            discharging,
+            bal_constant - eff_charge_discharge * revenue_prices * settlement_period,
+            np.where(
+                exporting,
+                bal_constant
+                - eff_charge_discharge
+                * (wholesale + revenue_prices)
+                * settlement_period,  # [E]
+                -power_level * revenue_prices * settlement_period,  # [F]
+            ),
+        ),
+    )
+    storage_slope = np.where(
+        switching,
+        np.where(
+            exporting,
+            bal_slope + balancing_base * wholesale * settlement_period,  # [E]
+            balancing_base * revenue_prices * settlement_period,  # [F]
+        ),
+        bal_slope,
+    )
+
+    # The switching rows go to [D] (charged from the balancing market) once s x balancing base >= power level
+    with np.errstate(divide="ignore", invalid="ignore"):
+        thresholds = np.where(
+            balancing_base[switching] > 0,
+            power_level / balancing_base[switching],
+            np.where(power_level <= 0, -np.inf, np.inf),
+        )
+    order = np.argsort(thresholds, kind="stable")
+    row_weights = weights[switching][order]
+    d_constant = (
+        bal_constant - eff_charge_discharge * revenue_prices * settlement_period
+    )[switching][order]
+    d_slope = bal_slope[switching][order]
+    switch_constant = np.concatenate(
+        (
+            [0.0],
+            np.cumsum(
+                (
+                    np.nan_to_num(d_constant)
+                    - np.nan_to_num(storage_constant[switching][order])
+                )
+                * row_weights
+            ),
+        )
+    )
+    switch_slope = np.concatenate(
+        (
+            [0.0],
+            np.cumsum(
+                (
+                    np.nan_to_num(d_slope)
+                    - np.nan_to_num(storage_slope[switching][order])
+                )
+                * row_weights
+            ),
+        )
+    )
+
+    return Participation_Basis(
+        (total(bal_constant), total(bal_slope)),
+        (total(storage_constant), total(storage_slope)),
+        thresholds[order],
+        switch_constant,
+        switch_slope,
+    )
+
+
+# _____________________________________________________________________________________________________________________________
+def participation_outputs(
+    business_case: Business_Case,
+    profile: Method_Profile,
+    columns: Dataflow_View,
+    params: dict[str, Any],
+    percentages: Sequence[float],
+) -> tuple[list[str], np.ndarray]:
+    """
+    Function purpose: Computes the outputs of a scenario for many values of its Balancing Market Participation \n
+    Outputs: the names of the outputs, and a (percentages x outputs) array of the outputs for every participation
+    Note: The participation only sets how the exported energy is split between the wholesale and the balancing market,
+    it doesn't change the dispatch nor the SOC. The scenario is simulated and aggregated once, then only bal_income and
+    storage_income are evaluated for each participation (see Participation_Basis), so a whole participation sweep costs
+    about one simulation.
+    Args:
+        business_case: the class which contains all useful information about the business case
+        profile: the profile of the method
+        columns: the view of the scenario on the graph (any participation)
+        params: the scenario parameters (see read_scenario)
+        percentages: the values of the Balancing Market Participation, as in the Parametric Analysis sheet
+    """
+    if business_case.dispatch_strategy != THRESHOLD_DISPATCH:
+        raise ValueError(
+            f"The participations can only be evaluated in closed form with the {THRESHOLD_DISPATCH} dispatch"
+        )
+    shares = np.asarray(percentages, dtype=np.float64) / profile.balancing_divisor
+    if np.any(shares < 0):
+        raise ValueError("The Balancing Market Participation can't be negative")
+
+    layout = select_layout(profile, columns)
+    aggregates = aggregate_columns(
+        columns,
+        [name for name in summed_columns(layout) if name not in PARTICIPATION_SUMS],
+        params["power_level"],
+        weights=business_case.row_weights,
+        initial_soc=params["initial_soc"],
+        capacity=storage_capacity(profile, params),
+    )
+    basis = participation_basis(columns, profile, params, business_case.row_weights)
+    sums = basis.sums(shares)
+
+    values = np.full((len(shares), len(layout)), np.nan)
+    for i, percentage in enumerate(percentages):
+        share_aggregates = copy.copy(aggregates)
+        share_aggregates.sums = {
+            **aggregates.sums,
+            **{name: float(total[i]) for name, total in sums.items()},
+        }
+        values[i] = outputs_from_aggregates(
+            business_case,
+            profile,
+            layout,
+            share_aggregates,
+            {**params, "balancing_percentage": percentage},
+        )
+    return layout, values
@@ -0,0 +1,238 @@
+# ============================================================================================================================
+# price_paths.py - File containing the price-path Monte Carlo: the scenarios re-simulated over perturbed balancing prices
+# ============================================================================================================================
+# External Imports
+import math
+from typing import Any, Callable, Sequence
+
+import numpy as np
+
+# ============================================================================================================================
+# Internal Imports
+from libs.dataflow import Dataflow_View
+from libs.logger import log_print
+from libs.soc import soc_batched
+from methods.engine import (
+    Method_Profile,
+    compute_outputs,
+    read_scenario,
+    scenario_view,
+    select_layout,
+    soc_timestep,
+    stacked_soc_bounds,
+    storage_capacity,
+)
+from methods.financial_monte_carlo import Monte_Carlo_Result, draw_factors
+from modify.bca_class import Business_Case
+
+# ============================================================================================================================
+
+# Amount of price paths simulated at once
+DEFAULT_PATH_BLOCK: int = 64
+
+
+class Price_Paths:
+    def __init__(
+        self,
+        scales: np.ndarray,
+        shifts: np.ndarray,
+        days: np.ndarray | None,
+        rows_per_day: int,
+    ):
+        """
+        Function purpose: Describes M perturbed versions of a price series, each path being
+        scale x (the prices of the resampled days) + shift. The (M x timesteps) array of the paths is only built one block
+        of paths at a time (see block)
+        Args:
+            scales: the multiplier of the prices of each path
+            shifts: the amount added to the prices of each path [€/MWh]
+            days: a (paths x days) array of the day of the timeseries each day of each path is taken from, None to keep
+            the days in place
+            rows_per_day: the amount of timesteps per day
+        """
+        self.scales = scales
+        self.shifts = shifts
+        self.days = days
+        self.rows_per_day = rows_per_day
+        return
+
+    def __len__(self) -> int:
+        return len(self.scales)
+
+    def rows(self, start: int, stop: int, length: int) -> np.ndarray:
+        """
+        Function purpose: Gives the row of the timeseries each timestep of a block of paths is taken from \n
+        Outputs: a (paths x length) array of row numbers
+        Note: A trailing partial day always keeps its own rows.
+        Args:
+            start: the first path of the block
+            stop: the path after the last one of the block
+            length: the amount of timesteps of the timeseries
+        """
+        rows = np.broadcast_to(np.arange(length), (stop - start, length))
+        if self.days is None:
+            return rows
+        rows = rows.copy()
+        full_rows = self.days.shape[1] * self.rows_per_day
+        rows[:, :full_rows] = (
+            self.days[start:stop, :, None] * self.rows_per_day
+            + np.arange(self.rows_per_day)
+        ).reshape(stop - start, full_rows)
+        return rows
+
+    def block(self, prices: np.ndarray, start: int, stop: int) -> np.ndarray:
+        """
+        Function purpose: Builds the prices of a block of paths \n
+        Outputs: a (paths x timesteps) array, one perturbed price series per row
+        Args:
+            prices: the price series of the timeseries
+            start: the first path of the block
+            stop: the path after the last one of the block
+        """
+        return (
+            self.scales[start:stop, None] * prices[self.rows(start, stop, len(prices))]
+            + self.shifts[start:stop, None]
+        )
+
+
+def generate_price_paths(
+    length: int,
+    rows_per_day: int,
+    paths: int,
+    scale: Sequence[Any] | None,
+    shift: Sequence[Any] | None,
+    bootstrap_days: int,
+    seed: int = 0,
+) -> Price_Paths:
+    """
+    Function purpose: Draws the perturbations of the price paths \n
+    Outputs: the Price_Paths
+    Note: The block bootstrap rebuilds each path from blocks of bootstrap_days consecutive days drawn with replacement,
+    which keeps the daily and weekly patterns of the prices while producing alternative years.
+    Args:
+        length: the amount of timesteps of the timeseries
+        rows_per_day: the amount of timesteps per day
+        paths: the amount of paths
+        scale: the distribution of the multiplier of the prices (see draw_factors), None to keep the prices' level
+        shift: the distribution of the amount added to the prices [€/MWh] (see draw_factors), None for no shift
+        bootstrap_days: the length of the resampled blocks of days, 0 to keep the days in place
+        seed: the seed of the draws, the same seed gives the same paths
+    """
+    rng = np.random.default_rng(seed)
+    scales = (
+        np.ones(paths) if scale is None else draw_factors("scale", scale, paths, rng)
+    )
+    shifts = (
+        np.zeros(paths) if shift is None else draw_factors("shift", shift, paths, rng)
+    )
+
+    days = None
+    full_days = length // rows_per_day
+    if bootstrap_days > 0:
+        if full_days < bootstrap_days:
+            raise ValueError(
+                f"The timeseries covers {full_days} days, less than a bootstrap block of {bootstrap_days} days"
+            )
+        blocks = math.ceil(full_days / bootstrap_days)
+        starts = rng.integers(0, full_days - bootstrap_days + 1, (paths, blocks))
+        days = (starts[:, :, None] + np.arange(bootstrap_days)).reshape(paths, -1)
+        days = days[:, :full_days]
+    return Price_Paths(scales, shifts, days, rows_per_day)
+
+
+# _____________________________________________________________________________________________________________________________
+def simulate_price_paths(
+    business_case: Business_Case,
+    scenario_index: int,
+    profile: Method_Profile,
+    price_paths: Price_Paths,
+    block_size: int = DEFAULT_PATH_BLOCK,
+    progress: Callable[[float], None] | None = None,
+) -> Monte_Carlo_Result:
+    """
+    Function purpose: Re-simulates the dispatch and revenue of a scenario over every price path \n
+    Outputs: the Monte_Carlo_Result of the NPV and IRR over the paths, its samples hold the scale and shift of each path
+    Note: Only the balancing prices are replaced, the generation and transmission columns are shared by every path. Each
+    path is stored in the graph under its own price_path parameter, so everything computed from the prices (the dispatch,
+    the SOC, the revenues) is recomputed while the rest is reused. The SOC of a block of paths is solved at once, only
+    block_size paths are held in memory.
+    Args:
+        business_case: the class which contains all useful information about the business case
+        scenario_index: the row number of the scenario
+        profile: the profile of the method
+        price_paths: the perturbations of the prices
+        block_size: the amount of paths simulated at once
+        progress: called with the percentage of the paths simulated after each block
+    """
+    base = read_scenario(business_case, scenario_index)
+    graph = scenario_view(business_case, profile, base).graph
+    outputs = select_layout(profile, business_case.columns)
+    dtype = base["dtype"]
+
+    # The prices replaced by each path (the revenue prices are perturbed the same way if the method has its own)
+    price_nodes = {"Balancing Prices": graph.get("Balancing Prices", base)}
+    if profile.revenue_prices is not None and graph.has(profile.revenue_prices):
+        price_nodes["Revenue Balancing Prices"] = graph.get(
+            profile.revenue_prices, base
+        )
+
+    values = np.full((len(price_paths), len(outputs)), np.nan)
+    for start in range(0, len(price_paths), block_size):
+        stop = min(start + block_size, len(price_paths))
+        block_prices = {
+            name: price_paths.block(prices, start, stop).astype(dtype)
+            for name, prices in price_nodes.items()
+        }
+        block_params = [{**base, "price_path": path} for path in range(start, stop)]
+        # The same arrays are stored both times, so that storing them again keeps what was computed from them
+        path_prices = [
+            {name: prices[i] for name, prices in block_prices.items()}
+            for i in range(len(block_params))
+        ]
+
+        maximum_charge_discharge = []
+        for i, params in enumerate(block_params):
+            for name, prices in path_prices[i].items():
+                graph.put(name, params, prices)
+            maximum_charge_discharge.append(
+                graph.get("maximum_charge_discharge", params)
+            )
+        floors, ceilings = stacked_soc_bounds(
+            graph, block_params, len(maximum_charge_discharge[0])
+        )
+        soc_values = soc_batched(
+            np.stack(maximum_charge_discharge),
+            soc_timestep(profile, base),
+            np.full(len(block_params), storage_capacity(profile, base)),
+            floors=floors,
+            ceilings=ceilings,
+        )
+
+        for i, params in enumerate(block_params):
+            # Stored again, the cache of the graph may have dropped the first paths of the block
+            for name, prices in path_prices[i].items():
+                graph.put(name, params, prices)
+            graph.put("end_soc_values", params, soc_values[i].astype(dtype))
+            business_case.columns = Dataflow_View(graph, params)
+            values[start + i] = compute_outputs(
+                business_case, profile, business_case.columns, params
+            )
+
+        if progress is not None:
+            progress(stop / len(price_paths) * 100)
+
+    # Leave the business case on the scenario itself (for the plots and exports)
+    business_case.columns = Dataflow_View(graph, base)
+
+    scenario_name = str(business_case.param_df.iloc[scenario_index, 0])
+    result = Monte_Carlo_Result(
+        scenario_name,
+        {"Price Scale": price_paths.scales, "Price Shift": price_paths.shifts},
+        values[:, outputs.index("NPV")],
+        values[:, outputs.index("IRR")],
+    )
+    log_print(
+        f"Price paths of {scenario_name} over {len(price_paths)} paths: P(NPV > 0) = {result.probability_positive_npv():.3f},"
+        f" NPV percentiles {result.percentiles('NPV', (5, 50, 95))}"
+    )
+    return result
@@ -0,0 +1,180 @@
+# ============================================================================================================================
+# representative_days.py - File containing the approximation of a long timeseries by a few representative days
+# ============================================================================================================================
+# External Imports
+import copy
+import math
+from typing import Any, Callable
+
+import numpy as np
+import pandas as pd
+
+# ============================================================================================================================
+# Internal Imports
+from libs.clustering import k_medoids, standardize
+from libs.logger import log_print
+from methods.engine import (
+    Method_Profile,
+    materialize_inputs,
+    materialize_reference_inputs,
+)
+from modify.bca_class import Business_Case
+
+# ============================================================================================================================
+
+
+class Representative_Days:
+    def __init__(
+        self,
+        rows_per_day: int,
+        medoids: np.ndarray,
+        labels: np.ndarray,
+        rows: np.ndarray,
+        row_weights: np.ndarray,
+    ):
+        """
+        Function purpose: Holds the representative days picked for a timeseries
+        Args:
+            rows_per_day: the amount of timesteps per day
+            medoids: the index of each representative day, in chronological order
+            labels: for every day of the timeseries, the position of the representative day standing for it in medoids
+            rows: the rows of the timeseries kept (the rows of the representative days, in chronological order)
+            row_weights: the amount of times each kept row counts (the amount of days its day stands for)
+        """
+        self.rows_per_day = rows_per_day
+        self.medoids = medoids
+        self.labels = labels
+        self.rows = rows
+        self.row_weights = row_weights
+        self.error: pd.DataFrame | None = None
+        return
+
+    def weights(self) -> np.ndarray:
+        """
+        Function purpose: Gives the amount of days each representative day stands for \n
+        Outputs: an array with one weight per medoid
+        """
+        return np.bincount(self.labels, minlength=len(self.medoids))
+
+
+def pick_representative_days(
+    df: pd.DataFrame, rows_per_day: int, days: int, seed: int = 0
+) -> Representative_Days:
+    """
+    Function purpose: Clusters the days of a timeseries on their profiles (generation, transmission capacity, prices...) and
+    keeps one representative day per cluster \n
+    Outputs: the Representative_Days of the timeseries
+    Note: Every numeric column is standardized then each day is described by its (timesteps x columns) profile. A
+    trailing partial day is kept as is, with a weight of 1.
+    Args:
+        df: the timeseries, with the scenario-independent inputs of the method as columns (see materialize_inputs)
+        rows_per_day: the amount of timesteps per day
+        days: the amount of representative days
+        seed: the seed of the clustering
+    """
+    full_days = len(df) // rows_per_day
+    if full_days == 0:
+        raise ValueError(
+            "The timeseries is shorter than a day, it can't be split into representative days"
+        )
+
+    values = standardize(df.select_dtypes(include="number").to_numpy(dtype=float))
+    features = values[: full_days * rows_per_day].reshape(full_days, -1)
+    medoids, labels = k_medoids(features, days, seed)
+
+    weights = np.bincount(labels, minlength=len(medoids))
+    rows = (medoids[:, None] * rows_per_day + np.arange(rows_per_day)).ravel()
+    row_weights = np.repeat(weights, rows_per_day).astype(float)
+
+    leftover = np.arange(full_days * rows_per_day, len(df))
+    rows = np.concatenate((rows, leftover))
+    row_weights = np.concatenate((row_weights, np.ones(len(leftover))))
+    return Representative_Days(rows_per_day, medoids, labels, rows, row_weights)
+
+
+def representative_case(
+    business_case: Business_Case, profile: Method_Profile, days: int, seed: int = 0
+) -> tuple[Business_Case, Method_Profile, Representative_Days]:
+    """
+    Function purpose: Builds a copy of the business case whose timeseries only holds representative days \n
+    Outputs: the reduced business case, the profile to compute it with and the Representative_Days
+    Note: The representative days are simulated back to back, so the SOC is carried from one to the next. Every row then
+    counts for the amount of days its day stands for (business_case.row_weights), so the outputs stand for the whole
+    timeseries. The reduced business case shares param_df with business_case, so the results are written to it.
+    Args:
+        business_case: the class which contains all useful information about the business case
+        profile: the profile of the method
+        days: the amount of representative days
+        seed: the seed of the clustering
+    """
+    rows_per_day = 24 * 60 / business_case.input_values["Settlement Period"]
+    if not math.isclose(rows_per_day, round(rows_per_day)):
+        raise ValueError(
+            "The settlement period must divide a day to use representative days"
+        )
+    full_df, reduced_profile = materialize_inputs(business_case, profile)
+    representative = pick_representative_days(full_df, round(rows_per_day), days, seed)
+
+    reduced = copy.copy(business_case)
+    reduced.df = full_df.iloc[representative.rows].reset_index(drop=True)
+    reduced.row_weights = representative.row_weights
+    reference_df = materialize_reference_inputs(business_case, profile)
+    reduced.float64_df = (
+        None
+        if reference_df is None
+        else reference_df.iloc[representative.rows].reset_index(drop=True)
+    )
+    reduced.dataflow = {}
+    reduced.columns = None
+    log_print(
+        f"Representing {len(full_df) // round(rows_per_day)} days by {len(representative.medoids)} representative days"
+        f" ({len(reduced.df)} of {len(full_df)} timesteps)"
+    )
+    return reduced, reduced_profile, representative
+
+
+def representative_error(
+    business_case: Business_Case,
+    reduced: Business_Case,
+    scenario_index: int,
+    run_scenario: Callable[[Any, int], None],
+) -> pd.DataFrame:
+    """
+    Function purpose: Compares the outputs of a scenario computed on the representative days against the full timeseries \n
+    Outputs: a dataframe with, for each output column, both values and their relative error
+    Note: Must be called after the scenario has been computed on the reduced business case.
+    Args:
+        business_case: the business case holding the full timeseries
+        reduced: the reduced business case (see representative_case)
+        scenario_index: the row of the scenario to compare
+        run_scenario: the function computing a scenario on the full business case, takes (business_case, scenario_index)
+    """
+    reference = copy.copy(business_case)
+    reference.param_df = business_case.param_df.copy()
+    reference.dataflow = {}
+    reference.columns = None
+    reference.row_weights = None
+    run_scenario(reference, scenario_index)
+
+    output_columns = list(business_case.param_df.columns)
+    output_columns = output_columns[output_columns.index("Duration") + 1 :]
+
+    rows = []
+    for column in output_columns:
+        try:
+            value_full = float(reference.param_df.loc[scenario_index, column])
+            value_reduced = float(reduced.param_df.loc[scenario_index, column])
+        except (TypeError, ValueError):
+            continue
+        error = abs(value_reduced - value_full) / max(
+            abs(value_full), np.finfo(float).tiny
+        )
+        rows.append([column, value_full, value_reduced, error])
+
+    report = pd.DataFrame(
+        rows, columns=["Output", "Full", "Representative Days", "Relative Error"]
+    )
+    log_print(
+        f"Representative days error report (scenario row {scenario_index}): \n {report}"
+    )
+    return report
@@ -0,0 +1,276 @@
+# ============================================================================================================================
+# repricing.py - File containing the revenue basis of a scenario, re-pricing its outputs under new PPA and green-certificate prices
+# ============================================================================================================================
+# External Imports
+import copy
+from typing import Any
+
+import numpy as np
+
+# ============================================================================================================================
+# Internal Imports
+from libs.aggregates import Scenario_Aggregates
+from libs.dataflow import Dataflow_View
+from methods.engine import (
+    THRESHOLD_DISPATCH,
+    Method_Profile,
+    compute_outputs,
+    outputs_from_aggregates,
+    scenario_view,
+)
+from modify.bca_class import Business_Case
+
+# ============================================================================================================================
+
+# The summed revenue columns which depend on the PPA and green-certificate prices, the energies don't
+REVENUE_SUMS: tuple[str, ...] = (
+    "baseline_income",
+    "bal_income",
+    "storage_income",
+    "extra_generation_income",
+)
+
+
+class Revenue_Basis:
+    def __init__(
+        self,
+        scenario: dict[str, Any],
+        layout: list[str],
+        aggregates: Scenario_Aggregates,
+        coefficients: dict[str, np.ndarray],
+        discharge_prices: np.ndarray,
+    ):
+        """
+        Function purpose: Holds what re-pricing a simulated scenario needs: for a fixed dispatch, each revenue sum is
+        constant + PPA price x energy + green-certificate price x energy
+        Args:
+            scenario: the scenario parameters it was simulated with (see read_scenario)
+            layout: the names of its outputs
+            aggregates: its aggregates
+            coefficients: for each column of REVENUE_SUMS, its (constant, factor of the PPA price, factor of the
+            green-certificate price)
+            discharge_prices: the sorted balancing prices of the timesteps where the storage discharges if they are above
+            the discharge ratio x the PPA price (see theor_discharging)
+        """
+        self.scenario = scenario
+        self.layout = layout
+        self.aggregates = aggregates
+        self.coefficients = coefficients
+        self.discharge_prices = discharge_prices
+        return
+
+    def discharges(self, ppa_price: float) -> int:
+        """
+        Function purpose: Counts the timesteps where the storage would discharge with a PPA price \n
+        Outputs: the amount of discharge prices above the discharge ratio of the scenario x ppa_price
+        Args:
+            ppa_price: the PPA price [€/MWh]
+        """
+        threshold = self.scenario["discharge_ratio"] * self.scenario["dtype"](ppa_price)
+        return len(self.discharge_prices) - int(
+            np.searchsorted(self.discharge_prices, threshold, side="right")
+        )
+
+    def same_dispatch(self, ppa_price: float) -> bool:
+        """
+        Function purpose: Checks whether a PPA price keeps the dispatch of the scenario \n
+        Outputs: True if every timestep makes the same discharge decision as with the PPA price of the scenario
+        Args:
+            ppa_price: the PPA price [€/MWh]
+        """
+        return self.discharges(ppa_price) == self.discharges(self.scenario["ppa_price"])
+
+    def reprice(
+        self,
+        business_case: Business_Case,
+        profile: Method_Profile,
+        ppa_price: float,
+        green_certificate: float,
+    ) -> list[float]:
+        """
+        Function purpose: Computes the outputs of the scenario with other prices, without simulating it again \n
+        Outputs: the values of the outputs, in the order of the layout
+        Note: Only valid if same_dispatch(ppa_price), the green-certificate price never changes the dispatch.
+        Args:
+            business_case: the class which contains all useful information about the business case
+            profile: the profile of the method
+            ppa_price: the PPA price [€/MWh]
+            green_certificate: the green-certificate price [€/MWh]
+        """
+        aggregates = copy.copy(self.aggregates)
+        aggregates.sums = {
+            **self.aggregates.sums,
+            **{
+                name: float(
+                    coefficient[0]
+                    + coefficient[1] * ppa_price
+                    + coefficient[2] * green_certificate
+                )
+                for name, coefficient in self.coefficients.items()
+            },
+        }
+        return outputs_from_aggregates(
+            business_case,
+            profile,
+            self.layout,
+            aggregates,
+            {
+                **self.scenario,
+                "ppa_price": ppa_price,
+                "green_certificate": green_certificate,
+            },
+        )
+
+
+def revenue_basis(
+    business_case: Business_Case,
+    profile: Method_Profile,
+    columns: Dataflow_View,
+    scenario: dict[str, Any],
+    layout: list[str],
+) -> Revenue_Basis:
+    """
+    Function purpose: Splits the revenue columns of a simulated scenario into energies per revenue branch (see
+    build_graph), the factors of the PPA and green-certificate prices \n
+    Outputs: the Revenue_Basis of the scenario
+    Note: Must be called right after compute_outputs, whose aggregates it keeps. The rows are summed in float64, a row
+    whose revenue is NaN counts as 0 like in the aggregate pass.
+    Args:
+        business_case: the class which contains all useful information about the business case
+        profile: the profile of the method
+        columns: the view of the scenario on the graph
+        scenario: the scenario parameters (see read_scenario)
+        layout: the names of the outputs
+    """
+
+    def column(name: str) -> np.ndarray:
+        return np.asarray(columns[name], dtype=np.float64)
+
+    power_level = scenario["power_level"]
+    settlement_period = scenario["settlement_period"]
+    balancing_share = scenario["balancing_percentage"] / profile.balancing_divisor
+    eff_charge_discharge = column("eff_charge_discharge")
+    deltapower = column("deltapower")
+    exported = column("Exported Power [MW]")
+    bal_power = column("bal_power")
+    prices = column("Balancing Prices")
+    revenue_prices = column("Revenue Balancing Prices")
+    zeros = np.zeros(len(exported))
+    weights = (
+        np.ones(len(exported))
+        if business_case.row_weights is None
+        else business_case.row_weights
+    )
+
+    # (constant, factor of the PPA price, factor of the green-certificate price) of every row
+    baseline = (zeros, exported * settlement_period, exported * settlement_period)
+    balancing = (
+        balancing_share * exported * prices * settlement_period,
+        exported * (1 - balancing_share) * settlement_period,
+        exported * settlement_period,
+    )
+    extra_generation = (
+        zeros,
+        zeros,
+        np.where(deltapower < 0, eff_charge_discharge, 0) * settlement_period,
+    )
+
+    # storage_income: [A] and [C] are bal_income, [B] and [D] add the energy (dis)charged at the revenue prices, [E] also
+    # buys the energy charged above the balancing power at the PPA price, [F] only depends on the revenue prices
+    dispatched = eff_charge_discharge * revenue_prices * settlement_period
+    charging_branch = np.where(
+        power_level <= bal_power,
+        1,  # [D]
+        np.where(power_level <= exported, 2, 3),  # [E], [F]
+    )
+    branch = np.where(
+        eff_charge_discharge == 0,
+        0,  # [A]
+        np.where(
+            eff_charge_discharge < 0,
+            1,  # [B]
+            np.where(deltapower < 0, 0, charging_branch),  # [C]
+        ),
+    )
+    storage = (
+        np.select(
+            [branch == 0, branch <= 2],
+            [balancing[0], balancing[0] - dispatched],
+            (bal_power - power_level) * revenue_prices * settlement_period,
+        ),
+        np.select(
+            [branch <= 1, branch == 2],
+            [
+                balancing[1],
+                balancing[1] - (eff_charge_discharge - bal_power) * settlement_period,
+            ],
+            zeros,
+        ),
+        np.where(branch <= 2, balancing[2], zeros),
+    )
+
+    coefficients = {
+        name: np.array([float(np.sum(np.nan_to_num(term) * weights)) for term in terms])
+        for name, terms in zip(
+            REVENUE_SUMS, (baseline, balancing, storage, extra_generation)
+        )
+    }
+
+    # The timesteps whose discharge decision depends on the PPA price: not charging, and able to discharge
+    charging = np.asarray(columns["eff_charging"]) != 0
+    max_discharging = np.asarray(columns["max_discharging"])
+    decided = ~charging & (deltapower >= 0) & (max_discharging != 0)
+    discharge_prices = np.asarray(columns["Balancing Prices"])[decided]
+    discharge_prices = np.sort(discharge_prices[~np.isnan(discharge_prices)])
+
+    return Revenue_Basis(
+        scenario,
+        layout,
+        business_case.aggregates,
+        coefficients,
+        discharge_prices,
+    )
+
+
+# _____________________________________________________________________________________________________________________________
+def reprice_scenario(
+    business_case: Business_Case,
+    profile: Method_Profile,
+    basis: Revenue_Basis,
+    ppa_price: float | None = None,
+    green_certificate: float | None = None,
+) -> tuple[list[float], bool]:
+    """
+    Function purpose: Computes the outputs of a simulated scenario under a new PPA and green-certificate price \n
+    Outputs: the values of the outputs, and whether the scenario had to be simulated again
+    Note: The revenues are re-priced from the basis (a few operations) as long as no timestep changes its discharge
+    decision, which the sorted discharge prices tell in O(log timesteps). Otherwise the dispatch changes and the
+    scenario is simulated again with the new prices, as always with a dispatch strategy other than the threshold one
+    (they plan on the revenues).
+    Args:
+        business_case: the class which contains all useful information about the business case
+        profile: the profile of the method
+        basis: the Revenue_Basis of the scenario
+        ppa_price: the new PPA price [€/MWh], None to keep the one of the scenario
+        green_certificate: the new green-certificate price [€/MWh], None to keep the one of the scenario
+    """
+    if ppa_price is None:
+        ppa_price = basis.scenario["ppa_price"]
+    if green_certificate is None:
+        green_certificate = basis.scenario["green_certificate"]
+
+    if business_case.dispatch_strategy == THRESHOLD_DISPATCH and basis.same_dispatch(
+        ppa_price
+    ):
+        return (
+            basis.reprice(business_case, profile, ppa_price, green_certificate),
+            False,
+        )
+
+    scenario = {
+        **basis.scenario,
+        "ppa_price": ppa_price,
+        "green_certificate": green_certificate,
+    }
+    columns = scenario_view(business_case, profile, scenario)
+    return compute_outputs(business_case, profile, columns, scenario), True
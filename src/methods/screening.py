@@ -0,0 +1,226 @@
+# ============================================================================================================================
+# screening.py - File containing the two-stage screening of a sweep: coarse-resolution sweep, full-resolution shortlist
+# ============================================================================================================================
+# External Imports
+import copy
+import math
+from typing import Any, Callable, Sequence
+
+import numpy as np
+import pandas as pd
+
+# ============================================================================================================================
+# Internal Imports
+from libs.logger import log_print
+from methods.engine import (
+    Method_Profile,
+    materialize_inputs,
+    materialize_reference_inputs,
+    read_scenario,
+)
+from methods.sweep import (
+    DEFAULT_BLOCK_SIZE,
+    SWEEP_AXES,
+    Sweep_Result,
+    compute_combinations,
+    run_sweep,
+)
+from modify.bca_class import Business_Case
+
+# ============================================================================================================================
+
+
+def coarsen_timeseries(df: pd.DataFrame, factor: int) -> pd.DataFrame:
+    """
+    Function purpose: Aggregates the timeseries into periods of factor consecutive timesteps \n
+    Outputs: the coarse timeseries, numeric columns are averaged (so a power keeps its energy), the others keep their
+    first value (ex: the Date of the period)
+    Args:
+        df: the timeseries dataframe
+        factor: the amount of timesteps per coarse period
+    """
+    groups = np.arange(len(df)) // factor
+    numeric_columns = df.select_dtypes(include="number").columns
+    coarse = df.groupby(groups).first()
+    coarse[numeric_columns] = df[numeric_columns].groupby(groups).mean()
+    return coarse.reset_index(drop=True)
+
+
+def coarse_business_case(
+    business_case: Business_Case, profile: Method_Profile, resolution: float
+) -> tuple[Business_Case, Method_Profile]:
+    """
+    Function purpose: Builds a copy of the business case on a coarser timeseries, along with the profile to compute it \n
+    Outputs: the coarse business case and profile
+    Note: The method-specific inputs (ex: the power curve applied to the wind speed) are computed at full resolution before
+    being averaged, the storage dispatch and SOC are then simulated with the coarse settlement period.
+    Args:
+        business_case: the class which contains all useful information about the business case
+        profile: the profile of the method
+        resolution: the settlement period of the coarse timeseries [min], a multiple of the full resolution one
+    """
+    settlement_period = business_case.input_values["Settlement Period"]
+    factor = resolution / settlement_period
+    if factor < 1 or not math.isclose(factor, round(factor)):
+        raise ValueError(
+            f"The screening resolution ({resolution} min) must be a multiple of the settlement period ({settlement_period} min)"
+        )
+
+    # Materialize the scenario-independent inputs of the method at full resolution
+    full_df, coarse_profile = materialize_inputs(business_case, profile)
+
+    coarse = copy.copy(business_case)
+    coarse.df = coarsen_timeseries(full_df, round(factor))
+    reference_df = materialize_reference_inputs(business_case, profile)
+    coarse.float64_df = (
+        None
+        if reference_df is None
+        else coarsen_timeseries(reference_df, round(factor))
+    )
+    coarse.input_values = {
+        **business_case.input_values,
+        "Settlement Period": settlement_period * round(factor),
+    }
+    coarse.param_df = business_case.param_df.copy()
+    coarse.dataflow = {}
+    coarse.columns = None
+    return coarse, coarse_profile
+
+
+def rank_correlation(first: Sequence[float], second: Sequence[float]) -> float:
+    """
+    Function purpose: Computes the Spearman rank correlation of two series \n
+    Outputs: the correlation of the ranks (ties get their average rank), NaN if there are less than 2 values
+    Args:
+        first: the first series
+        second: the second series, of the same length
+    """
+    if len(first) < 2:
+        return np.nan
+    ranks_first = pd.Series(first).rank().to_numpy()
+    ranks_second = pd.Series(second).rank().to_numpy()
+    if ranks_first.std() == 0 or ranks_second.std() == 0:
+        return np.nan
+    return float(np.corrcoef(ranks_first, ranks_second)[0, 1])
+
+
+class Screening_Result:
+    def __init__(
+        self,
+        coarse: Sweep_Result,
+        shortlist: pd.DataFrame,
+        objective: str,
+        top_k: int,
+        rank_correlation: float,
+    ):
+        """
+        Function purpose: Holds the result of a screening
+        Args:
+            coarse: the sweep computed on the coarse timeseries
+            shortlist: the combinations re-simulated at full resolution, with their coarse objective (column
+            "Coarse <objective>") and their full resolution outputs, best first
+            objective: the output used to rank the combinations
+            top_k: the amount of combinations asked for
+            rank_correlation: the Spearman correlation between the coarse and full resolution objective of the shortlist
+        """
+        self.coarse = coarse
+        self.shortlist = shortlist
+        self.objective = objective
+        self.top_k = top_k
+        self.rank_correlation = rank_correlation
+        return
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """
+        Function purpose: Lays the top_k combinations (at full resolution) out like rows of the Parametric Analysis sheet \n
+        Outputs: a dataframe with the scenario name, the swept parameters then the outputs
+        """
+        return (
+            self.shortlist.drop(columns=f"Coarse {self.objective}")
+            .head(self.top_k)
+            .reset_index(drop=True)
+        )
+
+
+# _____________________________________________________________________________________________________________________________
+def screen_sweep(
+    business_case: Business_Case,
+    scenario_index: int,
+    profile: Method_Profile,
+    axes: dict[str, Sequence[Any]],
+    resolution: float,
+    top_k: int,
+    margin: float,
+    objective: str = "NPV",
+    block_size: int = DEFAULT_BLOCK_SIZE,
+    progress: Callable[[float], None] | None = None,
+) -> Screening_Result:
+    """
+    Function purpose: Finds the best combinations of a sweep by screening the whole grid on a coarse timeseries and only
+    re-simulating the best of them at full resolution \n
+    Outputs: the Screening_Result, holding the top_k combinations at full resolution
+    Note: The coarse ranking is only an approximation, the margin re-simulates more combinations than asked for so that a
+    combination slightly misranked by the coarse stage can still make it to the top_k. The rank correlation between
+    both stages, over the shortlist, tells how much the coarse ranking can be trusted.
+    Args:
+        business_case: the class which contains all useful information about the business case
+        scenario_index: the row number of the scenario the sweep is derived from
+        profile: the profile of the method
+        axes: the values taken by each swept parameter (keys of SWEEP_AXES), the others keep the value of the scenario
+        resolution: the settlement period of the coarse timeseries [min] (ex: 60 for hourly)
+        top_k: the amount of combinations to find
+        margin: the share of extra combinations re-simulated at full resolution (ex: 0.5 re-simulates 1.5 x top_k)
+        objective: the output used to rank the combinations
+        block_size: the amount of combinations whose SOC is solved at once
+        progress: called with the percentage of the screening done after each block
+    """
+    coarse_case, coarse_profile = coarse_business_case(
+        business_case, profile, resolution
+    )
+    coarse = run_sweep(
+        coarse_case,
+        scenario_index,
+        coarse_profile,
+        axes,
+        block_size,
+        None if progress is None else lambda percent: progress(percent * 0.5),
+    )
+
+    # Shortlist: the best combinations of the coarse stage, NaN objectives last
+    coarse_data = coarse.to_dataframe()
+    coarse_objective = coarse_data[objective].to_numpy(dtype=float)
+    order = np.argsort(np.where(np.isnan(coarse_objective), np.inf, -coarse_objective))
+    shortlist_size = min(math.ceil(top_k * (1 + margin)), len(coarse_data))
+    shortlist = coarse_data.iloc[order[:shortlist_size]].reset_index(drop=True)
+
+    base = read_scenario(business_case, scenario_index)
+    outputs, values = compute_combinations(
+        business_case,
+        profile,
+        base,
+        (
+            {SWEEP_AXES[name]: row[name] for name in SWEEP_AXES}
+            for _, row in shortlist.iterrows()
+        ),
+        shortlist_size,
+        block_size,
+        None if progress is None else lambda percent: progress(50 + percent * 0.5),
+    )
+
+    shortlist = shortlist[["Scenario", *SWEEP_AXES, objective]].rename(
+        columns={objective: f"Coarse {objective}"}
+    )
+    shortlist[outputs] = values
+    correlation = rank_correlation(
+        shortlist[f"Coarse {objective}"].to_numpy(dtype=float),
+        shortlist[objective].to_numpy(dtype=float),
+    )
+    shortlist = shortlist.sort_values(
+        objective, ascending=False, na_position="last", kind="stable"
+    ).reset_index(drop=True)
+
+    log_print(
+        f"Screening of {coarse.scenario_name}: {len(coarse_data)} combinations at {resolution} min, {shortlist_size}"
+        f" re-simulated at full resolution, rank correlation of the {objective} between both stages: {correlation:.3f}"
+    )
+    return Screening_Result(coarse, shortlist, objective, top_k, correlation)
@@ -0,0 +1,404 @@
+# ============================================================================================================================
+# sweep.py - File containing the parameter sweep: a grid of scenarios derived from one scenario, computed in batched blocks
+# ============================================================================================================================
+# External Imports
+import itertools
+import math
+from typing import Any, Callable, Iterable, Iterator, Sequence
+
+import numpy as np
+import pandas as pd
+
+# ============================================================================================================================
+# Internal Imports
+from libs.dataflow import Dataflow_View
+from libs.logger import log_print
+from libs.soc import soc_batched
+from methods.engine import (
+    THRESHOLD_DISPATCH,
+    Method_Profile,
+    compute_outputs,
+    read_scenario,
+    scenario_view,
+    select_layout,
+    soc_timestep,
+    stacked_soc_bounds,
+    storage_capacity,
+)
+from methods.participation import participation_outputs
+from modify.bca_class import Business_Case
+
+# ============================================================================================================================
+
+# The parameters which can be swept: name in the Parametric Analysis sheet -> name of the scenario parameter (see read_scenario)
+# listed in the order of the sheet (the thresholds being optional columns), the last one varies the fastest when the grid is
+# enumerated
+SWEEP_AXES: dict[str, str] = {
+    "PPA Price": "ppa_price",
+    "Market Type": "price_type",
+    "Balancing Market Participation": "balancing_percentage",
+    "Storage Power Rating": "power_level",
+    "Duration": "storage_time_hr",
+    "Discharge Price Ratio": "discharge_ratio",
+    "Charge Price Threshold": "charge_threshold",
+}
+
+# Amount of scenarios whose SOC is solved at once
+DEFAULT_BLOCK_SIZE: int = 128
+
+
+def parse_axis(name: str, text: str) -> list[Any] | None:
+    """
+    Function purpose: Reads the values of a sweep axis as typed by the user \n
+    Outputs: the values of the axis, None if the text is empty (the scenario's own value is then used)
+    Note: "start:stop:step" gives a range (stop included), anything else is read as a list separated with ','
+    Args:
+        name: the name of the swept parameter (see SWEEP_AXES)
+        text: the values of the axis
+    """
+    text = str(text).strip()
+    if text == "":
+        return None
+    if name == "Market Type":
+        return [value.strip().upper() for value in text.split(",") if value.strip()]
+
+    if ":" in text:
+        try:
+            start, stop, step = (float(value) for value in text.split(":"))
+        except ValueError:
+            raise ValueError(
+                f"Invalid range '{text}' for {name}, use 'start:stop:step'"
+            )
+        if step <= 0 or stop < start:
+            raise ValueError(
+                f"Invalid range '{text}' for {name}, the step must be > 0 and stop >= start"
+            )
+        amount = int(math.floor((stop - start) / step + 1e-9)) + 1
+        return [round(start + i * step, 10) for i in range(amount)]
+
+    try:
+        return [float(value) for value in text.split(",") if value.strip()]
+    except ValueError:
+        raise ValueError(f"Invalid list '{text}' for {name}, separate numbers with ','")
+
+
+class Sweep_Grid:
+    def __init__(self, axes: dict[str, Sequence[Any]]):
+        """
+        Function purpose: Describes the grid of a sweep, its combinations are only enumerated when they are computed
+        Args:
+            axes: the values taken by each swept parameter (keys of SWEEP_AXES)
+        """
+        for name, values in axes.items():
+            if name not in SWEEP_AXES:
+                raise ValueError(
+                    f"'{name}' can't be swept. Use one of {list(SWEEP_AXES)}."
+                )
+            if len(values) == 0:
+                raise ValueError(f"The sweep axis '{name}' has no values")
+        # Always in the order of SWEEP_AXES, so that the parameters of the expensive nodes vary the slowest
+        self.axes: dict[str, list[Any]] = {
+            name: list(axes[name]) for name in SWEEP_AXES if name in axes
+        }
+        self.shape: tuple[int, ...] = tuple(
+            len(values) for values in self.axes.values()
+        )
+        return
+
+    def __len__(self) -> int:
+        return math.prod(self.shape)
+
+    def combinations(self) -> Iterator[dict[str, Any]]:
+        """
+        Function purpose: Lazily enumerates the combinations of the grid, the last axis varying the fastest \n
+        Outputs: a generator of the scenario parameters (SWEEP_AXES values) overridden by each combination
+        """
+        keys = [SWEEP_AXES[name] for name in self.axes]
+        for values in itertools.product(*self.axes.values()):
+            yield dict(zip(keys, values))
+
+    def blocks(self, block_size: int) -> Iterator[list[dict[str, Any]]]:
+        """
+        Function purpose: Lazily splits the combinations of the grid into blocks \n
+        Outputs: a generator of lists of at most block_size combinations
+        Args:
+            block_size: the amount of combinations per block
+        """
+        return split_blocks(self.combinations(), block_size)
+
+
+def split_blocks(
+    combinations: Iterable[dict[str, Any]], block_size: int
+) -> Iterator[list[dict[str, Any]]]:
+    """
+    Function purpose: Lazily splits combinations into blocks \n
+    Outputs: a generator of lists of at most block_size combinations
+    Args:
+        combinations: the combinations (scenario parameters overridden by each of them)
+        block_size: the amount of combinations per block
+    """
+    combinations = iter(combinations)
+    while True:
+        block = list(itertools.islice(combinations, block_size))
+        if not block:
+            return
+        yield block
+
+
+class Sweep_Result:
+    def __init__(
+        self,
+        scenario_name: str,
+        axes: dict[str, list[Any]],
+        outputs: list[str],
+        values: np.ndarray,
+    ):
+        """
+        Function purpose: Holds the outputs of a sweep as a labelled N-dimensional grid
+        Args:
+            scenario_name: the name of the scenario the sweep was derived from
+            axes: the values taken by each swept parameter, in the order of the dimensions of values
+            outputs: the names of the outputs, in the order of the last dimension of values
+            values: an array of shape (len of each axis..., amount of outputs)
+        """
+        self.scenario_name = scenario_name
+        self.axes = axes
+        self.outputs = outputs
+        self.values = values
+        return
+
+    def get(self, output: str) -> np.ndarray:
+        """
+        Function purpose: Gives one output over the whole grid \n
+        Outputs: an array with one dimension per swept parameter
+        Args:
+            output: the name of the output (ex: "NPV")
+        """
+        if output not in self.outputs:
+            raise ValueError(f"No output named '{output}'. Use one of {self.outputs}.")
+        return self.values[..., self.outputs.index(output)]
+
+    def table(self, output: str, rows: str, columns: str, **fixed: Any) -> pd.DataFrame:
+        """
+        Function purpose: Gives a 2D slice of an output, ready to be drawn as a heatmap \n
+        Outputs: a dataframe indexed by the values of rows, with one column per value of columns
+        Args:
+            output: the name of the output
+            rows: the swept parameter along the rows
+            columns: the swept parameter along the columns
+            fixed: the value of every other swept parameter holding more than one value (ex: price_type="IMB"), use
+            the names of the scenario parameters (see SWEEP_AXES) as keywords
+        """
+        grid = self.get(output)
+        index: list[Any] = []
+        for name, values in self.axes.items():
+            if name in (rows, columns):
+                index.append(slice(None))
+            elif SWEEP_AXES[name] in fixed:
+                index.append(values.index(fixed[SWEEP_AXES[name]]))
+            elif len(values) == 1:
+                index.append(0)
+            else:
+                raise ValueError(
+                    f"'{name}' is swept, give the value to show with {SWEEP_AXES[name]}=..."
+                )
+        grid = grid[tuple(index)]
+        remaining = [name for name in self.axes if name in (rows, columns)]
+        if remaining != [rows, columns]:
+            grid = grid.T
+        return pd.DataFrame(grid, index=self.axes[rows], columns=self.axes[columns])
+
+    def best(self, output: str = "NPV") -> dict[str, Any]:
+        """
+        Function purpose: Finds the combination maximizing an output \n
+        Outputs: the values of the swept parameters at the maximum, along with the value of the output
+        Args:
+            output: the name of the output
+        """
+        grid = self.get(output)
+        if np.isnan(grid).all():
+            raise ValueError(f"{output} couldn't be computed for any combination")
+        position = np.unravel_index(np.nanargmax(grid), grid.shape)
+        best = {
+            name: values[i] for (name, values), i in zip(self.axes.items(), position)
+        }
+        best[output] = float(grid[position])
+        return best
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """
+        Function purpose: Flattens the grid into one row per combination, in the layout of the Parametric Analysis sheet \n
+        Outputs: a dataframe with the scenario name, the swept parameters then the outputs
+        """
+        combinations = list(itertools.product(*self.axes.values()))
+        data = pd.DataFrame(combinations, columns=list(self.axes))
+        data.insert(0, "Scenario", self.scenario_name)
+        outputs = pd.DataFrame(
+            self.values.reshape(-1, len(self.outputs)), columns=self.outputs
+        )
+        return pd.concat([data, outputs], axis=1)
+
+
+# _____________________________________________________________________________________________________________________________
+def run_sweep(
+    business_case: Business_Case,
+    scenario_index: int,
+    profile: Method_Profile,
+    axes: dict[str, Sequence[Any]],
+    block_size: int = DEFAULT_BLOCK_SIZE,
+    progress: Callable[[float], None] | None = None,
+    closed_form_participation: bool = True,
+) -> Sweep_Result:
+    """
+    Function purpose: Computes every combination of the swept parameters, the other parameters being those of a scenario \n
+    Outputs: the Sweep_Result of the grid
+    Note: Every combination is evaluated on the dataflow graph of the method, so the quantities which don't depend on the
+    swept parameters (available power, transmission capacity, prices...) are computed once for the whole sweep. The SOC,
+    the only sequential step, is solved for a whole block of combinations at once (see soc_batched). The Balancing Market
+    Participation doesn't change the dispatch, so with closed_form_participation all its values are evaluated from a single
+    simulation (see methods/participation.py), with the threshold dispatch only (the other strategies plan on the
+    revenues).
+    Args:
+        business_case: the class which contains all useful information about the business case
+        scenario_index: the row number of the scenario the sweep is derived from
+        profile: the profile of the method
+        axes: the values taken by each swept parameter (keys of SWEEP_AXES), the others keep the value of the scenario
+        block_size: the amount of combinations whose SOC is solved at once
+        progress: called with the percentage of combinations computed after each block
+        closed_form_participation: if True the participations are evaluated in closed form instead of being simulated
+    """
+    base = read_scenario(business_case, scenario_index)
+    # The parameters which aren't swept are kept as single-valued axes, so that the grid is labelled with all of them
+    grid = Sweep_Grid(
+        {
+            name: axes[name] if name in axes else [base[key]]
+            for name, key in SWEEP_AXES.items()
+        }
+    )
+    log_print(
+        f"Sweeping {len(grid)} combinations of {list(axes)} in blocks of {block_size}"
+    )
+
+    participations = grid.axes["Balancing Market Participation"]
+    if (
+        closed_form_participation
+        and len(participations) > 1
+        and business_case.dispatch_strategy == THRESHOLD_DISPATCH
+    ):
+        # Only the other axes are simulated, each of their combinations gives the outputs of every participation
+        simulated = Sweep_Grid(
+            {
+                **grid.axes,
+                "Balancing Market Participation": participations[:1],
+            }
+        )
+        outputs, values = compute_combinations(
+            business_case,
+            profile,
+            base,
+            simulated.combinations(),
+            len(simulated),
+            block_size,
+            progress,
+            participations,
+        )
+        axis = list(grid.axes).index("Balancing Market Participation")
+        values = np.moveaxis(
+            values.reshape(
+                simulated.shape[:axis]
+                + simulated.shape[axis + 1 :]
+                + (len(participations), len(outputs))
+            ),
+            -2,
+            axis,
+        )
+    else:
+        outputs, values = compute_combinations(
+            business_case,
+            profile,
+            base,
+            grid.combinations(),
+            len(grid),
+            block_size,
+            progress,
+        )
+        values = values.reshape(grid.shape + (len(outputs),))
+
+    return Sweep_Result(
+        str(business_case.param_df.iloc[scenario_index, 0]),
+        grid.axes,
+        outputs,
+        values,
+    )
+
+
+def compute_combinations(
+    business_case: Business_Case,
+    profile: Method_Profile,
+    base: dict[str, Any],
+    combinations: Iterable[dict[str, Any]],
+    amount: int,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+    progress: Callable[[float], None] | None = None,
+    participations: Sequence[float] | None = None,
+) -> tuple[list[str], np.ndarray]:
+    """
+    Function purpose: Computes the outputs of a set of scenarios derived from one scenario, block by block \n
+    Outputs: the names of the outputs, and an (amount x outputs) array of the outputs of every combination, or an
+    (amount x participations x outputs) array if participations are given
+    Note: See run_sweep, the combinations are only read one block at a time.
+    Args:
+        business_case: the class which contains all useful information about the business case
+        profile: the profile of the method
+        base: the parameters of the scenario (see read_scenario)
+        combinations: the scenario parameters overridden by each combination (ex: {"power_level": 10})
+        amount: the amount of combinations
+        block_size: the amount of combinations whose SOC is solved at once
+        progress: called with the percentage of combinations computed after each block
+        participations: the Balancing Market Participations each combination is evaluated for in closed form (see
+        methods/participation.py), None to use the participation of the combination
+    """
+    graph = scenario_view(business_case, profile, base).graph
+    outputs = select_layout(profile, business_case.columns)
+    if participations is None:
+        values = np.full((amount, len(outputs)), np.nan)
+    else:
+        values = np.full((amount, len(participations), len(outputs)), np.nan)
+
+    done = 0
+    for block in split_blocks(combinations, block_size):
+        block_params = [{**base, **combination} for combination in block]
+        requests = np.stack(
+            [graph.get("maximum_charge_discharge", params) for params in block_params]
+        )
+        floors, ceilings = stacked_soc_bounds(graph, block_params, requests.shape[1])
+        soc_values = soc_batched(
+            requests,
+            soc_timestep(profile, base),
+            [storage_capacity(profile, params) for params in block_params],
+            floors=floors,
+            ceilings=ceilings,
+        )
+
+        for params, end_soc_values in zip(block_params, soc_values):
+            graph.put("end_soc_values", params, end_soc_values.astype(params["dtype"]))
+            business_case.power_level = params["power_level"]
+            business_case.columns = Dataflow_View(graph, params)
+            if participations is None:
+                values[done] = compute_outputs(
+                    business_case, profile, business_case.columns, params
+                )
+            else:
+                values[done] = participation_outputs(
+                    business_case,
+                    profile,
+                    business_case.columns,
+                    params,
+                    participations,
+                )[1]
+            done += 1
+
+        if progress is not None:
+            progress(done / amount * 100)
+
+    return outputs, values
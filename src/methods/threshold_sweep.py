@@ -0,0 +1,187 @@
+# ============================================================================================================================
+# threshold_sweep.py - File containing the sweep of the charge and discharge price thresholds, only re-running the SOC
+# ============================================================================================================================
+# External Imports
+from typing import Any, Callable, Iterator, Sequence
+
+import numpy as np
+
+# ============================================================================================================================
+# Internal Imports
+from libs.dataflow import Dataflow_View
+from libs.logger import log_print
+from libs.soc import soc_batched
+from methods.engine import (
+    THRESHOLD_DISPATCH,
+    Method_Profile,
+    compute_outputs,
+    read_scenario,
+    scenario_view,
+    select_layout,
+    soc_timestep,
+    storage_capacity,
+)
+from methods.sweep import (
+    DEFAULT_BLOCK_SIZE,
+    SWEEP_AXES,
+    Sweep_Grid,
+    Sweep_Result,
+    split_blocks,
+)
+from modify.bca_class import Business_Case
+
+# ============================================================================================================================
+
+# The axes of the threshold sweep (keys of SWEEP_AXES)
+THRESHOLD_AXES: tuple[str, ...] = ("Discharge Price Ratio", "Charge Price Threshold")
+
+
+def discharge_requests(
+    prices: np.ndarray,
+    wholesale_price: float,
+    eff_charging: np.ndarray,
+    deltapower: np.ndarray,
+    max_discharging: np.ndarray,
+    ratios: Sequence[float],
+) -> Iterator[tuple[int, np.ndarray]]:
+    """
+    Function purpose: Builds the charging (>0) or discharging (<0) power requested at each timestep (see
+    maximum_charge_discharge) for every discharge price ratio \n
+    Outputs: a generator of (position of the ratio in ratios, requested power), the array being reused between ratios
+    Note: The prices of the timesteps able to discharge are sorted once, the ratios are then visited by increasing price
+    threshold, so each one only stops the discharge of the timesteps whose price falls below its threshold.
+    Args:
+        prices: the balancing prices
+        wholesale_price: the wholesale (PPA) price
+        eff_charging: the charging power of the charge threshold
+        deltapower: the transmission capacity minus the available power
+        max_discharging: the maximum possible discharging power
+        ratios: the discharge price ratios
+    """
+    dischargeable = (
+        (eff_charging == 0)
+        & (deltapower >= 0)
+        & (max_discharging != 0)
+        & ~np.isnan(prices)
+    )
+    rows = np.flatnonzero(dischargeable)
+    rows = rows[np.argsort(prices[rows], kind="stable")]
+    sorted_prices = prices[rows]
+
+    # Every dischargeable timestep starts discharging, the thresholds then only remove some of them
+    requests = eff_charging.copy()
+    requests[rows] = max_discharging[rows]
+    thresholds = np.asarray(ratios, dtype=np.float64) * wholesale_price
+    stopped = 0
+    for position in np.argsort(thresholds, kind="stable"):
+        # The storage discharges where prices > threshold (see theor_discharging)
+        stop = int(np.searchsorted(sorted_prices, thresholds[position], side="right"))
+        requests[rows[stopped:stop]] = 0
+        stopped = stop
+        yield int(position), requests
+
+
+# _____________________________________________________________________________________________________________________________
+def run_threshold_sweep(
+    business_case: Business_Case,
+    scenario_index: int,
+    profile: Method_Profile,
+    axes: dict[str, Sequence[Any]],
+    block_size: int = DEFAULT_BLOCK_SIZE,
+    progress: Callable[[float], None] | None = None,
+) -> Sweep_Result:
+    """
+    Function purpose: Computes every combination of the Discharge Price Ratio and Charge Price Threshold of a scenario \n
+    Outputs: the Sweep_Result of the grid
+    Note: The thresholds only decide which timesteps charge and discharge, the prices, powers and transmission capacities
+    are shared by the whole sweep. The requested powers of every combination are built from the sorted prices (see
+    discharge_requests) and the SOC of a block of combinations is solved at once, the revenues then being computed from
+    the SOC as for any scenario.
+    Args:
+        business_case: the class which contains all useful information about the business case
+        scenario_index: the row number of the scenario the sweep is derived from
+        profile: the profile of the method
+        axes: the values taken by THRESHOLD_AXES, a threshold left out keeps the value of the scenario
+        block_size: the amount of combinations whose SOC is solved at once
+        progress: called with the percentage of combinations computed after each block
+    """
+    if business_case.dispatch_strategy != THRESHOLD_DISPATCH:
+        raise ValueError(
+            f"The Threshold Sweep needs the {THRESHOLD_DISPATCH} dispatch, use the Sweep run mode"
+        )
+    for name in axes:
+        if name not in THRESHOLD_AXES:
+            raise ValueError(
+                f"'{name}' can't be swept with the thresholds, use the Sweep run mode. Use one of {list(THRESHOLD_AXES)}."
+            )
+    base = read_scenario(business_case, scenario_index)
+    grid = Sweep_Grid(
+        {
+            name: axes[name] if name in axes else [base[key]]
+            for name, key in SWEEP_AXES.items()
+        }
+    )
+    ratios = grid.axes["Discharge Price Ratio"]
+    charge_thresholds = grid.axes["Charge Price Threshold"]
+    log_print(
+        f"Sweeping {len(ratios)} discharge ratios x {len(charge_thresholds)} charge thresholds in blocks of {block_size}"
+    )
+
+    graph = scenario_view(business_case, profile, base).graph
+    outputs = select_layout(profile, business_case.columns)
+    prices = np.asarray(graph.get("Balancing Prices", base), dtype=np.float64)
+    deltapower = np.asarray(graph.get("deltapower", base), dtype=np.float64)
+    max_discharging = np.asarray(graph.get("max_discharging", base), dtype=np.float64)
+    wholesale_price = float(np.asarray(graph.get("Wholesale_Price", base)))
+    timestep = soc_timestep(profile, base)
+    capacity = storage_capacity(profile, base)
+
+    values = np.full((len(charge_thresholds), len(ratios), len(outputs)), np.nan)
+
+    def combinations() -> Iterator[tuple[int, int, np.ndarray]]:
+        for i, charge_threshold in enumerate(charge_thresholds):
+            eff_charging = np.asarray(
+                graph.get(
+                    "eff_charging", {**base, "charge_threshold": charge_threshold}
+                ),
+                dtype=np.float64,
+            )
+            for j, requests in discharge_requests(
+                prices,
+                wholesale_price,
+                eff_charging,
+                deltapower,
+                max_discharging,
+                ratios,
+            ):
+                yield i, j, requests.copy()
+
+    done = 0
+    for block in split_blocks(combinations(), block_size):
+        soc_values = soc_batched(
+            np.stack([requests for _, _, requests in block]),
+            timestep,
+            np.full(len(block), capacity),
+        )
+        for (i, j, _), end_soc_values in zip(block, soc_values):
+            params = {
+                **base,
+                "charge_threshold": charge_thresholds[i],
+                "discharge_ratio": ratios[j],
+            }
+            graph.put("end_soc_values", params, end_soc_values.astype(params["dtype"]))
+            business_case.columns = Dataflow_View(graph, params)
+            values[i, j] = compute_outputs(
+                business_case, profile, business_case.columns, params
+            )
+        done += len(block)
+        if progress is not None:
+            progress(done / len(grid) * 100)
+
+    # The grid holds the ratio before the charge threshold (see SWEEP_AXES)
+    return Sweep_Result(
+        str(business_case.param_df.iloc[scenario_index, 0]),
+        grid.axes,
+        outputs,
+        np.swapaxes(values, 0, 1).reshape(grid.shape + (len(outputs),)),
+    )
@@ -3,6 +3,8 @@
 # information about the business case which needs to be carried over between functions
 # =====================================================================================
 # External imports
+import os
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any
 import numpy as np
 from openpyxl import load_workbook
@@ -12,6 +14,11 @@ import pandas as pd
 # Internal imports
 from libs.extra import coerce_byte
 from libs.logger import log_print
+from libs.aggregates import Scenario_Aggregates
+from libs.dataflow import Dataflow_Graph, Dataflow_View
+from libs.finance import Scenario_Financials
+from libs.precision import cast_timeseries
+from libs.trace_store import Trace_Store
 
 # =====================================================================================
 
@@ -33,9 +40,57 @@ class Business_Case:
         self.years_covered: float
         self.scenario_list: pd.Series[Any] | list[str]
 
+        ## The timeseries read from each of the Timeseries sheets (ex: one per year), and the name of each sheet
+        self.timeseries: list[pd.DataFrame] = []
+        self.timeseries_names: list[str] = []
+
         # Variables which are defiend per scenario but are needed for the plots
         self.power_level: float
 
+        ## Engine options (overwritten from modify/settings.py by the entrypoint)
+        self.soc_engine: str = "auto"
+        self.dispatch_strategy: str = "threshold"
+        self.dispatch_options: dict[str, dict[str, Any]] = {}
+        ## Plug-in dispatch strategies, on top of the DISPATCH_STRATEGIES of methods/engine.py (see DISPATCH_STRATEGY_SET in modify/settings.py)
+        self.dispatch_strategies: dict[str, Any] = {}
+        ## Options of the capacity fade of the storage (see DEGRADATION in modify/settings.py), disabled if empty
+        self.degradation: dict[str, Any] = {}
+        ## Options of the yearly cash flows (see CASH_FLOW in modify/settings.py), an annuity if empty
+        self.cash_flow: dict[str, Any] = {}
+        self.compute_dtype: type = np.float64
+        ## The timeseries before its cast to compute_dtype, the inputs of the float64 reference of the accuracy report (None in float64 mode)
+        self.float64_df: pd.DataFrame | None = None
+        self.accuracy_report: pd.DataFrame | None = None
+
+        ## Dataflow graphs of the derived columns (one per method, see methods/engine.py) and the view of the last computed scenario
+        self.dataflow: dict[str, Dataflow_Graph] = {}
+        ## Bounds of the cache of the graphs (see DATAFLOW_CACHE in modify/settings.py), the defaults of libs/dataflow.py if empty
+        self.dataflow_cache: dict[str, int] = {}
+        self.columns: Dataflow_View | dict[str, np.ndarray] | None = None
+        self.aggregates: Scenario_Aggregates | None = None
+        self.financials: Scenario_Financials | None = None
+
+        ## Amount of times each row of df counts in the aggregates (set when df only holds representative days, see methods/representative_days.py)
+        self.row_weights: np.ndarray | None = None
+        self.representative_days: Any = None
+
+        ## Compact store of the traces of every computed scenario (set by the entrypoint if enabled in modify/settings.py or needed by the deferred plots)
+        self.traces: Trace_Store | None = None
+
+        ## The result containers below are listed in RESULT_CONTAINERS of libs/precision.py
+        ## Results of the sweeps run around each scenario (Sweep_Result, or Screening_Result, per scenario name, see methods/sweep.py)
+        self.sweeps: dict[str, Any] = {}
+        ## Results of the sizing optimizer (Sizing_Result per scenario name, see methods/optimizer.py)
+        self.sizings: dict[str, Any] = {}
+        ## Results of the Monte Carlo on the financial inputs (Monte_Carlo_Result per scenario name, see methods/financial_monte_carlo.py)
+        self.monte_carlo: dict[str, Any] = {}
+        ## Results of the block bootstrap (Bootstrap_Result per scenario name, see methods/bootstrap.py)
+        self.bootstraps: dict[str, Any] = {}
+        ## Revenue bases of the simulated scenarios, to re-price them under new tariffs (Revenue_Basis per scenario name, see methods/repricing.py)
+        self.revenue_bases: dict[str, Any] = {}
+        ## Outputs of the scenarios with the rule-based and the optimal dispatch (Dispatch_Benchmark per scenario name, see methods/optimal_dispatch.py)
+        self.dispatch_benchmarks: dict[str, Any] = {}
+
         return
 
     def setup_globals(
@@ -56,11 +111,18 @@ class Business_Case:
             gen_flag: a boolean which enables or disables the use of the generalized BC function
         """
         self.input_values = input_values
-        self.df = pd.read_excel(
-            file_name,
-            sheet_name=self.input_values["Timeseries Sheet Name"],
-            header=0,
-            engine="openpyxl",
+        sources = parse_timeseries_sources(
+            file_name, self.input_values["Timeseries Sheet Name"]
+        )
+        self.timeseries = read_timeseries(sources)
+        self.timeseries_names = [
+            sheet_name or os.path.basename(path) for path, sheet_name in sources
+        ]
+        # Several timeseries (ex: one per year) are simulated back to back, except by the Multi-Year run mode
+        self.df = (
+            self.timeseries[0]
+            if len(self.timeseries) == 1
+            else pd.concat(self.timeseries, ignore_index=True)
         )
         self.param_df = read_pdf(
             file_name, self.input_values["Param Analysis Sheet Name"]
@@ -82,8 +144,30 @@ class Business_Case:
 
         if gen_flag:
             self.gen_method_setup()
+
+        self.float64_df = None
+        if self.compute_dtype != np.float64:
+            self.float64_df = self.df
+            self.df = cast_timeseries(self.df, self.compute_dtype)
+
+        # The graphs are built on top of the timeseries, so they are rebuilt (lazily) whenever the timeseries is re-read
+        self.dataflow = {}
+        self.columns = None
         return
 
+    def column(self, name: str) -> pd.Series:
+        """
+        Function purpose: Gives a derived column of the last computed scenario, whether the method stored it in the timeseries
+        or in the dataflow graph
+
+        Outputs: the column as a pandas Series
+        Args:
+            name: the name of the column
+        """
+        if self.columns is not None and name in self.columns:
+            return pd.Series(self.columns[name])
+        return self.df[name]
+
     def gen_method_setup(self):
         """
         Function Purpose: Setup the environment for the general purpose method to work
@@ -122,6 +206,53 @@ class Business_Case:
         return
 
 
+def parse_timeseries_sources(file_name: str, text: str) -> list[tuple[str, str]]:
+    """
+    Function purpose: Reads the Timeseries Sheet Name entry, which may list several timeseries (ex: one per year) \n
+    Outputs: the (excel file, sheet name) of every timeseries, in the given order
+    Note: The timeseries are separated with ','. Each one is a sheet of the studied file, or another excel file given
+    as "path/to/file.xlsx" (its first sheet) or "path/to/file.xlsx#Sheet Name".
+    Args:
+        file_name: the name of the studied excel file
+        text: the Timeseries Sheet Name entry
+    """
+    sources = []
+    for entry in str(text).split(","):
+        entry = entry.strip()
+        if entry == "":
+            continue
+        path, _, sheet_name = entry.partition("#")
+        if os.path.splitext(path)[1].lower() in (".xlsx", ".xlsm", ".xls"):
+            sources.append((path.strip(), sheet_name.strip()))
+        else:
+            sources.append((file_name, entry))
+    if not sources:
+        raise ValueError("No timeseries sheet was given")
+    return sources
+
+
+def read_timeseries(sources: list[tuple[str, str]]) -> list[pd.DataFrame]:
+    """
+    Function purpose: Reads several timeseries at once, each in its own thread \n
+    Outputs: the timeseries dataframes, in the order of sources
+    Args:
+        sources: the (excel file, sheet name) of every timeseries, an empty sheet name reads the first sheet
+    """
+
+    def read(source: tuple[str, str]) -> pd.DataFrame:
+        log_print(
+            f"Reading the timeseries {source[1] or '(first sheet)'} of {source[0]}"
+        )
+        return pd.read_excel(
+            source[0], sheet_name=source[1] or 0, header=0, engine="openpyxl"
+        )
+
+    if len(sources) == 1:
+        return [read(sources[0])]
+    with ThreadPoolExecutor(max_workers=min(len(sources), os.cpu_count() or 1)) as pool:
+        return list(pool.map(read, sources))
+
+
 def read_pdf(file_name: str, pdf_sheetname: str) -> pd.DataFrame:
     """
     Function purpose:  Reads the excel sheet where the parameters by scenario are located \n
@@ -149,6 +280,7 @@ def read_pdf(file_name: str, pdf_sheetname: str) -> pd.DataFrame:
 # ============================================================================================================================
 # THis mess is here to avoid import errors
 
+
 def calculate_ap(df: pd.DataFrame, method: int) -> pd.Series:
     """
     Function purpose: Calculated the Available Power differently depending on the chosen method
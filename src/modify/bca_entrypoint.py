@@ -2,18 +2,63 @@
 # bca_entrypoint.py - File containing the intersection between the frontend, and the BC tool
 # ============================================================================================================================
 # External Imports
+import numpy as np
 import pandas as pd
-from typing import Any
+from typing import Any, Callable
 
 # ============================================================================================================================
 # Internal Imports
 from modify.bca_class import Business_Case
-from methods.general_method import general_method
+from methods.general_method import GENERAL_PROFILE, general_method
+from methods.bootstrap import bootstrap_scenario
+from methods.engine import (
+    Method_Profile,
+    cash_flow_model,
+    compute_outputs,
+    launch_profile,
+    read_scenario,
+    scenario_view,
+    select_layout,
+)
+from methods.financial_monte_carlo import financial_monte_carlo
+from methods.multi_year import run_multi_year
+from methods.repricing import reprice_scenario, revenue_basis
+from methods.optimal_dispatch import optimal_dispatch
+from methods.optimizer import optimize_sizing, parse_bounds
+from methods.price_paths import generate_price_paths, simulate_price_paths
+from methods.representative_days import representative_case, representative_error
+from methods.screening import screen_sweep
+from methods.sweep import SWEEP_AXES, Sweep_Grid, parse_axis, run_sweep
+from methods.threshold_sweep import THRESHOLD_AXES, run_threshold_sweep
 from libs.extra import find_scenario_index
 from libs.excel import force_excel_calc, save_to_excel
 from libs.logger import log_print
 from frontend.popup import Progress_Popup
-from modify.settings import METHOD_SET
+from libs.precision import accuracy_report
+from libs.trace_store import Trace_Store
+from modify.settings import (
+    BOOTSTRAP,
+    CASH_FLOW,
+    COMPUTE_PRECISION,
+    DATAFLOW_CACHE,
+    DEGRADATION,
+    DISPATCH_OPTIONS,
+    DISPATCH_STRATEGY,
+    DISPATCH_STRATEGY_SET,
+    METHOD_PROFILES,
+    METHOD_SET,
+    MONTE_CARLO,
+    MULTI_YEAR,
+    OPTIMAL_DISPATCH,
+    OPTIMIZER,
+    PRICE_PATHS,
+    REPRESENTATIVE_DAYS,
+    REPRICING,
+    SCREENING,
+    SOC_ENGINE,
+    SWEEP,
+    TRACE_STORE,
+)
 
 # ============================================================================================================================
 
@@ -31,6 +76,8 @@ def run(
     progress_pp: Progress_Popup,
     gen_flag=False,
     recalc_flag=False,
+    run_mode="Scenarios",
+    sweep_axes: dict[str, str] | None = None,
 ):
     """
     Function purpose: this function serves as the entry point into the BC logic \n
@@ -45,33 +92,86 @@ def run(
         chosen_plots: a dictionnary where the information is stored about which polots the user chose to do:  (key:boolean)
         progress_pp: the progress bar and the label that appears above the progress bar, set to optional for compatibility with tests
         gen_flag: a boolean which enables or disables the use of the generalised BC method
+        run_mode: one of RUN_MODES (see modify/settings.py)
+        sweep_axes: for the "Sweep", "Threshold Sweep" and "Screening" run modes, the values of each swept parameter as typed by the user (see parse_axis), for
+        the "Optimizer" run mode the power and duration bounds (see parse_bounds)
     """
     if not (recalc_flag):
         force_excel_calc(
             file_name
         )  # Force excel to recalculate the sheets of the file, this adds overhead but elimantes many bugs
     business_case = Business_Case()
+    business_case.soc_engine = SOC_ENGINE
+    business_case.dispatch_strategy = DISPATCH_STRATEGY
+    business_case.dispatch_options = DISPATCH_OPTIONS
+    business_case.dispatch_strategies = DISPATCH_STRATEGY_SET
+    business_case.degradation = DEGRADATION
+    business_case.cash_flow = CASH_FLOW
+    business_case.dataflow_cache = DATAFLOW_CACHE
+    if COMPUTE_PRECISION["float32"]:
+        business_case.compute_dtype = np.float32
     business_case.setup_globals(file_name, input_values, case_type, method, gen_flag)
+    # The deferred plots are drawn from the stored traces
+    if TRACE_STORE["enabled"] or TRACE_STORE["deferred_plots"]:
+        business_case.traces = Trace_Store(
+            TRACE_STORE["encoding"], TRACE_STORE["compress"]
+        )
 
-    progress_counter: int = 0
-    for scenario_name in business_case.scenario_list:
-        scenario_index = find_scenario_index(business_case.param_df, scenario_name)
-        launch_analysis_new(business_case, scenario_index, debug_mode, gen_flag)
-        progress_counter += 1
-        for key in chosen_plots:
-            if chosen_plots[key][0]:
-                chosen_plots[key][1](business_case, scenario_name, debug_mode)
-        percent: float = (progress_counter / len(business_case.scenario_list)) * 100
-        log_print(f"Progress: {percent}% done")
-
-        progress_pp.update_vals("Computing Simulation", percent)
-
-    log_print("Simulations Complete! \n ")
-
-    selected_data: pd.DataFrame = business_case.param_df.iloc[:, 7:]  # type: ignore
+    if run_mode == "Sweep":
+        output_data = launch_sweeps(
+            business_case, sweep_axes or {}, gen_flag, progress_pp
+        )
+        # Copy to clipboard with the header, the sweep rows aren't in the Parametric Analysis sheet
+        output_data.to_clipboard(index=False)
+    elif run_mode == "Threshold Sweep":
+        output_data = launch_threshold_sweeps(
+            business_case, sweep_axes or {}, gen_flag, progress_pp
+        )
+        output_data.to_clipboard(index=False)
+    elif run_mode == "Screening":
+        output_data = launch_screenings(
+            business_case, sweep_axes or {}, gen_flag, progress_pp
+        )
+        output_data.to_clipboard(index=False)
+    elif run_mode == "Optimizer":
+        output_data = launch_optimizations(
+            business_case, sweep_axes or {}, gen_flag, progress_pp
+        )
+        output_data.to_clipboard(index=False)
+    elif run_mode == "Monte Carlo":
+        output_data = launch_monte_carlo(
+            business_case, chosen_plots, debug_mode, gen_flag, progress_pp
+        )
+        output_data.to_clipboard(index=False)
+    elif run_mode == "Price Paths":
+        output_data = launch_price_paths(business_case, gen_flag, progress_pp)
+        output_data.to_clipboard(index=False)
+    elif run_mode == "Bootstrap":
+        output_data = launch_bootstraps(business_case, gen_flag, progress_pp)
+        output_data.to_clipboard(index=False)
+    elif run_mode == "Multi-Year":
+        output_data = launch_multi_year(business_case, gen_flag, progress_pp)
+        output_data.to_clipboard(index=False)
+    elif run_mode == "Re-Pricing":
+        output_data = launch_repricing(business_case, gen_flag, progress_pp)
+        output_data.to_clipboard(index=False)
+    elif run_mode == "Optimal Dispatch":
+        output_data = launch_optimal_dispatch(business_case, gen_flag, progress_pp)
+        output_data.to_clipboard(index=False)
+    else:
+        if run_mode == "Representative Days":
+            launch_representative_days(
+                business_case, chosen_plots, debug_mode, gen_flag, progress_pp
+            )
+        else:
+            launch_scenarios(
+                business_case, chosen_plots, debug_mode, gen_flag, progress_pp
+            )
+        output_data = business_case.param_df
+        selected_data: pd.DataFrame = output_data.iloc[:, 7:]  # type: ignore
 
-    # Copy to clipboard without the index
-    selected_data.to_clipboard(index=False, header=False)
+        # Copy to clipboard without the index
+        selected_data.to_clipboard(index=False, header=False)
 
     log_print("Data copied to clipboard!\n")
     progress_pp.update_vals("Data Copied to Clipboard", 0)
@@ -83,7 +183,7 @@ def run(
             file_name,
             output_sheet_name,
             debug_mode,
-            business_case.param_df,
+            output_data,
             progress_pp,
         )
 
@@ -94,6 +194,616 @@ def run(
 # _______________________________________________________________________________________________________________________________________________________________________________
 
 
+def launch_scenarios(
+    business_case: Business_Case,
+    chosen_plots: dict[str, Any],
+    debug_mode: bool,
+    gen_flag: bool,
+    progress_pp: Progress_Popup,
+    analysis: Callable[[Business_Case, int], None] | None = None,
+):
+    """
+    Function purpose: Computes every selected scenario, writing their results to param_df, and draws their plots
+    Args:
+        business_case: the class which contains all useful information about the business_case
+        chosen_plots: a dictionnary where the information is stored about which polots the user chose to do:  (key:boolean)
+        debug_mode: a boolean which when True adds more print statements/logs
+        gen_flag: a boolean which enables or disables the use of the generalized BC function
+        progress_pp: the progress bar and the label that appears above the progress bar
+        analysis: the function computing a scenario, takes (business_case, scenario_index), launch_analysis_new if None
+    """
+    if analysis is None:
+        analysis = lambda bc, index: launch_analysis_new(
+            bc, index, debug_mode, gen_flag
+        )
+    deferred_plots: bool = (
+        business_case.traces is not None and TRACE_STORE["deferred_plots"]
+    )
+
+    progress_counter: int = 0
+    for scenario_name in business_case.scenario_list:
+        scenario_index = find_scenario_index(business_case.param_df, scenario_name)
+        analysis(business_case, scenario_index)
+        if progress_counter == 0 and business_case.compute_dtype != np.float64:
+            business_case.accuracy_report = accuracy_report(
+                business_case,
+                scenario_index,
+                analysis,
+                COMPUTE_PRECISION["report_tolerance"],
+            )
+        progress_counter += 1
+        if business_case.traces is not None:
+            business_case.traces.add(scenario_name, business_case)
+        if not deferred_plots:
+            draw_plots(business_case, scenario_name, chosen_plots, debug_mode)
+        percent: float = (progress_counter / len(business_case.scenario_list)) * 100
+        log_print(f"Progress: {percent}% done")
+
+        progress_pp.update_vals("Computing Simulation", percent)
+
+    log_print("Simulations Complete! \n ")
+
+    if business_case.traces is not None:
+        business_case.traces.log_size()
+        if deferred_plots:
+            for scenario_name in business_case.traces.scenarios():
+                business_case.traces.restore(scenario_name, business_case)
+                draw_plots(business_case, scenario_name, chosen_plots, debug_mode)
+    return
+
+
+def launch_representative_days(
+    business_case: Business_Case,
+    chosen_plots: dict[str, Any],
+    debug_mode: bool,
+    gen_flag: bool,
+    progress_pp: Progress_Popup,
+):
+    """
+    Function purpose: Computes every selected scenario on a few representative days of the timeseries instead of the whole
+    timeseries (see methods/representative_days.py), writing their results to param_df
+    Args:
+        business_case: the class which contains all useful information about the business_case, the Representative_Days
+        are kept in business_case.representative_days
+        chosen_plots: a dictionnary where the information is stored about which polots the user chose to do:  (key:boolean)
+        debug_mode: a boolean which when True adds more print statements/logs
+        gen_flag: a boolean which enables or disables the use of the generalized BC function
+        progress_pp: the progress bar and the label that appears above the progress bar
+    """
+    profile = engine_profile(business_case, gen_flag)
+    reduced, reduced_profile, representative = representative_case(
+        business_case,
+        profile,
+        REPRESENTATIVE_DAYS["days"],
+        REPRESENTATIVE_DAYS["seed"],
+    )
+    business_case.representative_days = representative
+
+    def analysis(case: Business_Case, scenario_index: int):
+        if gen_flag:
+            general_method(case, scenario_index, debug_mode)
+        else:
+            launch_profile(case, scenario_index, reduced_profile)
+        return
+
+    launch_scenarios(reduced, chosen_plots, debug_mode, gen_flag, progress_pp, analysis)
+    business_case.accuracy_report = reduced.accuracy_report
+
+    if REPRESENTATIVE_DAYS["error_report"]:
+        representative.error = representative_error(
+            business_case,
+            reduced,
+            find_scenario_index(
+                business_case.param_df, list(business_case.scenario_list)[0]
+            ),
+            lambda bc, index: launch_analysis_new(bc, index, debug_mode, gen_flag),
+        )
+    return
+
+
+def launch_monte_carlo(
+    business_case: Business_Case,
+    chosen_plots: dict[str, Any],
+    debug_mode: bool,
+    gen_flag: bool,
+    progress_pp: Progress_Popup,
+) -> pd.DataFrame:
+    """
+    Function purpose: Computes every selected scenario, then the distribution of its NPV and IRR over draws of the
+    financial inputs (see methods/financial_monte_carlo.py) \n
+    Outputs: the summary of the distributions of every scenario, one row per scenario
+    Args:
+        business_case: the class which contains all useful information about the business_case, the Monte_Carlo_Result of
+        each scenario is kept in business_case.monte_carlo
+        chosen_plots: a dictionnary where the information is stored about which polots the user chose to do:  (key:boolean)
+        debug_mode: a boolean which when True adds more print statements/logs
+        gen_flag: a boolean which enables or disables the use of the generalized BC function
+        progress_pp: the progress bar and the label that appears above the progress bar
+    """
+
+    def analysis(case: Business_Case, scenario_index: int):
+        case.financials = None
+        launch_analysis_new(case, scenario_index, debug_mode, gen_flag)
+        if case.financials is None:
+            raise ValueError(
+                "The Monte Carlo run mode is only available for the methods built on the BC engine"
+            )
+        scenario_name = str(case.param_df.iloc[scenario_index, 0])
+        case.monte_carlo[scenario_name] = financial_monte_carlo(
+            scenario_name,
+            case.financials,
+            case.input_values,
+            MONTE_CARLO["distributions"],
+            MONTE_CARLO["draws"],
+            MONTE_CARLO["seed"],
+            cash_flow_model(case),
+            engine_profile(case, gen_flag).irr_values,
+        )
+        return
+
+    launch_scenarios(
+        business_case, chosen_plots, debug_mode, gen_flag, progress_pp, analysis
+    )
+    return pd.DataFrame(
+        [
+            result.summary(MONTE_CARLO["percentiles"])
+            for result in business_case.monte_carlo.values()
+        ]
+    )
+
+
+def launch_price_paths(
+    business_case: Business_Case, gen_flag: bool, progress_pp: Progress_Popup
+) -> pd.DataFrame:
+    """
+    Function purpose: Re-simulates every selected scenario over perturbed balancing prices (see methods/price_paths.py) \n
+    Outputs: the summary of the distributions of the NPV and IRR of every scenario, one row per scenario
+    Args:
+        business_case: the class which contains all useful information about the business_case, the Monte_Carlo_Result of
+        each scenario is kept in business_case.monte_carlo
+        gen_flag: a boolean which enables or disables the use of the generalized BC function
+        progress_pp: the progress bar and the label that appears above the progress bar
+    """
+    profile = engine_profile(business_case, gen_flag)
+    rows_per_day = 24 * 60 / business_case.input_values["Settlement Period"]
+    if PRICE_PATHS["bootstrap_days"] > 0 and not rows_per_day.is_integer():
+        raise ValueError(
+            "The settlement period must divide a day to resample the days of the prices"
+        )
+    price_paths = generate_price_paths(
+        len(business_case.df),
+        int(rows_per_day),
+        PRICE_PATHS["paths"],
+        PRICE_PATHS["scale"],
+        PRICE_PATHS["shift"],
+        PRICE_PATHS["bootstrap_days"],
+        PRICE_PATHS["seed"],
+    )
+
+    summary_rows: list[dict[str, Any]] = []
+    for i, scenario_name in enumerate(business_case.scenario_list):
+        scenario_index = find_scenario_index(business_case.param_df, scenario_name)
+        result = simulate_price_paths(
+            business_case,
+            scenario_index,
+            profile,
+            price_paths,
+            PRICE_PATHS["block_size"],
+            lambda percent: progress_pp.update_vals(
+                f"Simulating the Price Paths of {scenario_name}",
+                (i + percent / 100) / len(business_case.scenario_list) * 100,
+            ),
+        )
+        business_case.monte_carlo[str(scenario_name)] = result
+        summary_rows.append(result.summary(PRICE_PATHS["percentiles"]))
+
+    log_print("Price Paths Complete! \n ")
+    return pd.DataFrame(summary_rows)
+
+
+def launch_bootstraps(
+    business_case: Business_Case, gen_flag: bool, progress_pp: Progress_Popup
+) -> pd.DataFrame:
+    """
+    Function purpose: Computes the confidence intervals of the outputs of every selected scenario over resampled blocks
+    of days (see methods/bootstrap.py) \n
+    Outputs: one row per scenario and output, with its value and confidence interval
+    Args:
+        business_case: the class which contains all useful information about the business_case, the Bootstrap_Result of
+        each scenario is kept in business_case.bootstraps
+        gen_flag: a boolean which enables or disables the use of the generalized BC function
+        progress_pp: the progress bar and the label that appears above the progress bar
+    """
+    profile = engine_profile(business_case, gen_flag)
+
+    interval_data: list[pd.DataFrame] = []
+    for i, scenario_name in enumerate(business_case.scenario_list):
+        progress_pp.update_vals(
+            f"Bootstrapping {scenario_name}", i / len(business_case.scenario_list) * 100
+        )
+        scenario_index = find_scenario_index(business_case.param_df, scenario_name)
+        result = bootstrap_scenario(
+            business_case,
+            scenario_index,
+            profile,
+            BOOTSTRAP["replicates"],
+            BOOTSTRAP["block_days"],
+            BOOTSTRAP["soc"],
+            BOOTSTRAP["confidence"],
+            BOOTSTRAP["seed"],
+        )
+        business_case.bootstraps[str(scenario_name)] = result
+        interval_data.append(result.intervals())
+
+    log_print("Bootstraps Complete! \n ")
+    return pd.concat(interval_data, ignore_index=True)
+
+
+def launch_multi_year(
+    business_case: Business_Case, gen_flag: bool, progress_pp: Progress_Popup
+) -> pd.DataFrame:
+    """
+    Function purpose: Computes every selected scenario over each of the timeseries sheets (ex: one per year) and over all
+    of them pooled (see methods/multi_year.py) \n
+    Outputs: one row per scenario and timeseries, then one pooled row per scenario
+    Args:
+        business_case: the class which contains all useful information about the business_case
+        gen_flag: a boolean which enables or disables the use of the generalized BC function
+        progress_pp: the progress bar and the label that appears above the progress bar
+    """
+    if gen_flag:
+        raise ValueError(
+            "The Multi-Year run mode isn't available for the generalised method, its setup is done on the joined timeseries"
+        )
+    if len(business_case.timeseries) < 2:
+        raise ValueError(
+            "The Multi-Year run mode needs several timeseries sheets, separated with ',' in the Timeseries Sheet Name"
+        )
+    profile = engine_profile(business_case, gen_flag)
+    scenario_indices = [
+        find_scenario_index(business_case.param_df, scenario_name)
+        for scenario_name in business_case.scenario_list
+    ]
+    output_data = run_multi_year(
+        business_case,
+        profile,
+        scenario_indices,
+        MULTI_YEAR["soc"],
+        MULTI_YEAR["workers"],
+        lambda percent: progress_pp.update_vals(
+            "Simulating the timeseries sheets", percent
+        ),
+    )
+    log_print("Multi-Year Complete! \n ")
+    return output_data
+
+
+def launch_repricing(
+    business_case: Business_Case, gen_flag: bool, progress_pp: Progress_Popup
+) -> pd.DataFrame:
+    """
+    Function purpose: Computes every selected scenario once, then re-prices it under each tariff of REPRICING (see
+    methods/repricing.py) \n
+    Outputs: one row per scenario and tariff (the first tariff being the scenario's own prices), with the prices, whether
+    the scenario had to be simulated again and the outputs
+    Args:
+        business_case: the class which contains all useful information about the business_case, the Revenue_Basis of
+        each scenario is kept in business_case.revenue_bases
+        gen_flag: a boolean which enables or disables the use of the generalized BC function
+        progress_pp: the progress bar and the label that appears above the progress bar
+    """
+    profile = engine_profile(business_case, gen_flag)
+
+    rows: list[dict[str, Any]] = []
+    for i, scenario_name in enumerate(business_case.scenario_list):
+        progress_pp.update_vals(
+            f"Computing {scenario_name}", i / len(business_case.scenario_list) * 100
+        )
+        scenario_index = find_scenario_index(business_case.param_df, scenario_name)
+        scenario = read_scenario(business_case, scenario_index)
+        columns = scenario_view(business_case, profile, scenario)
+        layout = select_layout(profile, columns)
+        values = compute_outputs(business_case, profile, columns, scenario)
+        basis = revenue_basis(business_case, profile, columns, scenario, layout)
+        business_case.revenue_bases[str(scenario_name)] = basis
+        rows.append(
+            {
+                "Scenario": scenario_name,
+                "PPA Price": scenario["ppa_price"],
+                "Green-Certificate Price": scenario["green_certificate"],
+                "Re-Simulated": False,
+                **dict(zip(layout, values)),
+            }
+        )
+
+        for tariff in REPRICING["tariffs"]:
+            values, simulated = reprice_scenario(
+                business_case,
+                profile,
+                basis,
+                tariff.get("PPA Price"),
+                tariff.get("Green-Certificate Price"),
+            )
+            rows.append(
+                {
+                    "Scenario": scenario_name,
+                    "PPA Price": tariff.get("PPA Price", scenario["ppa_price"]),
+                    "Green-Certificate Price": tariff.get(
+                        "Green-Certificate Price", scenario["green_certificate"]
+                    ),
+                    "Re-Simulated": simulated,
+                    **dict(zip(layout, values)),
+                }
+            )
+
+    log_print("Re-Pricing Complete! \n ")
+    return pd.DataFrame(rows)
+
+
+def launch_optimal_dispatch(
+    business_case: Business_Case, gen_flag: bool, progress_pp: Progress_Popup
+) -> pd.DataFrame:
+    """
+    Function purpose: Computes every selected scenario with its dispatch strategy and with the perfect-foresight optimal
+    dispatch (see methods/optimal_dispatch.py) \n
+    Outputs: one row per scenario and output, with its value for both dispatches and their difference
+    Args:
+        business_case: the class which contains all useful information about the business_case, the Dispatch_Benchmark
+        of each scenario is kept in business_case.dispatch_benchmarks
+        gen_flag: a boolean which enables or disables the use of the generalized BC function
+        progress_pp: the progress bar and the label that appears above the progress bar
+    """
+    profile = engine_profile(business_case, gen_flag)
+
+    benchmark_data: list[pd.DataFrame] = []
+    for i, scenario_name in enumerate(business_case.scenario_list):
+        progress_pp.update_vals(
+            f"Optimizing the dispatch of {scenario_name}",
+            i / len(business_case.scenario_list) * 100,
+        )
+        scenario_index = find_scenario_index(business_case.param_df, scenario_name)
+        result = optimal_dispatch(
+            business_case, scenario_index, profile, OPTIMAL_DISPATCH["soc_levels"]
+        )
+        business_case.dispatch_benchmarks[str(scenario_name)] = result
+        benchmark_data.append(result.table())
+
+    log_print("Optimal Dispatches Complete! \n ")
+    return pd.concat(benchmark_data, ignore_index=True)
+
+
+def launch_sweeps(
+    business_case: Business_Case,
+    sweep_axes: dict[str, str],
+    gen_flag: bool,
+    progress_pp: Progress_Popup,
+) -> pd.DataFrame:
+    """
+    Function purpose: Runs the sweep around every selected scenario (the parameters which aren't swept keep the scenario's value)\n
+    Outputs: the rows of every sweep, in the layout of the Parametric Analysis sheet
+    Args:
+        business_case: the class which contains all useful information about the business_case, the Sweep_Result of
+        each scenario is kept in business_case.sweeps
+        sweep_axes: the values of each swept parameter as typed by the user (see parse_axis)
+        gen_flag: a boolean which enables or disables the use of the generalized BC function
+        progress_pp: the progress bar and the label that appears above the progress bar
+    """
+    profile = engine_profile(business_case, gen_flag)
+    axes = read_sweep_axes(business_case, sweep_axes)
+
+    sweep_data: list[pd.DataFrame] = []
+    for i, scenario_name in enumerate(business_case.scenario_list):
+        scenario_index = find_scenario_index(business_case.param_df, scenario_name)
+        result = run_sweep(
+            business_case,
+            scenario_index,
+            profile,
+            axes,
+            SWEEP["block_size"],
+            lambda percent: progress_pp.update_vals(
+                f"Computing Sweep of {scenario_name}",
+                (i + percent / 100) / len(business_case.scenario_list) * 100,
+            ),
+            SWEEP["closed_form_participation"],
+        )
+        business_case.sweeps[str(scenario_name)] = result
+        sweep_data.append(result.to_dataframe())
+        log_print(f"Best NPV of the sweep of {scenario_name}: {result.best('NPV')}")
+
+    log_print("Sweeps Complete! \n ")
+    return pd.concat(sweep_data, ignore_index=True)
+
+
+def launch_threshold_sweeps(
+    business_case: Business_Case,
+    sweep_axes: dict[str, str],
+    gen_flag: bool,
+    progress_pp: Progress_Popup,
+) -> pd.DataFrame:
+    """
+    Function purpose: Runs the sweep of the charge and discharge price thresholds around every selected scenario (see
+    methods/threshold_sweep.py) \n
+    Outputs: the rows of every sweep, in the layout of the Parametric Analysis sheet
+    Args:
+        business_case: the class which contains all useful information about the business_case, the Sweep_Result of
+        each scenario is kept in business_case.sweeps
+        sweep_axes: the values of each swept parameter as typed by the user (see parse_axis), only the thresholds are read
+        gen_flag: a boolean which enables or disables the use of the generalized BC function
+        progress_pp: the progress bar and the label that appears above the progress bar
+    """
+    profile = engine_profile(business_case, gen_flag)
+    axes = read_sweep_axes(
+        business_case,
+        {name: value for name, value in sweep_axes.items() if name in THRESHOLD_AXES},
+    )
+
+    sweep_data: list[pd.DataFrame] = []
+    for i, scenario_name in enumerate(business_case.scenario_list):
+        scenario_index = find_scenario_index(business_case.param_df, scenario_name)
+        result = run_threshold_sweep(
+            business_case,
+            scenario_index,
+            profile,
+            axes,
+            SWEEP["block_size"],
+            lambda percent: progress_pp.update_vals(
+                f"Computing Threshold Sweep of {scenario_name}",
+                (i + percent / 100) / len(business_case.scenario_list) * 100,
+            ),
+        )
+        business_case.sweeps[str(scenario_name)] = result
+        sweep_data.append(result.to_dataframe())
+        log_print(
+            f"Best NPV of the threshold sweep of {scenario_name}: {result.best('NPV')}"
+        )
+
+    log_print("Threshold Sweeps Complete! \n ")
+    return pd.concat(sweep_data, ignore_index=True)
+
+
+def launch_screenings(
+    business_case: Business_Case,
+    sweep_axes: dict[str, str],
+    gen_flag: bool,
+    progress_pp: Progress_Popup,
+) -> pd.DataFrame:
+    """
+    Function purpose: Screens the sweep around every selected scenario on a coarse timeseries, and re-simulates its best
+    combinations at full resolution (see methods/screening.py) \n
+    Outputs: the best combinations of every scenario at full resolution, in the layout of the Parametric Analysis sheet
+    Args:
+        business_case: the class which contains all useful information about the business_case, the Screening_Result of
+        each scenario is kept in business_case.sweeps
+        sweep_axes: the values of each swept parameter as typed by the user (see parse_axis)
+        gen_flag: a boolean which enables or disables the use of the generalized BC function
+        progress_pp: the progress bar and the label that appears above the progress bar
+    """
+    profile = engine_profile(business_case, gen_flag)
+    axes = read_sweep_axes(business_case, sweep_axes)
+
+    screening_data: list[pd.DataFrame] = []
+    for i, scenario_name in enumerate(business_case.scenario_list):
+        scenario_index = find_scenario_index(business_case.param_df, scenario_name)
+        result = screen_sweep(
+            business_case,
+            scenario_index,
+            profile,
+            axes,
+            SCREENING["resolution"],
+            SCREENING["top_k"],
+            SCREENING["margin"],
+            SCREENING["objective"],
+            SWEEP["block_size"],
+            lambda percent: progress_pp.update_vals(
+                f"Screening the Sweep of {scenario_name}",
+                (i + percent / 100) / len(business_case.scenario_list) * 100,
+            ),
+        )
+        business_case.sweeps[str(scenario_name)] = result
+        screening_data.append(result.to_dataframe())
+        if result.rank_correlation < SCREENING["warning_correlation"]:
+            log_print(
+                f"Warning: the coarse ranking of {scenario_name} poorly matches the full resolution one (rank correlation"
+                f" of {result.rank_correlation:.3f}), consider a finer screening resolution or a larger margin"
+            )
+
+    log_print("Screenings Complete! \n ")
+    return pd.concat(screening_data, ignore_index=True)
+
+
+def read_sweep_axes(
+    business_case: Business_Case, sweep_axes: dict[str, str]
+) -> dict[str, list[Any]]:
+    """
+    Function purpose: Reads the sweep values typed by the user and checks the size of the sweep \n
+    Outputs: the values of each swept parameter (the parameters left empty aren't swept)
+    Args:
+        business_case: the class which contains all useful information about the business_case
+        sweep_axes: the values of each swept parameter as typed by the user (see parse_axis)
+    """
+    axes: dict[str, list[Any]] = {}
+    for name in SWEEP_AXES:
+        values = parse_axis(name, sweep_axes.get(name, ""))
+        if values is not None:
+            axes[name] = values
+    if not axes:
+        raise ValueError("No sweep values were given, fill in at least one sweep range")
+    amount = len(Sweep_Grid(axes)) * len(business_case.scenario_list)
+    if amount > SWEEP["max_combinations"]:
+        raise ValueError(
+            f"The sweep has {amount} combinations, more than the maximum of {SWEEP['max_combinations']} (see modify/settings.py)"
+        )
+    return axes
+
+
+def launch_optimizations(
+    business_case: Business_Case,
+    sweep_axes: dict[str, str],
+    gen_flag: bool,
+    progress_pp: Progress_Popup,
+) -> pd.DataFrame:
+    """
+    Function purpose: Searches the Storage Power Rating and Duration maximizing the objective of every selected scenario \n
+    Outputs: the optimum of every scenario, in the layout of the Parametric Analysis sheet
+    Args:
+        business_case: the class which contains all useful information about the business_case, the Sizing_Result of
+        each scenario is kept in business_case.sizings
+        sweep_axes: the bounds typed by the user in the Storage Power Rating and Duration sweep entries (see parse_bounds)
+        gen_flag: a boolean which enables or disables the use of the generalized BC function
+        progress_pp: the progress bar and the label that appears above the progress bar
+    """
+    profile = engine_profile(business_case, gen_flag)
+    power_bounds = parse_bounds(
+        "Storage Power Rating",
+        sweep_axes.get("Storage Power Rating", ""),
+        OPTIMIZER["power_bounds"],
+    )
+    duration_bounds = parse_bounds(
+        "Duration", sweep_axes.get("Duration", ""), OPTIMIZER["duration_bounds"]
+    )
+
+    optimum_data: list[pd.DataFrame] = []
+    for i, scenario_name in enumerate(business_case.scenario_list):
+        progress_pp.update_vals(
+            f"Optimizing {scenario_name}", i / len(business_case.scenario_list) * 100
+        )
+        scenario_index = find_scenario_index(business_case.param_df, scenario_name)
+        result = optimize_sizing(
+            business_case,
+            scenario_index,
+            profile,
+            power_bounds,
+            duration_bounds,
+            OPTIMIZER["objective"],
+            OPTIMIZER["max_passes"],
+        )
+        business_case.sizings[str(scenario_name)] = result
+        optimum_data.append(result.to_dataframe())
+        log_print(f"{result.objective} around the optimum: \n {result.neighbourhood}")
+
+    log_print("Optimizations Complete! \n ")
+    return pd.concat(optimum_data, ignore_index=True)
+
+
+def engine_profile(business_case: Business_Case, gen_flag: bool) -> Method_Profile:
+    """
+    Function purpose: Gives the engine profile of the chosen method, for the run modes working directly on the engine \n
+    Outputs: the profile of the general method if gen_flag is True, otherwise the one of business_case.method
+    Args:
+        business_case: the class which contains all useful information about the business_case
+        gen_flag: a boolean which enables or disables the use of the generalized BC function
+    """
+    profile = GENERAL_PROFILE if gen_flag else METHOD_PROFILES[business_case.method]
+    if profile is None:
+        raise ValueError(
+            "This run mode is only available for the methods built on the BC engine"
+        )
+    return profile
+
+
+# _______________________________________________________________________________________________________________________________________________________________________________
+
+
 def launch_analysis_new(
     business_case: Business_Case, scenario_index: int, debug_mode: bool, gen_flag: bool
 ):
@@ -118,3 +828,26 @@ def launch_analysis_new(
     METHOD_SET[business_case.method](business_case, scenario_index, debug_mode)
 
     return
+
+
+# _______________________________________________________________________________________________________________________________________________________________________________
+
+
+def draw_plots(
+    business_case: Business_Case,
+    scenario_name: str,
+    chosen_plots: dict[str, Any],
+    debug_mode: bool,
+):
+    """
+    Function purpose: Draws the plots the user chose for a scenario
+    Args:
+        business_case: the class which contains all useful information about the business_case, holding the scenario to plot
+        scenario_name: the name of the scenario
+        chosen_plots: a dictionnary where the information is stored about which polots the user chose to do:  (key:boolean)
+        debug_mode: a boolean which when True adds more print statements/logs
+    """
+    for key in chosen_plots:
+        if chosen_plots[key][0]:
+            chosen_plots[key][1](business_case, scenario_name, debug_mode)
+    return
@@ -29,25 +29,23 @@ def plot_soc(
     """
     log_print(f"Entered plot for soc for scenario {scenario_name}.")
 
-    # Compute metrics
-    business_case.df["energy_change"] = business_case.df["end_soc_values"].diff().abs()
-    total_throughput = business_case.df["energy_change"].sum()
-    battery_nominal_capacity = (
-        business_case.df["end_soc_values"].max()
-        - business_case.df["end_soc_values"].min()
-    )
-    equivalent_cycles = total_throughput / battery_nominal_capacity
+    # Metrics (computed with the outputs of the scenario, see libs/aggregates.py)
+    aggregates = business_case.aggregates
+    total_throughput = aggregates.throughput
+    equivalent_cycles = aggregates.equivalent_cycles()
 
     if debug_mode:
         log_print(f"Total Throughput: {total_throughput:.2f} MWh.")
     if debug_mode:
         log_print(f"Equivalent Full Cycles: {equivalent_cycles:.2f}.")
+    if debug_mode and aggregates.cycles is not None:
+        log_print(
+            f"Rainflow Full Cycles: {aggregates.cycles.equivalent_full_cycles():.2f}"
+            f" ({len(aggregates.cycles.depths)} cycles, deepest {100 * aggregates.cycles.depths.max(initial=0):.0f}%)."
+        )
 
     # Histogram setup
-    bins = np.arange(0, 105, 5)
-    hist_values, bin_edges = np.histogram(
-        business_case.df["per_state_of_charge"], bins=bins
-    )
+    hist_values, bin_edges = aggregates.soc_histogram, aggregates.soc_bins
     total_points = sum(hist_values)
     hist_values = (hist_values / total_points) * 100  # type: ignore
     bin_labels = [
@@ -112,14 +110,9 @@ def plot_dop(business_case: Business_Case, scenario_name: str, debug_mode: bool)
 
     log_print(f"Entered plot of dop for scenario {scenario_name}")
 
-    # Drop NaNs
-    power_series = business_case.df["eff_charge_discharge"].dropna()
-
-    # Define bins (1 MW width from -power_level to +power_level)
-    bins = np.arange(-business_case.power_level, business_case.power_level + 1, 1)
-
-    # Histogram with manual normalization
-    counts, bin_edges = np.histogram(power_series, bins=bins)
+    # Histogram (1 MW bins from -power_level to +power_level, NaNs dropped) with manual normalization
+    counts = business_case.aggregates.power_histogram
+    bin_edges = business_case.aggregates.power_bins
     percentages = counts / counts.sum() * 100
 
     if business_case.plotting:
@@ -178,6 +171,67 @@ def plot_dop(business_case: Business_Case, scenario_name: str, debug_mode: bool)
     return
 
 
+def plot_monte_carlo(
+    business_case: Business_Case, scenario_name: str, debug_mode: bool
+) -> None:
+    """
+    Function Purpose: Show the histogram of the NPV over the draws of the financial Monte Carlo in a new popup window.
+    Args:
+        business_case: the business case, holding the Monte_Carlo_Result of the scenario in business_case.monte_carlo
+        scenario_name: the name of the current scenario
+        debug_mode: if True adds debug log statements
+    """
+    result = business_case.monte_carlo.get(str(scenario_name))
+    if result is None:
+        log_print(
+            f"No Monte Carlo for scenario {scenario_name} (use the Monte Carlo run mode), skipping its plot."
+        )
+        return
+
+    counts, bin_edges = result.histogram("NPV", 50)
+    percentages = counts / max(counts.sum(), 1) * 100
+    if debug_mode:
+        log_print(f"P(NPV > 0): {result.probability_positive_npv():.3f}.")
+
+    if business_case.plotting:
+        popup = tk.Toplevel()
+        popup.title(f"Scenario {scenario_name}: Distribution of the NPV")
+        popup.geometry("1400x900")
+
+    fig = Figure(figsize=(10, 6), dpi=100)
+    ax = fig.add_subplot(111)
+    ax.bar(
+        bin_edges[:-1] / 1e6,
+        percentages,
+        width=np.diff(bin_edges) / 1e6,
+        align="edge",
+        edgecolor="black",
+        alpha=0.7,
+    )
+    ax.axvline(0, color="red", linestyle="--", linewidth=1)
+    ax.set_xlabel("NPV (M€)", fontsize=10, fontweight="bold", fontname="Arial")
+    ax.set_ylabel(
+        "Percentage of draws", fontsize=10, fontweight="bold", fontname="Arial"
+    )
+    ax.set_title(
+        f"Distribution of the NPV over {len(result.npv)} draws (P(NPV > 0) = {result.probability_positive_npv():.1%})",
+        fontsize=12,
+        fontweight="bold",
+        fontname="Arial",
+    )
+    ax.grid(True, axis="y")
+    fig.tight_layout()
+
+    if business_case.plotting:
+        canvas = FigureCanvasTkAgg(fig, master=popup)
+        canvas.draw()
+        canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+
+    save_figure(fig, "monte_carlo", scenario_name)
+    log_print(f"Monte Carlo plot saved for scenario {scenario_name}.")
+    return
+
+
 def save_figure(fig: Figure, plot_type: str, scenario_name: str) -> None:
     # Create a directory in the user's Documents folder
     downloads_dir = os.path.join(os.path.expanduser("~"), "Downloads")
@@ -345,4 +399,4 @@ def plot_sankee(
 
 def elena_plot(business_case, scenario_index, debug_mode):
     log_print(business_case.variable_name)
-    return 
\ No newline at end of file
+    return
@@ -3,15 +3,17 @@
 # ============================================================================================================================
 # External library imports
 from openpyxl.styles import PatternFill, Font, Side
-from typing import Callable
+from typing import Any, Callable
 
 # ============================================================================================================================
 # Internal library imports
-from methods.bv_method import bv_method
+from methods.bv_method import BV_PROFILE, bv_method
+from methods.dispatch_rules import THRESHOLD_RESERVE
 from methods.elena_method import elena_method
-from methods.imv_method import imv_method
-from methods.parkwind_method import parkwind_method
-from modify.plots import elena_plot, plot_dop, plot_soc
+from methods.engine import Dispatch_Strategy, Method_Profile
+from methods.imv_method import IMV_PROFILE, imv_method
+from methods.parkwind_method import PARKWIND_PROFILE, parkwind_method
+from modify.plots import elena_plot, plot_dop, plot_monte_carlo, plot_soc
 
 # ============================================================================================================================
 # Constants used throughout the program that you may 'freely' modify (at your own risk)
@@ -28,7 +30,8 @@ AVAILABLE_PLOTS: dict[str, Callable[..., None]] = (
     {  # Here lies all defined plots, add more if desired
         "State-Of-Charge": plot_soc,
         "Distribution-Of-Power": plot_dop,
-        "Elena Plot":elena_plot
+        "Elena Plot":elena_plot,
+        "Monte-Carlo-NPV": plot_monte_carlo,  # only drawn in the Monte Carlo run mode
     }
 )
 
@@ -76,6 +79,166 @@ METHOD_SET: list[Callable[..., None]] =(
     ]
 )
 
+DISPATCH_STRATEGY_SET: dict[str, Dispatch_Strategy] = (
+    {  # The plug-in dispatch strategies (see methods/dispatch_rules.py), selectable in DISPATCH_STRATEGY next to the built-in ones, add if desired
+        "threshold_reserve": THRESHOLD_RESERVE,  # the price rules, keeping a reserve of the capacity
+    }
+)
+
+METHOD_PROFILES: list[Method_Profile | None] = (
+    [  # The engine profile of each method of METHOD_SET (None if the method isn't built on the engine), used by the sweep
+        IMV_PROFILE,
+        BV_PROFILE,
+        PARKWIND_PROFILE,
+        None,
+    ]
+)
+
+RUN_MODES: list[str] = [  # The run modes offered in the options menu
+    "Scenarios",  # computes each selected scenario of the Parametric Analysis sheet
+    "Sweep",  # computes the grid of the sweep ranges around each selected scenario
+    "Screening",  # screens the grid on a coarse timeseries and only computes its best combinations at full resolution (see SCREENING)
+    "Representative Days",  # computes each selected scenario on a few representative days standing for the whole timeseries (see REPRESENTATIVE_DAYS)
+    "Optimizer",  # searches the Storage Power Rating and Duration of each selected scenario maximizing OPTIMIZER["objective"]
+    "Monte Carlo",  # computes each selected scenario then the distribution of its NPV and IRR over draws of the financial inputs (see MONTE_CARLO)
+    "Price Paths",  # re-simulates each selected scenario over perturbed balancing prices (see PRICE_PATHS)
+    "Bootstrap",  # confidence intervals of the outputs of each selected scenario over resampled blocks of days (see BOOTSTRAP)
+    "Multi-Year",  # computes each selected scenario over each timeseries sheet (ex: one per year, separated with ',') and over all of them pooled (see MULTI_YEAR)
+    "Re-Pricing",  # computes each selected scenario once then re-prices it under each tariff of REPRICING
+    "Threshold Sweep",  # computes the grid of the Discharge Price Ratio and Charge Price Threshold sweep values around each selected scenario, only re-running the SOC
+    "Optimal Dispatch",  # computes each selected scenario with its dispatch strategy and with the perfect-foresight optimal dispatch, a benchmark of its revenues (see OPTIMAL_DISPATCH)
+]
+
+SOC_ENGINE: str = "auto"  # SOC engine used by the methods: "sequential", "parallel" (chunked parallel-prefix for very long timeseries), "event" (skips idle and saturated stretches) or "auto"
+
+DISPATCH_STRATEGY: str = "threshold"  # how the storage decides to charge and discharge: "threshold" (the price rules, see DISCHARGE_PRICE_RATIO in methods/engine.py), "price_ranking" (charges in the cheapest and discharges in the dearest periods of each day), "rolling_quantile" (the price rules with rolling quantiles of the prices as thresholds), "rolling_horizon" (plans the best dispatch over the next hours) or one of DISPATCH_STRATEGY_SET, see DISPATCH_OPTIONS
+DISPATCH_OPTIONS: dict[str, dict[str, Any]] = {  # options of each dispatch strategy
+    "price_ranking": {
+        "periods": None,  # amount of settlement periods charged and discharged per day (at most half a day), None for the duration of the storage
+    },
+    "rolling_quantile": {
+        "window_hr": 168,  # hours of past prices the quantiles are taken over (ex: 168 for 7 days)
+        "charge_quantile": 0.2,  # charges when the balancing price is below this quantile of the window
+        "discharge_quantile": 0.8,  # discharges when the balancing price is above this quantile of the window
+    },
+    "threshold_reserve": {
+        "reserve_share": 0.2,  # share of the capacity the storage never discharges below (once charged above it)
+        "headroom_share": 0.0,  # share of the capacity the storage never charges into
+    },
+    "rolling_horizon": {
+        "horizon_hr": 24,  # hours of prices known in advance (ex: 24 for day-ahead visibility)
+        "step_hr": 6,  # hours of the plan kept before planning again (at most horizon_hr), the runtime grows with horizon_hr / step_hr
+        "soc_levels": 101,  # amount of levels the SOC is discretized into (a move is a whole amount of levels, too few levels round the full-power moves down), the runtime grows with its square
+    },
+}
+
+DEGRADATION: dict[str, Any] = {
+    "enabled": False,  # fade the storage capacity with the rainflow cycles of its SOC (see libs/degradation.py), the income of the storage (Revenue B and C) fading with it over the Project Life
+    "cycle_life": 6000,  # amount of full (100% depth) cycles after which the storage reaches its end of life
+    "dod_exponent": 1.5,  # a cycle of depth d counts as d^dod_exponent full cycles (deep cycles wear the storage more than the same energy in shallow ones)
+    "end_of_life_capacity": 0.8,  # share of the capacity left once the cycle life is used
+}
+
+CASH_FLOW: dict[str, Any] = {  # the yearly cash flows of the NPV and IRR (see libs/finance.py), all 0 for the same cash flow every year
+    "revenue_escalation": 0.0,  # yearly growth of the income (ex: 0.02 for 2% per year)
+    "opex_escalation": 0.0,  # yearly growth of the OPEX
+    "augmentation": {},  # {year: share of the Storage CAPEX spent that year}, restores the capacity faded by DEGRADATION (ex: {10: 0.15})
+    "tax_rate": 0.0,  # tax rate of the yearly profit (income - OPEX - augmentation - depreciation), a loss isn't taxed nor carried forward
+    "depreciation_years": 0,  # amount of years the Storage CAPEX is depreciated over (straight line), 0 for no depreciation
+}
+
+DATAFLOW_CACHE: dict[str, int] = {  # bounds of the cache of the derived columns shared between scenarios (see libs/dataflow.py)
+    "cache_size": 32,  # amount of results kept per derived column (ex: the SOC of the last 32 scenarios)
+    "max_bytes": 1 << 30,  # amount of bytes kept by the cache of a method, lower it for long timeseries (ex: 1 min data or several years)
+}
+
+COMPUTE_PRECISION: dict[str, Any] = {
+    "float32": False,  # opt-in float32 timeseries and workspace, reductions and financial results stay in float64
+    "report_tolerance": 1e-3,  # relative NPV/IRR deviation from float64 (checked on the first scenario) above which a warning is logged
+}
+
+TRACE_STORE: dict[str, Any] = {
+    "enabled": False,  # opt-in: keep the SOC and charge/discharge traces of every scenario in memory (see libs/trace_store.py), always kept with deferred_plots
+    "encoding": "float32",  # "float32" or "int16" (quantized between the min and max of each trace, half the memory)
+    "compress": False,  # zlib-compress the stored traces
+    "deferred_plots": False,  # draw the chosen plots after all the scenarios are computed instead of after each scenario (keeps the traces)
+}
+
+SWEEP: dict[str, Any] = {
+    "block_size": 128,  # amount of combinations whose SOC is solved at once (more is faster but uses more memory)
+    "max_combinations": 200_000,  # a sweep with more combinations than this is refused
+    "closed_form_participation": True,  # evaluate all the Balancing Market Participations from one simulation (see methods/participation.py)
+}
+
+REPRESENTATIVE_DAYS: dict[str, Any] = {
+    "days": 24,  # amount of representative days (clusters of similar days)
+    "seed": 0,  # seed of the clustering, the same seed picks the same days
+    "error_report": False,  # also compute the first scenario on the whole timeseries and log the error of each output
+}
+
+SCREENING: dict[str, Any] = {
+    "resolution": 60,  # settlement period of the coarse timeseries [min], a multiple of the Settlement Period (ex: 60 or 240)
+    "top_k": 20,  # amount of combinations kept per scenario
+    "margin": 0.5,  # share of extra combinations re-simulated at full resolution (0.5: 1.5 x top_k)
+    "objective": "NPV",  # the output used to rank the combinations
+    "warning_correlation": 0.9,  # a warning is logged if the rank correlation between both stages is below this
+}
+
+OPTIMIZER: dict[str, Any] = {
+    "objective": "NPV",  # "NPV" or "IRR"
+    "power_bounds": (1.0, 100.0, 1.0),  # (lowest, highest, resolution) of the Storage Power Rating [MW], unless given in the sweep entries
+    "duration_bounds": (0.5, 8.0, 0.5),  # (lowest, highest, resolution) of the Duration [h], unless given in the sweep entries
+    "max_passes": 3,  # maximum amount of coordinate search passes before the local refinement
+}
+
+MONTE_CARLO: dict[str, Any] = {
+    "draws": 100_000,  # amount of draws of the financial inputs per scenario
+    "seed": 0,  # seed of the draws, the same seed gives the same results
+    "percentiles": (5, 50, 95),  # percentiles of the NPV and IRR reported
+    "distributions": {  # (distribution, parameters...) of each drawn input, as multipliers of the value given in the GUI (see methods/financial_monte_carlo.py)
+        "Power Unit CAPEX": ("triangular", 0.8, 1.0, 1.3),  # "fixed", "uniform" (low, high), "normal" (mean, std), "lognormal" (median, sigma) or "triangular" (low, mode, high)
+        "Capacity Unit CAPEX": ("triangular", 0.8, 1.0, 1.3),
+        "Annual OPEX Rate": ("uniform", 0.8, 1.2),
+        "Discount Rate": ("normal", 1.0, 0.1),
+        "Project Life": ("uniform", 0.8, 1.2),  # rounded to whole years
+    },
+}
+
+PRICE_PATHS: dict[str, Any] = {
+    "paths": 500,  # amount of perturbed price paths per scenario
+    "seed": 0,  # seed of the perturbations, the same seed gives the same paths
+    "block_size": 64,  # amount of paths simulated at once (more is faster but uses more memory)
+    "scale": ("normal", 1.0, 0.1),  # distribution of the multiplier of the balancing prices, None to keep their level (see MONTE_CARLO for the distributions)
+    "shift": ("normal", 0.0, 5.0),  # distribution of the amount added to the balancing prices [€/MWh], None for no shift
+    "bootstrap_days": 7,  # length of the blocks of days resampled to build alternative years, 0 to keep the days in place
+    "percentiles": (5, 50, 95),  # percentiles of the NPV and IRR reported
+}
+
+BOOTSTRAP: dict[str, Any] = {
+    "replicates": 1000,  # amount of timeseries rebuilt from resampled blocks of days
+    "block_days": 7,  # amount of consecutive days per resampled block
+    "soc": "carry",  # "carry": each day keeps the SOC of the full simulation, "restart": each block starts from an empty storage (simulates the scenario block_days times)
+    "confidence": 0.9,  # level of the confidence intervals
+    "seed": 0,  # seed of the resampling, the same seed gives the same intervals
+}
+
+MULTI_YEAR: dict[str, Any] = {
+    "soc": "independent",  # "independent": every year starts from an empty storage, "chained": every year starts with the SOC the previous one ended on
+    "workers": None,  # amount of worker processes, None for the amount of CPUs
+}
+
+REPRICING: dict[str, Any] = {
+    "tariffs": [  # each tariff re-prices every selected scenario, a missing price keeps the one of the scenario [€/MWh]
+        {"PPA Price": 50.0},
+        {"PPA Price": 70.0},
+        {"Green-Certificate Price": 0.0},
+    ],
+}
+
+OPTIMAL_DISPATCH: dict[str, Any] = {
+    "soc_levels": 101,  # amount of levels the SOC is discretized into, the runtime grows with its square (ex: 101 levels is about two seconds per year of 15 min data), more levels get closer to the best dispatch
+}
+
 
 # __________________________________________________________________________________________________________________________________________
 # Excel styling constants